@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+Throughput benchmarks of the SDK against the local stand-in of API Gateway.
+
+The fake server runs in a separate process, so CPU time and memory are those of the client only::
+
+    python benchmarks/bench.py
+    python benchmarks/bench.py --quick --only decode
+"""
+
+import argparse
+import asyncio
+import datetime
+import gc
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from etg import Compression, ETGHotelsClient, GuestData, HTTPXTransport  # noqa: E402
+from etg.codec import CODECS  # noqa: E402
+from etg.compression import available_encodings  # noqa: E402
+from etg.streaming import HOTELS_PREFIX, ResponseParser, ijson  # noqa: E402
+from etg.testing import FakeETGServer  # noqa: E402
+
+try:
+    from etg import AsyncETGHotelsClient  # noqa: E402
+    import httpx  # noqa: F401, E402
+except ImportError:  # pragma: no cover
+    httpx = None
+
+CHECKIN = datetime.date.today() + datetime.timedelta(days=60)
+CHECKOUT = CHECKIN + datetime.timedelta(days=3)
+GUESTS = [GuestData(2)]
+
+
+class Result:
+    def __init__(self, name, requests, wall, cpu, peak):
+        self.name = name
+        self.requests = requests
+        self.wall = wall
+        self.cpu = cpu
+        self.peak = peak
+
+    def __str__(self):
+        return '{0:<36} {1:>10.1f} {2:>12.3f} {3:>12.1f}'.format(
+            self.name, self.requests / self.wall, self.cpu / self.requests * 1000, self.peak / 1024 / 1024)
+
+
+def measure(name, fn, requests, memory=True):
+    """Runs the function twice: for requests/sec and CPU per request, then for peak memory."""
+    fn()  # warm up connections and caches
+    gc.collect()
+    started, cpu_started = time.perf_counter(), time.process_time()
+    fn()
+    wall, cpu = time.perf_counter() - started, time.process_time() - cpu_started
+
+    peak = 0
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return Result(name, requests, wall, cpu, peak)
+
+
+def start_server(hotels, rates):
+    """Starts the fake server in a child process, returns the process and its URL.
+
+    Responses are compressed as requested, like API Gateway does.
+    """
+    process = subprocess.Popen([sys.executable, '-m', 'etg.testing', '--hotels', str(hotels), '--rates', str(rates),
+                                '--compression'],
+                               stdout=subprocess.PIPE, universal_newlines=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    return process, process.stdout.readline().strip()
+
+
+def client_benchmarks(url, n, memory):
+    client = ETGHotelsClient(('key_id', 'key'), pool_maxsize=16)
+    client.API_HOST = url
+    ids = ['hotel_{0}'.format(i) for i in range(n)]
+
+    yield measure('sync hotelpage', lambda: [
+        client.hotelpage(hotel_id, CHECKIN, CHECKOUT, GUESTS) for hotel_id in ids
+    ], n, memory)
+
+    regions = max(n // 10, 1)
+    yield measure('sync search_by_region', lambda: [
+        client.search_by_region(region_id, CHECKIN, CHECKOUT, GUESTS) for region_id in range(regions)
+    ], regions, memory)
+
+    yield measure('sync search_by_region top_k', lambda: [
+        client.search_by_region(region_id, CHECKIN, CHECKOUT, GUESTS, top_k=10) for region_id in range(regions)
+    ], regions, memory)
+
+    if ijson is not None:
+        yield measure('sync search_by_region top_k stream', lambda: [
+            client.search_by_region(region_id, CHECKIN, CHECKOUT, GUESTS, top_k=10, stream=True)
+            for region_id in range(regions)
+        ], regions, memory)
+
+    for encoding in available_encodings():
+        compressed_client = ETGHotelsClient(('key_id', 'key'), compression=Compression(encodings=(encoding,)))
+        compressed_client.API_HOST = url
+        yield measure('sync search_by_region {0}'.format(encoding), lambda: [
+            compressed_client.search_by_region(region_id, CHECKIN, CHECKOUT, GUESTS) for region_id in range(regions)
+        ], regions, memory)
+        stats = compressed_client.compression.stats()
+        print('  {0}: {1:.1f}x smaller on the wire'.format(encoding, stats['ratio']))
+        compressed_client.close()
+
+    yield measure('concurrent search_by_hotels', lambda: client.search_by_hotels(
+        ids, CHECKIN, CHECKOUT, GUESTS, chunk_size=10, max_workers=16,
+    ), max(n // 10, 1), memory)
+
+    if httpx is not None:
+        httpx_client = ETGHotelsClient(('key_id', 'key'), transport=HTTPXTransport(('key_id', 'key'), http2=False))
+        httpx_client.API_HOST = url
+        yield measure('concurrent search_by_hotels httpx', lambda: httpx_client.search_by_hotels(
+            ids, CHECKIN, CHECKOUT, GUESTS, chunk_size=10, max_workers=16,
+        ), max(n // 10, 1), memory)
+        httpx_client.close()
+
+    dates = [(CHECKIN + datetime.timedelta(days=i), CHECKOUT + datetime.timedelta(days=i))
+             for i in range(max(n // 10, 1))]
+    yield measure('concurrent search_matrix', lambda: client.search_matrix(
+        ids[:10], dates, [GUESTS], max_workers=16,
+    ), len(dates), memory)
+
+    if httpx is not None:
+        async def gather():
+            async with AsyncETGHotelsClient(('key_id', 'key')) as async_client:
+                async_client.API_HOST = url
+                await asyncio.gather(*(
+                    async_client.hotelpage(hotel_id, CHECKIN, CHECKOUT, GUESTS) for hotel_id in ids
+                ))
+
+        yield measure('async hotelpage gather', lambda: asyncio.run(gather()), n, memory)
+    client.close()
+
+
+def decode_benchmarks(hotels, rates, n, memory):
+    with FakeETGServer(hotels=hotels, rates=rates) as server:
+        _, _, body = server.handle('POST', '/api/b2b/v3/search/serp/region/', {'region_id': 1})
+
+    for name, codec_class in sorted(CODECS.items()):
+        try:
+            codec = codec_class()
+        except ImportError:
+            continue
+        yield measure('decode SERP {0}'.format(name), lambda: [codec.loads(body) for _ in range(n)], n, memory)
+
+    if ijson is not None:
+        def stream():
+            for _ in range(n):
+                parser = ResponseParser(HOTELS_PREFIX)
+                for i in range(0, len(body), 64 * 1024):
+                    for _ in parser.feed(body[i:i + 64 * 1024]):
+                        pass
+                list(parser.close())
+
+        yield measure('decode SERP streaming', stream, n, memory)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Throughput benchmarks of the SDK.')
+    parser.add_argument('--requests', type=int, default=200, help='requests of every client benchmark')
+    parser.add_argument('--hotels', type=int, default=1000, help='hotels in region SERP')
+    parser.add_argument('--rates', type=int, default=5, help='rates of every hotel')
+    parser.add_argument('--only', choices=('client', 'decode'), help='run one group of benchmarks')
+    parser.add_argument('--no-memory', action='store_true', help='skip peak memory measurement')
+    parser.add_argument('--quick', action='store_true', help='run a small smoke benchmark')
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.requests, args.hotels = 20, 100
+
+    print('{0:<36} {1:>10} {2:>12} {3:>12}'.format('benchmark', 'req/s', 'CPU ms/req', 'peak MiB'))
+    if args.only in (None, 'client'):
+        process, url = start_server(args.hotels, args.rates)
+        try:
+            for result in client_benchmarks(url, args.requests, not args.no_memory):
+                print(result, flush=True)
+        finally:
+            process.terminate()
+            process.wait()
+    if args.only in (None, 'decode'):
+        for result in decode_benchmarks(args.hotels, args.rates, max(args.requests // 10, 1), not args.no_memory):
+            print(result, flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,12 +6,31 @@ from .__version__ import (
 
 from .client import ETGClient
 from .hotels import ETGHotelsClient
+from .aio import AsyncETGClient, AsyncETGHotelsClient
+from .cache import ResponseCache
+from .columnar import RateTable
+from .compression import Compression
+from .export import SerpWriter
+from .filters import RateFilter
+from .hedging import HedgingPolicy
+from .instrumentation import Instrumentation, LatencyMetrics
+from .autocomplete import AutocompleteCache, AutocompleteIndex
+from .ratelimit import RateLimiter
+from .regions import RegionStore
+from .replay import (
+    AsyncRecordingTransport, AsyncReplayTransport, RecordingTransport, ReplayTransport, TrafficStore, replay_traffic,
+)
+from .retry import CircuitBreaker, RetryPolicy
+from .scheduler import AsyncRequestScheduler, RequestScheduler
+from .transport import AsyncHTTPXTransport, AsyncTransport, HTTPXTransport, RequestsTransport, Transport
 from .models.client import Response
 from .models.hotels import (
-    GuestData,
+    GuestData, SearchCombination, Hotel, Rate, DailyPrice,
 )
 from .exceptions import (
-    ETGException, BadRequestException, AuthErrorException,
+    ETGException, BadRequestException, AuthErrorException, PartialResultException,
+    TransientException, RateLimitExceededException, ServerErrorException, NetworkException,
+    CircuitOpenException, DeadlineExceededException, ReplayMissException,
 )
 
 # Set default logging handler to avoid "No handler found" warnings.
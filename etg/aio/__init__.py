@@ -0,0 +1,11 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.aio
+~~~~~~~
+
+This module contains asyncio clients for ETG API v3.
+"""
+
+from .client import AsyncETGClient
+from .hotels import AsyncETGHotelsClient
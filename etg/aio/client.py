@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import contextlib
+import contextvars
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+from ..client import _BaseClient, _http_timeout, _is_error_response, _raise_for_deadline
+from ..codec import get_codec
+from ..exceptions import NetworkException
+from ..retry import call_with_retries_async
+from ..streaming import HOTELS_PREFIX, ResponseParser
+from ..transport import AsyncHTTPXTransport
+
+
+@contextlib.asynccontextmanager
+async def _no_slot():
+    yield
+
+
+async def _aread_body(compression, r):
+    """Returns the whole body of the async transport response, see :func:`etg.client._read_body`."""
+    if compression is None:
+        return await r.aread(), None
+    return await compression.aread(r)
+
+
+async def _aiter(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def _raise_for_transport_error(deadline, ex):
+    """Raises :class:`DeadlineExceededException` if the request timed out because of the deadline,
+    :class:`NetworkException` otherwise."""
+    _raise_for_deadline(deadline, ex)
+    raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+
+async def _decoded_chunks(decoder, chunks):
+    """Yields non-empty decompressed chunks of the raw body."""
+    async for chunk in chunks:
+        chunk = decoder.decompress(chunk)
+        if chunk:
+            yield chunk
+    chunk = decoder.flush()
+    if chunk:
+        yield chunk
+
+
+class AsyncETGClient(_BaseClient):
+
+    """
+    Asyncio client for ETG API v3 (general API resources).
+    """
+
+    def __init__(self, auth, verify_ssl=True,
+                 max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0,
+                 cache=None, codec=None, rate_limiter=None, scheduler=None,
+                 http_timeout=(10, 120), hedging=None, retry_policy=None, circuit_breaker=None,
+                 instrumentation=None, transport=None, compression=None):
+        """Init.
+
+        The client owns a pooled async HTTP session shared by all coroutines of the event loop.
+        Connection parameters apply to the default transport only.
+
+        :param auth: user (key_id) and password (key) for basic auth.
+        :type auth: (str, str)
+        :param verify_ssl: (optional) controls whether we verify the server's SSL certificate, defaults to True.
+        :type verify_ssl: bool
+        :param max_connections: (optional) maximum number of concurrent connections, defaults to 100.
+        :type max_connections: int or None
+        :param max_keepalive_connections: (optional) maximum number of idle connections kept open, defaults to 20.
+        :type max_keepalive_connections: int or None
+        :param keepalive_expiry: (optional) time in seconds an idle connection is kept open, defaults to 5.0.
+        :type keepalive_expiry: float or None
+        :param cache: (optional) cache of responses of idempotent endpoints, e.g. search and hotelpage.
+        :type cache: etg.ResponseCache or None
+        :param codec: (optional) JSON codec or its name: 'orjson', 'msgspec', or 'json',
+            by default the fastest installed one.
+        :type codec: etg.codec.JSONCodec or str or None
+        :param rate_limiter: (optional) limiter of requests to API endpoints.
+        :type rate_limiter: etg.RateLimiter or None
+        :param scheduler: (optional) scheduler of concurrent requests by priority, bookings first,
+            its slots are fitted into ``max_connections``.
+        :type scheduler: etg.AsyncRequestScheduler or None
+        :param http_timeout: (optional) connect and read timeouts in seconds of HTTP requests,
+            None waits forever, defaults to (10, 120).
+        :type http_timeout: (float, float) or float or None
+        :param hedging: (optional) policy duplicating slow requests to idempotent endpoints, e.g. search.
+        :type hedging: etg.HedgingPolicy or None
+        :param retry_policy: (optional) policy retrying idempotent requests failed with transient errors.
+        :type retry_policy: etg.RetryPolicy or None
+        :param circuit_breaker: (optional) breaker suspending requests to failing endpoints.
+        :type circuit_breaker: etg.CircuitBreaker or None
+        :param instrumentation: (optional) listeners of request events, e.g. :class:`etg.LatencyMetrics`.
+        :type instrumentation: etg.Instrumentation or None
+        :param transport: (optional) HTTP transport sending the requests, by default based on httpx,
+            pass :class:`etg.transport.AsyncHTTPXTransport` with ``http2=True`` to multiplex requests.
+        :type transport: etg.transport.AsyncTransport or None
+        :param compression: (optional) compression of responses and request bodies,
+            by default the transport negotiates it.
+        :type compression: etg.Compression or None
+        """
+        if httpx is None and transport is None:
+            raise ImportError('AsyncETGClient requires httpx, install it with `pip install etg[async]`.')
+
+        self.auth = httpx.BasicAuth(*auth) if httpx is not None else auth
+        self.verify_ssl = verify_ssl
+        self.max_connections = max_connections
+        self.cache = cache
+        self.codec = get_codec(codec)
+        self.rate_limiter = rate_limiter
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.fit(max_connections)
+        self.http_timeout = http_timeout
+        self.hedging = hedging
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.instrumentation = instrumentation
+        self.compression = compression
+
+        if transport is None:
+            transport = AsyncHTTPXTransport(self.auth, verify_ssl=verify_ssl, http2=False,
+                                            max_connections=max_connections,
+                                            max_keepalive_connections=max_keepalive_connections,
+                                            keepalive_expiry=keepalive_expiry)
+        self.transport = transport
+
+        self._req = contextvars.ContextVar('req', default=None)
+        self._resp = contextvars.ContextVar('resp', default=None)
+
+    @property
+    def session(self):
+        """Session of the transport based on httpx, None for the other transports."""
+        return getattr(self.transport, 'session', None)
+
+    @session.setter
+    def session(self, value):
+        self.transport.session = value
+
+    @property
+    def req(self):
+        """The last request sent by the current task."""
+        return self._req.get()
+
+    @req.setter
+    def req(self, value):
+        self._req.set(value)
+
+    @property
+    def resp(self):
+        """The last response received by the current task."""
+        return self._resp.get()
+
+    @resp.setter
+    def resp(self, value):
+        self._resp.set(value)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    async def aclose(self):
+        """Closes all pooled connections."""
+        await self.transport.aclose()
+
+    async def request(self, method, endpoint, data=None, deadline=None):
+        """Constructs and sends a request to API Gateway.
+
+        See :meth:`etg.ETGClient.request` for the description of parameters.
+
+        :return: main content of the response API (`$.data`).
+        :rtype: object
+        """
+        resp = await self.send(method, endpoint, data=data, deadline=deadline)
+        return resp.data
+
+    async def send(self, method, endpoint, data=None, deadline=None):
+        """Constructs and sends a request to API Gateway, returns the whole response.
+
+        See :meth:`etg.ETGClient.send`. ``self.req`` and ``self.resp`` keep the last request
+        and response of the current task.
+
+        :return: API response with debug info, status, timing and raw size.
+        :rtype: Response
+        """
+        self.req = self.resp = None
+
+        if self.cache is not None and self.cache.is_cacheable(endpoint):
+            resp = await self.cache.aget_or_call(method, endpoint, data,
+                                                 lambda: self._send_with_policies(method, endpoint, data, deadline))
+            self.resp = resp
+            return resp
+
+        return await self._send_with_policies(method, endpoint, data, deadline)
+
+    async def _send_with_policies(self, method, endpoint, data, deadline=None):
+        """Sends the request with hedging, retries and the circuit breaker of the client."""
+        if self._is_hedged(endpoint):
+            send = self._hedged_send
+        else:
+            send = self._send
+
+        if self.retry_policy is None and self.circuit_breaker is None:
+            return await send(method, endpoint, data, deadline)
+        return await call_with_retries_async(lambda: send(method, endpoint, data, deadline), endpoint,
+                                             retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker,
+                                             deadline=deadline)
+
+    async def _send(self, method, endpoint, data, deadline=None):
+        url, r_params, r_data, r_headers, event = self._prepare(method, endpoint, data)
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(endpoint, deadline)
+            async with self._slot(endpoint):
+                timeout = _http_timeout(self.http_timeout, deadline)
+                started = self._before_send(event)
+                exchange = self._exchange(method, url, r_params, r_data, r_headers, timeout, started, event)
+                try:
+                    if deadline is None:
+                        r, content, wire_size = await exchange
+                    else:
+                        r, content, wire_size = await asyncio.wait_for(exchange, deadline - started)
+                except asyncio.TimeoutError as ex:
+                    _raise_for_transport_error(deadline, ex)
+                except NetworkException as ex:
+                    _raise_for_deadline(deadline, ex)
+                    raise
+            self._after_body(event, started, content, wire_size)
+            return self._response(endpoint, r, content, started, event)
+        except Exception as ex:
+            self._on_error(event, ex)
+            raise
+
+    async def _exchange(self, method, url, r_params, r_data, r_headers, timeout, started, event):
+        """Sends the request, reads the body separately to tell the time spent by API from the download."""
+        r = await self.transport.request(method, url, params=r_params, data=r_data, headers=r_headers,
+                                         timeout=timeout)
+        try:
+            self._after_headers(event, r, started)
+            content, wire_size = await _aread_body(self.compression, r)
+        finally:
+            await r.aclose()
+        return r, content, wire_size
+
+    async def stream(self, method, endpoint, data=None, prefix=HOTELS_PREFIX, chunk_size=64 * 1024, deadline=None):
+        """Constructs and sends a request to API Gateway, yields objects of the response while it is downloaded.
+
+        See :meth:`etg.ETGClient.stream`, use it with ``async for``.
+        """
+        self.req = self.resp = None
+
+        parser = ResponseParser(prefix)
+        if self._is_hedged(endpoint):
+            open_stream = self._hedged_open_stream
+        else:
+            open_stream = self._open_stream
+        if self.retry_policy is None and self.circuit_breaker is None:
+            opened = await open_stream(method, endpoint, data, deadline)
+        else:
+            opened = await call_with_retries_async(lambda: open_stream(method, endpoint, data, deadline), endpoint,
+                                                   retry_policy=self.retry_policy,
+                                                   circuit_breaker=self.circuit_breaker, deadline=deadline)
+        stack, r, content, event, started = opened
+        decoder = None
+        try:
+            async with stack:
+                try:
+                    if content is not None:
+                        chunks = _aiter((content,))
+                    elif self.compression is None:
+                        chunks = r.aiter_content(chunk_size)
+                    else:
+                        # decompressed chunks go straight to the parser
+                        decoder = self.compression.decoder(r.content_encoding)
+                        chunks = _decoded_chunks(decoder, r.aiter_raw(chunk_size))
+                    async for chunk in chunks:
+                        for item in parser.feed(chunk):
+                            yield item
+                    for item in parser.close():
+                        yield item
+                except NetworkException as ex:
+                    _raise_for_deadline(deadline, ex)
+                    raise
+
+            self._stream_response(endpoint, r, parser, decoder, started, event)
+        except Exception as ex:
+            self._on_error(event, ex)
+            raise
+
+    async def _open_stream(self, method, endpoint, data, deadline=None):
+        """Sends the request of :meth:`stream` and checks the response before its body is parsed."""
+        url, r_params, r_data, r_headers, event = self._prepare(method, endpoint, data)
+        stack = contextlib.AsyncExitStack()
+        try:
+            if self.rate_limiter is not None:
+                await self.rate_limiter.acquire_async(endpoint, deadline)
+            await stack.enter_async_context(self._slot(endpoint))
+            timeout = _http_timeout(self.http_timeout, deadline)
+            started = self._before_send(event)
+            content = None
+            try:
+                r = await self.transport.request(method, url, params=r_params, data=r_data, headers=r_headers,
+                                                 timeout=timeout)
+                await stack.enter_async_context(r)
+                self.req = r.request
+                self._after_headers(event, r, started)
+                if _is_error_response(r):
+                    content, _ = await _aread_body(self.compression, r)
+            except NetworkException as ex:
+                _raise_for_deadline(deadline, ex)
+                raise
+            if content is not None:
+                self._raise_for_error(self._decode(endpoint, r, content, started))
+        except BaseException as ex:
+            await stack.aclose()
+            if isinstance(ex, Exception):
+                self._on_error(event, ex)
+            raise
+        return stack, r, content, event, started
+
+    async def _hedged_send(self, method, endpoint, data, deadline=None):
+        async def attempt():
+            resp = await self._send(method, endpoint, data, deadline)
+            return self.req, resp
+
+        self.req, self.resp = await self.hedging.call_async(endpoint, attempt)
+        return self.resp
+
+    async def _hedged_open_stream(self, method, endpoint, data, deadline=None):
+        async def attempt():
+            opened = await self._open_stream(method, endpoint, data, deadline)
+            return self.req, opened
+
+        async def discard(result):
+            await result[1][0].aclose()
+
+        self.req, opened = await self.hedging.call_async(endpoint, attempt, discard=discard)
+        return opened
+
+    def _max_concurrency(self, n):
+        """Returns the number of n requests sent at a time, no more than connections of the transport."""
+        pool_size = getattr(self.transport, 'pool_size', None) or self.max_connections
+        return min(n, pool_size) if pool_size else n
+
+    def _slot(self, endpoint):
+        """Returns an async context holding a slot of the scheduler while the request is sent."""
+        if self.scheduler is None:
+            return _no_slot()
+        return self.scheduler.slot(endpoint)
+
+    async def contract_data_info(self):
+        """Returns contracts general information.
+
+        :return: info for all own contracts.
+        :rtype: dict
+        """
+        endpoint = 'api/b2b/v3/general/contract/data/info/'
+        response_data = await self.request('GET', endpoint)
+        return response_data
+
+    async def financial_info(self):
+        """Returns contracts financial information.
+
+        :return: financial info for all own contracts.
+        :rtype: dict
+        """
+        endpoint = 'api/b2b/v3/general/financial/info/'
+        response_data = await self.request('GET', endpoint)
+        return response_data
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+import asyncio
+
+from .client import AsyncETGClient
+from ..exceptions import PartialResultException
+from ..filters import HotelSelector, filter_rates, select_hotels
+from ..models.hotels import Hotel
+from ..hotels import (
+    REGION_LIST_DEFAULT_LIMIT,
+    _autocomplete_params, _search_params, _iter_search_params, _search_combinations, _combination_results,
+    _serp_hotels, _is_streamable,
+    _hotelpage_params, _hotelpage_hotel, _hotel_models,
+    _make_reservation_params, _finish_reservation_params, _cancel_params, _region_list_params,
+)
+from ..utils import chunked, gather_map
+
+
+class AsyncETGHotelsClient(AsyncETGClient):
+
+    """
+    Asyncio twin of :class:`etg.ETGHotelsClient`.
+
+    Methods accept the same parameters and return the same results as the synchronous ones.
+    """
+
+    def __init__(self, auth, autocomplete_index=None, autocomplete_cache=None, typed_models=False,
+                 **kwargs):
+        """Init.
+
+        See :meth:`etg.ETGHotelsClient.__init__` and :meth:`AsyncETGClient.__init__`.
+        """
+        super().__init__(auth, **kwargs)
+        self.autocomplete_index = autocomplete_index
+        self.autocomplete_cache = autocomplete_cache
+        self.typed_models = typed_models
+
+    async def autocomplete(self, query,
+                           language=None):
+        """Finds regions and hotels by a part of their names.
+
+        See :meth:`etg.ETGHotelsClient.autocomplete`.
+        """
+        if self.autocomplete_index is not None:
+            response = self.autocomplete_index.search(query, language=language)
+            if response['hotels'] or response['regions']:
+                return response
+
+        if self.autocomplete_cache is not None:
+            response = self.autocomplete_cache.get(query, language=language)
+            if response is not None:
+                return response
+
+        endpoint, data = _autocomplete_params(query, language=language)
+        response = await self.request('POST', endpoint, data=data)
+
+        if self.autocomplete_cache is not None and isinstance(response, dict):
+            self.autocomplete_cache.put(query, response, language=language)
+        return response
+
+    async def search(self, ids, checkin, checkout, guests,
+                     currency=None, residency=None, timeout=None, upsells=None,
+                     language=None, rate_filter=None, top_k=None, key=None, stream=False, deadline=None):
+        """Searches hotels with available accommodation that meets the given conditions.
+
+        See :meth:`etg.ETGHotelsClient.search`.
+        """
+        endpoint, data = _search_params(ids, checkin, checkout, guests,
+                                        currency=currency, residency=residency, timeout=timeout,
+                                        upsells=upsells, language=language, deadline=deadline)
+        selector = HotelSelector(rate_filter=rate_filter, top_k=top_k, key=key)
+        if stream and _is_streamable(self, endpoint):
+            async for hotel in self.stream('POST', endpoint, data=data, deadline=deadline):
+                selector.add(hotel)
+            return _hotel_models(self, selector.result())
+
+        hotels = _serp_hotels(await self.request('POST', endpoint, data=data, deadline=deadline))
+        if rate_filter is None and top_k is None:
+            return _hotel_models(self, hotels)
+        for hotel in hotels or []:
+            selector.add(hotel)
+        return _hotel_models(self, selector.result())
+
+    async def search_by_hotels(self, ids, checkin, checkout, guests, chunk_size=None, max_concurrency=None,
+                               **kwargs):
+        """Searches hotels with available accommodation that meets the given conditions.
+
+        See :meth:`etg.ETGHotelsClient.search_by_hotels`,
+        ``max_concurrency`` limits the number of chunks searched at a time, defaults to the connection pool size.
+        """
+        if chunk_size is None or len(ids) <= chunk_size:
+            return await self.search(ids, checkin, checkout, guests, **kwargs)
+
+        chunks = chunked(ids, chunk_size)
+        results, errors = await gather_map(
+            lambda chunk: self.search(chunk, checkin, checkout, guests, **kwargs),
+            chunks, max_concurrency=max_concurrency or self._max_concurrency(len(chunks)))
+
+        hotels = list()
+        for i in sorted(results):
+            hotels.extend(results[i] or [])
+        if kwargs.get('top_k') is not None:
+            hotels = select_hotels(hotels, top_k=kwargs['top_k'], key=kwargs.get('key'))
+        if errors:
+            raise PartialResultException(hotels, {tuple(chunks[i]): ex for i, ex in errors.items()})
+
+        return hotels
+
+    async def search_by_region(self, region_id, checkin, checkout, guests, **kwargs):
+        """Searches hotels with available accommodation that meets the given conditions.
+
+        See :meth:`etg.ETGHotelsClient.search_by_region`.
+        """
+        return await self.search(region_id, checkin, checkout, guests, **kwargs)
+
+    async def search_matrix(self, ids, dates, occupancies, residencies=(None,), max_concurrency=None, **kwargs):
+        """Searches hotels for every combination of dates, occupancies and residencies concurrently.
+
+        See :meth:`etg.ETGHotelsClient.search_matrix`,
+        ``max_concurrency`` limits the number of searches at a time, defaults to the connection pool size.
+        """
+        combinations = _search_combinations(dates, occupancies, residencies)
+        results, errors = await gather_map(
+            lambda c: self.search(ids, c.checkin, c.checkout, list(c.guests), residency=c.residency, **kwargs),
+            combinations, max_concurrency=max_concurrency or self._max_concurrency(len(combinations)))
+
+        return _combination_results(combinations, results, errors)
+
+    def iter_search(self, ids, checkin, checkout, guests, rate_filter=None, **kwargs):
+        """Searches hotels like ``self.search``, yields hotels while the response is downloaded.
+
+        See :meth:`etg.ETGHotelsClient.iter_search`, use it with ``async for``.
+        """
+        endpoint, data = _iter_search_params(ids, checkin, checkout, guests, **kwargs)
+        hotels = self.stream('POST', endpoint, data=data, deadline=kwargs.get('deadline'))
+        if rate_filter is not None:
+            hotels = _filter_rates(hotels, rate_filter)
+        if not self.typed_models:
+            return hotels
+        return (Hotel.from_dict(hotel) async for hotel in hotels)
+
+    async def hotelpage(self, hotel_id, checkin, checkout, guests,
+                        currency=None, residency=None, upsells=None, language=None, deadline=None):
+        """Returns actual rates for the given hotel.
+
+        See :meth:`etg.ETGHotelsClient.hotelpage`.
+        """
+        endpoint, data = _hotelpage_params(hotel_id, checkin, checkout, guests,
+                                           currency=currency, residency=residency, upsells=upsells,
+                                           language=language)
+        response = await self.request('POST', endpoint, data=data, deadline=deadline)
+        hotel = _hotelpage_hotel(response)
+        if hotel is not None and self.typed_models:
+            hotel = Hotel.from_dict(hotel)
+        return hotel
+
+    async def make_reservation(self, partner_order_id, book_hash, language, user_ip):
+        """Makes a new reservation.
+
+        See :meth:`etg.ETGHotelsClient.make_reservation`.
+        """
+        endpoint, data = _make_reservation_params(partner_order_id, book_hash, language, user_ip)
+        response = await self.request('POST', endpoint, data=data)
+
+        return response
+
+    async def finish_reservation(self, partner, payment_type, rooms, user, language,
+                                 arrival_datetime=None, upsell_data=None, return_path=None):
+        """Completes the reservation.
+
+        See :meth:`etg.ETGHotelsClient.finish_reservation`.
+        """
+        endpoint, data = _finish_reservation_params(partner, payment_type, rooms, user, language,
+                                                    arrival_datetime=arrival_datetime, upsell_data=upsell_data,
+                                                    return_path=return_path)
+        await self.request('POST', endpoint, data=data)
+        return True
+
+    async def cancel(self, partner_order_id):
+        """Cancels reservation.
+
+        See :meth:`etg.ETGHotelsClient.cancel`.
+        """
+        endpoint, data = _cancel_params(partner_order_id)
+        await self.request('POST', endpoint, data=data)
+        return True
+
+    async def region_list(self, last_id=None, limit=None, types=None):
+        """Returns information about regions.
+
+        See :meth:`etg.ETGHotelsClient.region_list`.
+        """
+        endpoint, data = _region_list_params(last_id=last_id, limit=limit, types=types)
+        regions = await self.request('GET', endpoint, data=data)
+
+        return regions
+
+    async def iter_regions(self, last_id=None, limit=None, types=None):
+        """Iterates over all regions page by page, following ``last_id``.
+
+        See :meth:`etg.ETGHotelsClient.iter_regions`, use it with ``async for``.
+        """
+        page = await self.region_list(last_id=last_id, limit=limit, types=types)
+        next_page = None
+        try:
+            while page:
+                next_page = None
+                if len(page) >= (limit or REGION_LIST_DEFAULT_LIMIT):
+                    next_page = asyncio.ensure_future(
+                        self.region_list(last_id=page[-1].get('id'), limit=limit, types=types))
+                for region in page:
+                    yield region
+                page = await next_page if next_page is not None else None
+        finally:
+            if next_page is not None and not next_page.done():
+                next_page.cancel()
+
+
+async def _filter_rates(hotels, rate_filter):
+    """Yields the hotels with the acceptable rates only, see :func:`etg.filters.filter_rates`."""
+    async for hotel in hotels:
+        hotel = filter_rates(hotel, rate_filter)
+        if hotel is not None:
+            yield hotel
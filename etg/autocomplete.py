@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.autocomplete
+~~~~~~~~~~~~~~~~
+
+This module contains the offline autocomplete engine.
+"""
+
+import bisect
+import gzip
+import json
+import threading
+from collections import OrderedDict
+
+from .client import ETGClient
+
+
+class AutocompleteIndex:
+
+    """
+    Sorted prefix index of region and hotel names per language.
+
+    Answers queries in the same format as :meth:`etg.ETGHotelsClient.autocomplete`:
+    a name matches if it or any of its words starts with the query.
+    """
+    #: Maximum number of objects for each category in the results, same as in the API.
+    LIMIT = 5
+
+    def __init__(self, languages=ETGClient.SUPPORTED_LANGUAGES, default_language='en'):
+        """Init.
+
+        :param languages: (optional) languages of the index, defaults to all supported languages.
+        :type languages: tuple[str]
+        :param default_language: (optional) language of the queries without language, defaults to 'en'.
+        :type default_language: str
+        """
+        self.languages = tuple(languages)
+        self.default_language = default_language
+
+        self._lock = threading.Lock()
+        self._entries = list()
+        self._keys = {language: list() for language in self.languages}
+        self._refs = {language: list() for language in self.languages}
+        self._sorted = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    @classmethod
+    def from_regions(cls, regions, hotels=None, **kwargs):
+        """Builds the index from regions and hotels.
+
+        :param regions: regions from ``region_list`` response or :class:`etg.RegionStore`.
+        :type regions: collections.abc.Iterable[dict]
+        :param hotels: (optional) hotels with ``id`` and ``name``.
+        :type hotels: collections.abc.Iterable[dict] or None
+        :param kwargs: parameters of the index, see :meth:`AutocompleteIndex.__init__`.
+        :rtype: AutocompleteIndex
+        """
+        index = cls(**kwargs)
+        for region in regions:
+            index.add_region(region)
+        for hotel in hotels or []:
+            index.add_hotel(hotel)
+        index.build()
+        return index
+
+    def add_region(self, region):
+        """Adds the region to the index.
+
+        :param region: region with ``id``, ``type``, ``country_code`` and ``name``,
+            the name is either a string or a dict by language.
+        :type region: dict
+        """
+        for languages, name in self._names(region.get('name')):
+            self._add('regions', languages, {
+                'id': region.get('id'),
+                'name': name,
+                'type': region.get('type'),
+                'country_code': region.get('country_code'),
+            })
+
+    def add_hotel(self, hotel):
+        """Adds the hotel to the index.
+
+        :param hotel: hotel with ``id`` and ``name``, the name is either a string or a dict by language.
+        :type hotel: dict
+        """
+        for languages, name in self._names(hotel.get('name')):
+            self._add('hotels', languages, {
+                'id': hotel.get('id'),
+                'name': name,
+            })
+
+    def build(self):
+        """Sorts the added names, it is done automatically on the first search after adding."""
+        with self._lock:
+            if self._sorted:
+                return
+            for language in self.languages:
+                pairs = sorted(zip(self._keys[language], self._refs[language]))
+                self._keys[language] = [key for key, _ in pairs]
+                self._refs[language] = [ref for _, ref in pairs]
+            self._sorted = True
+
+    def search(self, query, language=None, limit=LIMIT):
+        """Finds regions and hotels by a part of their names.
+
+        :param query: beginning of hotel or region name or of any word of the name.
+        :type query: str
+        :param language: (optional) language of the names, defaults to ``self.default_language``.
+        :type language: str or None
+        :param limit: (optional) maximum number of objects for each category, defaults to 5.
+        :type limit: int
+        :return: suggested hotels and regions.
+        :rtype: dict
+        """
+        self.build()
+        results = {'hotels': [], 'regions': []}
+        prefix = normalize_query(query)
+        language = language or self.default_language
+        keys, refs = self._keys.get(language), self._refs.get(language)
+        if not prefix or keys is None:
+            return results
+
+        seen = set()
+        for i in range(bisect.bisect_left(keys, prefix), len(keys)):
+            if not keys[i].startswith(prefix):
+                break
+            if refs[i] in seen:
+                continue
+            seen.add(refs[i])
+            category, entry = self._entries[refs[i]]
+            if len(results[category]) < limit:
+                results[category].append(entry)
+            if all(len(objects) >= limit for objects in results.values()):
+                break
+        return results
+
+    def save(self, path):
+        """Saves the index into gzipped JSON file, so it can be loaded without rebuilding.
+
+        :param path: path to the file.
+        :type path: str
+        """
+        self.build()
+        state = {
+            'languages': self.languages,
+            'default_language': self.default_language,
+            'entries': self._entries,
+            'keys': self._keys,
+            'refs': self._refs,
+        }
+        with gzip.open(path, 'wt', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path):
+        """Loads the index saved by :meth:`save`.
+
+        :param path: path to the file.
+        :type path: str
+        :rtype: AutocompleteIndex
+        """
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            state = json.load(f)
+        index = cls(languages=state['languages'], default_language=state['default_language'])
+        index._entries = [tuple(entry) for entry in state['entries']]
+        index._keys = state['keys']
+        index._refs = state['refs']
+        return index
+
+    def _names(self, name):
+        """Returns pairs of languages and name, a plain string name is indexed for all languages."""
+        if isinstance(name, dict):
+            return [((language,), value) for language, value in name.items() if value and language in self._keys]
+        if name:
+            return [(self.languages, name)]
+        return []
+
+    def _add(self, category, languages, entry):
+        words = normalize_query(entry['name']).split(' ')
+        keys = {' '.join(words[i:]) for i in range(len(words))}
+        with self._lock:
+            ref = len(self._entries)
+            self._entries.append((category, entry))
+            for language in languages:
+                self._keys[language].extend(keys)
+                self._refs[language].extend([ref] * len(keys))
+            self._sorted = False
+
+
+class AutocompleteCache:
+
+    """
+    LRU cache of :meth:`etg.ETGHotelsClient.autocomplete` results keyed by language and normalized query.
+
+    If a shorter prefix of the query was cached and returned less objects than the API limit in every category,
+    the result for the query is got by filtering the cached objects by name locally.
+    """
+
+    def __init__(self, maxsize=1024, limit=AutocompleteIndex.LIMIT):
+        """Init.
+
+        :param maxsize: (optional) maximum number of cached queries, defaults to 1024.
+        :type maxsize: int
+        :param limit: (optional) maximum number of objects for each category in API results, defaults to 5.
+        :type limit: int
+        """
+        self.maxsize = maxsize
+        self.limit = limit
+
+        #: Number of queries answered from the cache.
+        self.hits = 0
+
+        #: Number of queries not found in the cache.
+        self.misses = 0
+
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def __len__(self):
+        return len(self._results)
+
+    def get(self, query, language=None):
+        """Returns the cached result of the query or None.
+
+        :param query: autocomplete query.
+        :type query: str
+        :param language: (optional) language of the query.
+        :type language: str or None
+        :rtype: dict or None
+        """
+        query = normalize_query(query)
+        with self._lock:
+            result = self._results.get((language, query))
+            if result is None:
+                result = self._from_prefix(query, language)
+                if result is not None:
+                    self._set((language, query), result)
+            else:
+                self._results.move_to_end((language, query))
+
+            if result is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return result
+
+    def put(self, query, response, language=None):
+        """Caches the result of the query.
+
+        :param query: autocomplete query.
+        :type query: str
+        :param response: result of the query.
+        :type response: dict
+        :param language: (optional) language of the query.
+        :type language: str or None
+        """
+        with self._lock:
+            self._set((language, normalize_query(query)), response)
+
+    def clear(self):
+        """Removes all cached results and resets the counters."""
+        with self._lock:
+            self._results.clear()
+            self.hits = self.misses = 0
+
+    def _set(self, key, response):
+        self._results[key] = response
+        self._results.move_to_end(key)
+        while len(self._results) > self.maxsize:
+            self._results.popitem(last=False)
+
+    def _from_prefix(self, query, language):
+        """Returns the result filtered from the longest complete cached prefix of the query."""
+        for i in range(len(query) - 1, 0, -1):
+            cached = self._results.get((language, query[:i]))
+            if cached is None:
+                continue
+            if any(isinstance(objects, list) and len(objects) >= self.limit for objects in cached.values()):
+                # the API could cut off objects matching the query
+                return None
+            return {
+                category: [o for o in objects if _word_prefix_match(o.get('name') or '', query)]
+                if isinstance(objects, list) else objects
+                for category, objects in cached.items()
+            }
+        return None
+
+
+def normalize_query(query):
+    """Returns case insensitive form of the query with collapsed whitespaces."""
+    return ' '.join(query.casefold().split())
+
+
+def _word_prefix_match(name, query):
+    """Returns True if the name or any of its words starts with the normalized query, as in the API."""
+    name = normalize_query(name)
+    return name.startswith(query) or ' ' + query in name
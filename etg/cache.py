@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.cache
+~~~~~~~~~
+
+This module contains the cache of API responses.
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+from .codec import MultiJSONEncoder
+from .models.hotels import GuestData
+
+
+class ResponseCache:
+
+    """
+    Size bounded LRU cache of API responses with per-endpoint TTLs.
+
+    Responses are keyed by a hash of the canonical JSON of the request data.
+    Concurrent identical requests are coalesced: only one of them is sent, the others wait for its response.
+    Cached responses are shared between callers and must not be modified.
+    """
+    #: TTLs in seconds of the endpoints cached by default.
+    DEFAULT_TTLS = {
+        'api/b2b/v3/search/serp/hotels/': 60,
+        'api/b2b/v3/search/serp/region/': 60,
+        'api/b2b/v3/search/hp/': 30,
+    }
+
+    #: Endpoints with any of these prefixes are never cached.
+    UNCACHEABLE_PREFIXES = (
+        'api/b2b/v3/hotel/order/',
+    )
+
+    def __init__(self, ttls=None, maxsize=1024):
+        """Init.
+
+        :param ttls: (optional) TTLs in seconds by endpoint, only these endpoints are cached,
+            defaults to ``DEFAULT_TTLS``.
+        :type ttls: dict[str, float] or None
+        :param maxsize: (optional) maximum number of cached responses, defaults to 1024.
+        :type maxsize: int
+        """
+        self.ttls = dict(ttls if ttls is not None else self.DEFAULT_TTLS)
+        for endpoint in self.ttls:
+            if endpoint.startswith(self.UNCACHEABLE_PREFIXES):
+                raise ValueError('Endpoint {0} can not be cached'.format(endpoint))
+        self.maxsize = maxsize
+
+        #: Number of responses got from the cache.
+        self.hits = 0
+
+        #: Number of requests sent to API.
+        self.misses = 0
+
+        #: Number of requests that waited for the identical request in flight.
+        self.coalesced = 0
+
+        self._lock = threading.Lock()
+        self._responses = OrderedDict()
+        self._inflight = dict()
+        self._async_inflight = dict()
+
+    def __len__(self):
+        return len(self._responses)
+
+    def is_cacheable(self, endpoint):
+        """Returns True if responses of the endpoint are cached."""
+        return endpoint in self.ttls
+
+    @staticmethod
+    def key(method, endpoint, data):
+        """Returns the cache key of the request.
+
+        Response timeout of API is not a part of the key, it is cut down by deadlines of the calls.
+        """
+        if isinstance(data, dict) and 'timeout' in data:
+            data = {k: v for k, v in data.items() if k != 'timeout'}
+        payload = json.dumps(data, cls=_KeyEncoder, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256('{0} {1} {2}'.format(method, endpoint, payload).encode('utf-8')).hexdigest()
+
+    def get_or_call(self, method, endpoint, data, fn):
+        """Returns the cached response of the request or calls the function to get it.
+
+        :param fn: function sending the request and returning :class:`etg.Response`.
+        :type fn: callable
+        :rtype: etg.Response
+        """
+        key = self.key(method, endpoint, data)
+        with self._lock:
+            resp = self._get(key)
+            if resp is not None:
+                return resp
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                self.misses += 1
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            resp = fn()
+        except Exception as ex:
+            future.set_exception(ex)
+            raise
+        else:
+            self._set(key, endpoint, resp)
+            future.set_result(resp)
+            return resp
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    async def aget_or_call(self, method, endpoint, data, fn):
+        """Returns the cached response of the request or awaits the coroutine function to get it.
+
+        :param fn: coroutine function sending the request and returning :class:`etg.Response`.
+        :type fn: callable
+        :rtype: etg.Response
+        """
+        key = self.key(method, endpoint, data)
+        with self._lock:
+            resp = self._get(key)
+            if resp is not None:
+                return resp
+            future = self._async_inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                self.misses += 1
+                future = self._async_inflight[key] = asyncio.ensure_future(fn())
+                # the task finishes even if the awaiting caller is cancelled, so its result is kept by the task
+                future.add_done_callback(lambda task: self._async_done(key, endpoint, task))
+
+        return await asyncio.shield(future)
+
+    def clear(self):
+        """Removes all cached responses and resets the counters."""
+        with self._lock:
+            self._responses.clear()
+            self.hits = self.misses = self.coalesced = 0
+
+    def _get(self, key):
+        """Returns the cached response if it is not expired, the lock must be held."""
+        entry = self._responses.get(key)
+        if entry is None:
+            return None
+        expires, resp = entry
+        if expires < time.monotonic():
+            del self._responses[key]
+            return None
+        self._responses.move_to_end(key)
+        self.hits += 1
+        return resp
+
+    def _set(self, key, endpoint, resp):
+        with self._lock:
+            self._responses[key] = (time.monotonic() + self.ttls[endpoint], resp)
+            self._responses.move_to_end(key)
+            while len(self._responses) > self.maxsize:
+                self._responses.popitem(last=False)
+
+    def _async_done(self, key, endpoint, task):
+        with self._lock:
+            self._async_inflight.pop(key, None)
+        if not task.cancelled() and task.exception() is None:
+            self._set(key, endpoint, task.result())
+
+
+class _KeyEncoder(MultiJSONEncoder):
+    """Encoder of the canonical request data, the order of children ages does not change the room."""
+
+    def default(self, o):
+        if isinstance(o, GuestData):
+            return {'adults': o.adults, 'children': sorted(o.children)}
+        return super().default(o)
@@ -1,16 +1,25 @@
 # -*- coding: utf-8 -*-
-import json
+import contextlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-import requests
 from requests.auth import HTTPBasicAuth
 
+from .codec import MultiJSONEncoder, get_codec  # MultiJSONEncoder is kept importable from here
+from .exceptions import DeadlineExceededException, NetworkException, RateLimitExceededException
+from .instrumentation import RequestEvent
 from .models.client import Response
+from .retry import call_with_retries
+from .streaming import HOTELS_PREFIX, ResponseParser
+from .transport import RequestsTransport
 
 
-class ETGClient:
+class _BaseClient:
 
     """
-    Client for ETG API v3 (general API resources).
+    Preparation of requests, handling of responses and request events shared by the sync and async clients,
+    the clients only send the requests and read the bodies.
     """
     API_HOST = 'https://api.worldota.net'
     SUPPORTED_LANGUAGES = (
@@ -18,21 +27,222 @@ class ETGClient:
         'hu', 'pl', 'pt', 'ro', 'ru', 'sr', 'tr',
     )
 
-    def __init__(self, auth, verify_ssl=True):
+    def _is_hedged(self, endpoint):
+        """Returns True if requests to the endpoint are hedged."""
+        return self.hedging is not None and self.hedging.is_hedgeable(endpoint)
+
+    def _prepare(self, method, endpoint, data):
+        """Returns URL, query string parameters, body and headers of the request, and its event."""
+        r_params = r_data = None
+        if data is not None:
+            if method == 'GET':
+                r_params = {'data': self.codec.dumps(data).decode('utf-8')}
+            elif method == 'POST':
+                r_data = self.codec.dumps(data)
+
+        url = '{api_host}/{endpoint}'.format(api_host=self.API_HOST, endpoint=endpoint)
+        event = self._event(method, endpoint, r_params, r_data)
+        r_data, r_headers = _encode_request(self.compression, r_params, r_data, event)
+        return url, r_params, r_data, r_headers, event
+
+    def _event(self, method, endpoint, r_params, r_data):
+        """Returns the event of the request for the listeners, None if nobody listens."""
+        if self.instrumentation is None or not self.instrumentation.active:
+            return None
+        return RequestEvent(method, endpoint, request_size=_request_size(r_params, r_data))
+
+    def _before_send(self, event):
+        """Returns the time the request is sent at."""
+        started = time.monotonic()
+        if event is not None:
+            event.started = started
+            self.instrumentation.emit('before_send', event)
+        return started
+
+    def _after_headers(self, event, r, started):
+        if event is not None:
+            event.http_status = r.status_code
+            event.headers_elapsed = time.monotonic() - started
+            self.instrumentation.emit('after_headers', event)
+
+    def _after_body(self, event, started, content, wire_size):
+        if event is not None:
+            event.response_size = len(content)
+            event.wire_response_size = wire_size
+            event.body_elapsed = time.monotonic() - started
+            self.instrumentation.emit('after_body', event)
+
+    def _decode(self, endpoint, r, content, started):
+        """Returns the response decoded from the whole body."""
+        payload = _decode_payload(self.codec, r.status_code, content)
+        resp = Response(endpoint=endpoint, http_status=r.status_code,
+                        elapsed=time.monotonic() - started, size=len(content), **payload)
+        self.req = r.request
+        self.resp = resp
+        return resp
+
+    def _response(self, endpoint, r, content, started, event):
+        """Returns the response decoded from the whole body, raises the error it keeps."""
+        resp = self._decode(endpoint, r, content, started)
+        if event is not None:
+            event.decode_elapsed = resp.elapsed
+            self.instrumentation.emit('after_decode', event)
+        if self.hedging is not None:
+            self.hedging.observe(endpoint, resp.elapsed)
+
+        self._raise_for_error(resp)
+        return resp
+
+    def _stream_response(self, endpoint, r, parser, decoder, started, event):
+        """Keeps the response of :meth:`stream` once its body is parsed, raises the error it keeps."""
+        resp = Response(data=None, endpoint=endpoint, http_status=r.status_code,
+                        elapsed=time.monotonic() - started, size=parser.size, **parser.rest)
+        self.resp = resp
+        if decoder is not None:
+            self.compression.record(received=parser.size, wire_received=decoder.wire_size)
+        if event is not None:
+            # the body is decoded while it is downloaded
+            event.response_size = parser.size
+            event.wire_response_size = decoder.wire_size if decoder is not None else None
+            event.body_elapsed = event.decode_elapsed = resp.elapsed
+            self.instrumentation.emit('after_body', event)
+            self.instrumentation.emit('after_decode', event)
+
+        self._raise_for_error(resp)
+
+    def _on_error(self, event, ex):
+        if event is not None:
+            event.error = ex
+            self.instrumentation.emit('on_error', event)
+
+    def _raise_for_error(self, resp):
+        """Raises stored :class:`ETGException`, slows down the rate limiter if the limit is exceeded."""
+        try:
+            resp.raise_for_error()
+        except RateLimitExceededException:
+            if self.rate_limiter is not None:
+                self.rate_limiter.throttled(resp.endpoint)
+            raise
+
+
+class ETGClient(_BaseClient):
+
+    """
+    Client for ETG API v3 (general API resources).
+    """
+
+    def __init__(self, auth, verify_ssl=True,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True,
+                 cache=None, codec=None, rate_limiter=None, scheduler=None,
+                 http_timeout=(10, 120), hedging=None, retry_policy=None, circuit_breaker=None,
+                 instrumentation=None, transport=None, compression=None):
         """Init.
 
+        The client owns a pooled HTTP session, so connections to API Gateway are reused between calls.
+        The session is safe to share across worker threads.
+        Connection parameters apply to the default transport only.
+
         :param auth: user (key_id) and password (key) for basic auth.
         :type auth: (str, str)
         :param verify_ssl: (optional) controls whether we verify the server's SSL certificate, defaults to True.
         :type verify_ssl: bool
+        :param pool_connections: (optional) number of per-host connection pools to cache, defaults to 10.
+        :type pool_connections: int
+        :param pool_maxsize: (optional) maximum number of connections kept open per host, defaults to 10.
+        :type pool_maxsize: int
+        :param pool_block: (optional) whether to wait for a free connection when the pool is exhausted
+            instead of opening an extra one, defaults to False.
+        :type pool_block: bool
+        :param keep_alive: (optional) whether to keep connections open between requests, defaults to True.
+        :type keep_alive: bool
+        :param cache: (optional) cache of responses of idempotent endpoints, e.g. search and hotelpage.
+        :type cache: etg.ResponseCache or None
+        :param codec: (optional) JSON codec or its name: 'orjson', 'msgspec', or 'json',
+            by default the fastest installed one.
+        :type codec: etg.codec.JSONCodec or str or None
+        :param rate_limiter: (optional) limiter of requests to API endpoints.
+        :type rate_limiter: etg.RateLimiter or None
+        :param scheduler: (optional) scheduler of concurrent requests by priority, bookings first,
+            its slots are fitted into ``pool_maxsize``.
+        :type scheduler: etg.RequestScheduler or None
+        :param http_timeout: (optional) connect and read timeouts in seconds of HTTP requests,
+            None waits forever, defaults to (10, 120).
+        :type http_timeout: (float, float) or float or None
+        :param hedging: (optional) policy duplicating slow requests to idempotent endpoints, e.g. search.
+        :type hedging: etg.HedgingPolicy or None
+        :param retry_policy: (optional) policy retrying idempotent requests failed with transient errors.
+        :type retry_policy: etg.RetryPolicy or None
+        :param circuit_breaker: (optional) breaker suspending requests to failing endpoints.
+        :type circuit_breaker: etg.CircuitBreaker or None
+        :param instrumentation: (optional) listeners of request events, e.g. :class:`etg.LatencyMetrics`.
+        :type instrumentation: etg.Instrumentation or None
+        :param transport: (optional) HTTP transport sending the requests, by default based on requests.
+        :type transport: etg.transport.Transport or None
+        :param compression: (optional) compression of responses and request bodies,
+            by default the transport negotiates it.
+        :type compression: etg.Compression or None
         """
         self.auth = HTTPBasicAuth(*auth)
         self.verify_ssl = verify_ssl
+        self.pool_maxsize = pool_maxsize
+        self.cache = cache
+        self.codec = get_codec(codec)
+        self.rate_limiter = rate_limiter
+        self.scheduler = scheduler
+        if scheduler is not None:
+            scheduler.fit(pool_maxsize)
+        self.http_timeout = http_timeout
+        self.hedging = hedging
+        self.retry_policy = retry_policy
+        self.circuit_breaker = circuit_breaker
+        self.instrumentation = instrumentation
+        self.compression = compression
+
+        if transport is None:
+            transport = RequestsTransport(self.auth, verify_ssl=verify_ssl, pool_connections=pool_connections,
+                                          pool_maxsize=pool_maxsize, pool_block=pool_block, keep_alive=keep_alive)
+        self.transport = transport
+
+        self._local = threading.local()
+        self._executor_lock = threading.Lock()
+        self._hedge_executor = None
+
+    @property
+    def session(self):
+        """Session of the transport based on requests or httpx, None for the other transports."""
+        return getattr(self.transport, 'session', None)
+
+    @property
+    def req(self):
+        """The last request sent by the current thread."""
+        return getattr(self._local, 'req', None)
+
+    @req.setter
+    def req(self, value):
+        self._local.req = value
 
-        self.req = None
-        self.resp = None
+    @property
+    def resp(self):
+        """The last response received by the current thread."""
+        return getattr(self._local, 'resp', None)
 
-    def request(self, method, endpoint, data=None):
+    @resp.setter
+    def resp(self, value):
+        self._local.resp = value
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Closes all pooled connections."""
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.transport.close()
+
+    def request(self, method, endpoint, data=None, deadline=None):
         """Constructs and sends a request to API Gateway.
 
         :param method: HTTP method, possible values: ``GET``, or ``POST``.
@@ -43,26 +253,208 @@ class ETGClient:
         :param data: (optional) dictionary of parameters to send in the query string as the value of ``data``,
             e.g. data={'limit': 2, 'last_id': 123}, query string will be ``resource?data={"limit": 2, "last_id": 123}``.
         :type data: dict or None
+        :param deadline: (optional) time of :func:`time.monotonic` by which the response must be received.
+        :type deadline: float or None
         :return: main content of the response API (`$.data`).
         :rtype: object
+        :raises DeadlineExceededException: if the deadline passed before the response was received.
+        """
+        return self.send(method, endpoint, data=data, deadline=deadline).data
+
+    def send(self, method, endpoint, data=None, deadline=None):
+        """Constructs and sends a request to API Gateway, returns the whole response.
+
+        The returned response belongs to the call, so one client can be shared by many threads.
+        ``self.req`` and ``self.resp`` keep the last request and response of the current thread.
+
+        :param method: HTTP method, possible values: ``GET``, or ``POST``.
+        :type method: str
+        :param endpoint: API endpoint, e.g. 'api/b2b/v3/general/financial/info/'.
+        :type endpoint: str
+        :param data: (optional) dictionary of parameters of the request.
+        :type data: dict or None
+        :param deadline: (optional) time of :func:`time.monotonic` by which the response must be received.
+        :type deadline: float or None
+        :return: API response with debug info, status, timing and raw size.
+        :rtype: Response
+        :raises TransientException: if the request failed temporarily and retries did not help.
+        :raises CircuitOpenException: if requests to the endpoint are suspended by the circuit breaker.
         """
         self.req = self.resp = None
 
-        r_params = r_data = None
-        if data is not None:
-            if method == 'GET':
-                r_params = {'data': json.dumps(data, cls=MultiJSONEncoder)}
-            elif method == 'POST':
-                r_data = json.dumps(data, cls=MultiJSONEncoder)
+        if self.cache is not None and self.cache.is_cacheable(endpoint):
+            resp = self.cache.get_or_call(method, endpoint, data,
+                                          lambda: self._send_with_policies(method, endpoint, data, deadline))
+            self.resp = resp
+            return resp
 
-        url = '{api_host}/{endpoint}'.format(api_host=self.API_HOST, endpoint=endpoint)
-        r = requests.request(method, url,
-                             params=r_params, data=r_data, auth=self.auth, verify=self.verify_ssl)
-        self.resp = Response(**r.json())
+        return self._send_with_policies(method, endpoint, data, deadline)
+
+    def _send_with_policies(self, method, endpoint, data, deadline=None):
+        """Sends the request with hedging, retries and the circuit breaker of the client."""
+        if self._is_hedged(endpoint):
+            send = self._hedged_send
+        else:
+            send = self._send
+
+        if self.retry_policy is None and self.circuit_breaker is None:
+            return send(method, endpoint, data, deadline)
+        return call_with_retries(lambda: send(method, endpoint, data, deadline), endpoint,
+                                 retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker,
+                                 deadline=deadline)
+
+    def _send(self, method, endpoint, data, deadline=None):
+        url, r_params, r_data, r_headers, event = self._prepare(method, endpoint, data)
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(endpoint, deadline)
+            with self._slot(endpoint):
+                timeout = _http_timeout(self.http_timeout, deadline)
+                started = self._before_send(event)
+                try:
+                    # the body is read separately to tell the time spent by API from the download
+                    with self.transport.request(method, url, params=r_params, data=r_data, headers=r_headers,
+                                                timeout=timeout) as r:
+                        self._after_headers(event, r, started)
+                        content, wire_size = _read_body(self.compression, r)
+                except NetworkException as ex:
+                    _raise_for_deadline(deadline, ex)
+                    raise
+            self._after_body(event, started, content, wire_size)
+            return self._response(endpoint, r, content, started, event)
+        except Exception as ex:
+            self._on_error(event, ex)
+            raise
+
+    def stream(self, method, endpoint, data=None, prefix=HOTELS_PREFIX, chunk_size=64 * 1024, deadline=None):
+        """Constructs and sends a request to API Gateway, yields objects of the response while it is downloaded.
+
+        The response is parsed incrementally, so the first objects are available before the body is received
+        and memory does not grow with the response size. ``self.resp`` keeps the response without ``data``.
+        Error responses and bodies which are not JSON are read whole and raised before any object is yielded,
+        so retries and the circuit breaker of the client apply to them, other errors are raised after
+        the whole body is parsed.
+
+        :param method: HTTP method, possible values: ``GET``, or ``POST``.
+        :type method: str
+        :param endpoint: API endpoint, e.g. 'api/b2b/v3/search/serp/region/'.
+        :type endpoint: str
+        :param data: (optional) dictionary of parameters of the request.
+        :type data: dict or None
+        :param prefix: (optional) ijson prefix of the yielded objects, defaults to hotels of search response.
+        :type prefix: str
+        :param chunk_size: (optional) size in bytes of the body chunks read at a time.
+        :type chunk_size: int
+        :param deadline: (optional) time of :func:`time.monotonic` by which the response must start,
+            every read of the body is limited by the time left as well.
+        :type deadline: float or None
+        :return: objects of the response at the prefix.
+        :rtype: collections.abc.Iterator
+        """
+        self.req = self.resp = None
+
+        parser = ResponseParser(prefix)
+        if self._is_hedged(endpoint):
+            open_stream = self._hedged_open_stream
+        else:
+            open_stream = self._open_stream
+        if self.retry_policy is None and self.circuit_breaker is None:
+            opened = open_stream(method, endpoint, data, deadline)
+        else:
+            opened = call_with_retries(lambda: open_stream(method, endpoint, data, deadline), endpoint,
+                                       retry_policy=self.retry_policy, circuit_breaker=self.circuit_breaker,
+                                       deadline=deadline)
+        stack, r, content, event, started = opened
+        decoder = None
+        try:
+            with stack:
+                try:
+                    if content is not None:
+                        chunks = (content,)
+                    elif self.compression is None:
+                        chunks = r.iter_content(chunk_size)
+                    else:
+                        # decompressed chunks go straight to the parser
+                        decoder = self.compression.decoder(r.content_encoding)
+                        chunks = _decoded_chunks(decoder, r.iter_raw(chunk_size))
+                    for chunk in chunks:
+                        for item in parser.feed(chunk):
+                            yield item
+                    for item in parser.close():
+                        yield item
+                except NetworkException as ex:
+                    _raise_for_deadline(deadline, ex)
+                    raise
+
+            self._stream_response(endpoint, r, parser, decoder, started, event)
+        except Exception as ex:
+            self._on_error(event, ex)
+            raise
 
-        self.resp.raise_for_error()
+    def _open_stream(self, method, endpoint, data, deadline=None):
+        """Sends the request of :meth:`stream` and checks the response before its body is parsed.
 
-        return self.resp.data
+        :return: exit stack closing the response and releasing the slot, the response, its whole body
+            if it was read to raise an error, the event and the time the request was sent at.
+        """
+        url, r_params, r_data, r_headers, event = self._prepare(method, endpoint, data)
+        stack = contextlib.ExitStack()
+        try:
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(endpoint, deadline)
+            stack.enter_context(self._slot(endpoint))
+            timeout = _http_timeout(self.http_timeout, deadline)
+            started = self._before_send(event)
+            content = None
+            try:
+                r = stack.enter_context(self.transport.request(method, url, params=r_params, data=r_data,
+                                                               headers=r_headers, timeout=timeout))
+                self.req = r.request
+                self._after_headers(event, r, started)
+                if _is_error_response(r):
+                    content, _ = _read_body(self.compression, r)
+            except NetworkException as ex:
+                _raise_for_deadline(deadline, ex)
+                raise
+            if content is not None:
+                self._raise_for_error(self._decode(endpoint, r, content, started))
+        except BaseException as ex:
+            stack.close()
+            if isinstance(ex, Exception):
+                self._on_error(event, ex)
+            raise
+        return stack, r, content, event, started
+
+    def _hedged_send(self, method, endpoint, data, deadline=None):
+        def attempt():
+            resp = self._send(method, endpoint, data, deadline)
+            return self.req, resp
+
+        self.req, self.resp = self.hedging.call(self._hedging_executor(), endpoint, attempt)
+        return self.resp
+
+    def _hedged_open_stream(self, method, endpoint, data, deadline=None):
+        def attempt():
+            opened = self._open_stream(method, endpoint, data, deadline)
+            return self.req, opened
+
+        self.req, opened = self.hedging.call(self._hedging_executor(), endpoint, attempt,
+                                             discard=lambda result: result[1][0].close())
+        return opened
+
+    def _hedging_executor(self):
+        """Returns the executor of hedged requests, one worker for every connection of the transport."""
+        with self._executor_lock:
+            if self._hedge_executor is None:
+                pool_size = getattr(self.transport, 'pool_size', None) or self.pool_maxsize
+                self._hedge_executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='etg-hedging')
+        return self._hedge_executor
+
+    def _slot(self, endpoint):
+        """Returns a context holding a slot of the scheduler while the request is sent."""
+        if self.scheduler is None:
+            return contextlib.nullcontext()
+        return self.scheduler.slot(endpoint)
 
     def contract_data_info(self):
         """Returns contracts general information.
@@ -85,9 +477,71 @@ class ETGClient:
         return response_data
 
 
-class MultiJSONEncoder(json.JSONEncoder):
-    def default(self, o):
-        if hasattr(o, 'to_json') and callable(o.to_json):
-            return o.to_json()
-        # Let the base class default raise the TypeError
-        return json.JSONEncoder.default(self, o)
+def _request_size(r_params, r_data):
+    """Returns size in bytes of the request data sent in the body or in the query string."""
+    if r_data is not None:
+        return len(r_data)
+    if r_params is not None:
+        return len(r_params['data'])
+    return 0
+
+
+def _encode_request(compression, r_params, r_data, event):
+    """Returns the body and headers of the request, the body is compressed if the compression is configured."""
+    if compression is None:
+        return r_data, None
+    r_data, r_headers = compression.encode(r_data)
+    if event is not None:
+        event.wire_request_size = _request_size(r_params, r_data)
+    return r_data, r_headers
+
+
+def _read_body(compression, r):
+    """Returns the whole body of the transport response and its size on the wire, if it was decompressed."""
+    if compression is None:
+        return r.content, None
+    return compression.read(r)
+
+
+def _is_error_response(r):
+    """Returns True if the response is an error or its body is not JSON, so it must be decoded as a whole."""
+    content_type = r.headers.get('Content-Type') or r.headers.get('content-type') or ''
+    return r.status_code >= 400 or bool(content_type) and 'json' not in content_type.lower()
+
+
+def _decoded_chunks(decoder, chunks):
+    """Yields non-empty decompressed chunks of the raw body."""
+    for chunk in chunks:
+        chunk = decoder.decompress(chunk)
+        if chunk:
+            yield chunk
+    chunk = decoder.flush()
+    if chunk:
+        yield chunk
+
+
+def _http_timeout(http_timeout, deadline):
+    """Returns connect and read timeouts of the HTTP request limited by the time left to the deadline."""
+    if deadline is None:
+        return http_timeout
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceededException('Deadline passed before the request was sent')
+    timeouts = http_timeout if isinstance(http_timeout, tuple) else (http_timeout, http_timeout)
+    return tuple(remaining if timeout is None else min(timeout, remaining) for timeout in timeouts)
+
+
+def _raise_for_deadline(deadline, ex):
+    """Raises :class:`DeadlineExceededException` if the request failed because the deadline passed."""
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceededException('Deadline passed before the response was received') from ex
+
+
+def _decode_payload(codec, http_status, content):
+    """Returns the decoded response, error pages of the gateway which are not JSON are replaced with an error."""
+    try:
+        return codec.loads(content)
+    except Exception:
+        if http_status < 500:
+            raise
+        return {'data': None, 'debug': None, 'error': 'server_error', 'status': 'error'}
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.codec
+~~~~~~~~~
+
+This module contains JSON codecs used for encoding requests and decoding responses.
+The fastest installed library is used by default: orjson, msgspec, or the standard json module.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover
+    msgspec = None
+
+
+class MultiJSONEncoder(json.JSONEncoder):
+    def default(self, o):
+        if hasattr(o, 'to_json') and callable(o.to_json):
+            return o.to_json()
+        # Let the base class default raise the TypeError
+        return json.JSONEncoder.default(self, o)
+
+
+def _to_json(o):
+    """Fallback for the objects unknown to the fast codecs."""
+    if hasattr(o, 'to_json') and callable(o.to_json):
+        return o.to_json()
+    raise TypeError('Object of type {0} is not JSON serializable'.format(type(o).__name__))
+
+
+class JSONCodec:
+
+    """
+    JSON codec based on the standard json module.
+    """
+    name = 'json'
+
+    def dumps(self, obj):
+        """Returns UTF-8 encoded JSON of the object."""
+        return json.dumps(obj, cls=MultiJSONEncoder).encode('utf-8')
+
+    def loads(self, data):
+        """Returns the object decoded from JSON bytes or string."""
+        return json.loads(data)
+
+
+class OrjsonCodec(JSONCodec):
+
+    """
+    JSON codec based on orjson, dataclasses (e.g. :class:`etg.GuestData`) are serialized natively.
+    """
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError('OrjsonCodec requires orjson, install it with `pip install etg[fast]`.')
+
+    def dumps(self, obj):
+        return orjson.dumps(obj, default=_to_json)
+
+    def loads(self, data):
+        return orjson.loads(data)
+
+
+class MsgspecCodec(JSONCodec):
+
+    """
+    JSON codec based on msgspec, dataclasses (e.g. :class:`etg.GuestData`) are serialized natively.
+    """
+    name = 'msgspec'
+
+    def __init__(self):
+        if msgspec is None:
+            raise ImportError('MsgspecCodec requires msgspec, install it with `pip install msgspec`.')
+        self._encoder = msgspec.json.Encoder(enc_hook=_to_json)
+        self._decoder = msgspec.json.Decoder()
+
+    def dumps(self, obj):
+        return self._encoder.encode(obj)
+
+    def loads(self, data):
+        return self._decoder.decode(data)
+
+
+CODECS = {
+    codec.name: codec for codec in (OrjsonCodec, MsgspecCodec, JSONCodec)
+}
+
+
+def get_codec(codec=None):
+    """Returns JSON codec.
+
+    :param codec: (optional) codec instance or name: 'orjson', 'msgspec', or 'json',
+        by default the fastest installed one.
+    :type codec: JSONCodec or str or None
+    :rtype: JSONCodec
+    """
+    if isinstance(codec, JSONCodec):
+        return codec
+    if codec is not None:
+        return CODECS[codec]()
+    if orjson is not None:
+        return OrjsonCodec()
+    if msgspec is not None:
+        return MsgspecCodec()
+    return JSONCodec()
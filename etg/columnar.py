@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.columnar
+~~~~~~~~~~~~
+
+This module contains the columnar rate table for vectorized ranking of search results.
+"""
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+from .filters import has_free_cancellation, rate_price
+
+
+class RateTable:
+
+    """
+    Rates of search results as NumPy arrays, one row per rate.
+
+    Columns:
+
+    * ``hotel_index`` - index of the hotel in ``hotel_ids``,
+    * ``rate_index`` - index of the rate in the rates of the hotel,
+    * ``total_price`` - price for the whole stay, NaN if unknown,
+    * ``nights`` - number of nights,
+    * ``per_night_price`` - average price of one night,
+    * ``meal_code`` - index of the meal type in ``meals``,
+    * ``free_cancellation`` - whether the rate can be cancelled free of charge.
+    """
+    COLUMNS = ('hotel_index', 'rate_index', 'total_price', 'nights', 'per_night_price', 'meal_code',
+               'free_cancellation')
+
+    def __init__(self, hotel_ids, meals, **columns):
+        """Init, use :meth:`from_hotels` to build the table from search results.
+
+        :param hotel_ids: identifiers of hotels referenced by ``hotel_index``.
+        :type hotel_ids: list[str]
+        :param meals: meal types referenced by ``meal_code``.
+        :type meals: list[str]
+        :param columns: arrays of the same length for all ``COLUMNS``.
+        """
+        if np is None:
+            raise ImportError('RateTable requires numpy, install it with `pip install etg[columnar]`.')
+
+        self.hotel_ids = hotel_ids
+        self.meals = meals
+        for name in self.COLUMNS:
+            setattr(self, name, columns[name])
+
+    def __len__(self):
+        return len(self.hotel_index)
+
+    @classmethod
+    def from_hotels(cls, hotels):
+        """Builds the table from hotels of the search or hotelpage response.
+
+        :param hotels: hotels as dicts or :class:`etg.Hotel` objects.
+        :type hotels: collections.abc.Iterable[dict or etg.Hotel]
+        :rtype: RateTable
+        """
+        if np is None:
+            raise ImportError('RateTable requires numpy, install it with `pip install etg[columnar]`.')
+
+        hotel_ids, meals, meal_codes = list(), list(), dict()
+        hotel_index, rate_index, total_price, nights, meal_code, free_cancellation = [], [], [], [], [], []
+        for hotel in hotels:
+            hotel_ids.append(hotel.get('id'))
+            for i, rate in enumerate(hotel.get('rates') or []):
+                meal = rate.get('meal')
+                if meal not in meal_codes:
+                    meal_codes[meal] = len(meals)
+                    meals.append(meal)
+                price = rate_price(rate)
+
+                hotel_index.append(len(hotel_ids) - 1)
+                rate_index.append(i)
+                total_price.append(price if price is not None else np.nan)
+                nights.append(len(rate.get('daily_prices') or []))
+                meal_code.append(meal_codes[meal])
+                free_cancellation.append(has_free_cancellation(rate))
+
+        total_price = np.asarray(total_price, dtype=np.float64)
+        nights = np.asarray(nights, dtype=np.int16)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            per_night_price = np.where(nights > 0, total_price / nights, np.nan)
+        return cls(hotel_ids, meals,
+                   hotel_index=np.asarray(hotel_index, dtype=np.int32),
+                   rate_index=np.asarray(rate_index, dtype=np.int32),
+                   total_price=total_price,
+                   nights=nights,
+                   per_night_price=per_night_price,
+                   meal_code=np.asarray(meal_code, dtype=np.int16),
+                   free_cancellation=np.asarray(free_cancellation, dtype=np.bool_))
+
+    def take(self, indices):
+        """Returns the table of the given rows, indices may be a boolean mask or an array of row numbers."""
+        return RateTable(self.hotel_ids, self.meals,
+                         **{name: getattr(self, name)[indices] for name in self.COLUMNS})
+
+    def where(self, max_price=None, min_price=None, meals=None, free_cancellation=None):
+        """Returns the rates meeting the conditions, see :class:`etg.RateFilter` for the description."""
+        mask = np.ones(len(self), dtype=np.bool_)
+        if max_price is not None:
+            mask &= self.total_price <= max_price
+        if min_price is not None:
+            mask &= self.total_price >= min_price
+        if meals is not None:
+            codes = [self.meals.index(meal) for meal in meals if meal in self.meals]
+            mask &= np.isin(self.meal_code, codes)
+        if free_cancellation is not None:
+            mask &= self.free_cancellation == free_cancellation
+        return self.take(mask)
+
+    def sort(self, by='total_price', descending=False):
+        """Returns the table sorted by the column, rows with equal values keep their order."""
+        values = getattr(self, by)
+        order = np.argsort(-values if descending else values, kind='stable')
+        return self.take(order)
+
+    def cheapest_per_hotel(self):
+        """Returns the cheapest rate of every hotel ordered by price."""
+        order = np.lexsort((self.total_price, self.hotel_index))
+        hotel_index = self.hotel_index[order]
+        first = np.ones(len(order), dtype=np.bool_)
+        first[1:] = hotel_index[1:] != hotel_index[:-1]
+        return self.take(order[first]).sort()
+
+    def min_price_by_hotel(self):
+        """Returns the price of the cheapest rate by hotel index, NaN for hotels without rates.
+
+        :rtype: numpy.ndarray
+        """
+        prices = np.full(len(self.hotel_ids), np.inf)
+        np.minimum.at(prices, self.hotel_index, np.where(np.isnan(self.total_price), np.inf, self.total_price))
+        prices[np.isinf(prices)] = np.nan
+        return prices
+
+    def to_records(self):
+        """Returns rows of the table as dicts with hotel identifiers and meal names."""
+        return [
+            {
+                'hotel_id': self.hotel_ids[hotel_index],
+                'rate_index': int(rate_index),
+                'total_price': float(total_price),
+                'nights': int(nights),
+                'per_night_price': float(per_night_price),
+                'meal': self.meals[meal_code],
+                'free_cancellation': bool(free_cancellation),
+            }
+            for hotel_index, rate_index, total_price, nights, per_night_price, meal_code, free_cancellation
+            in zip(*(getattr(self, name) for name in self.COLUMNS))
+        ]
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.compression
+~~~~~~~~~~~~~~~
+
+This module contains compression of request and response bodies.
+"""
+
+import gzip
+import threading
+import zlib
+from io import BytesIO
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+from .exceptions import ETGException, NetworkException
+
+#: Content encodings supported by the client in the order of preference.
+ENCODINGS = ('zstd', 'br', 'gzip')
+
+#: Default compression levels of request bodies, tuned for speed rather than ratio.
+DEFAULT_LEVELS = {'zstd': 3, 'br': 4, 'gzip': 5}
+
+
+def available_encodings():
+    """Returns the supported content encodings whose libraries are installed, in the order of preference."""
+    installed = {'zstd': zstandard is not None, 'br': brotli is not None, 'gzip': True}
+    return tuple(encoding for encoding in ENCODINGS if installed[encoding])
+
+
+class Compression:
+
+    """
+    Negotiation of compressed responses and compression of request bodies.
+
+    Responses are decompressed by the client while they are downloaded, so the decompressed chunks go
+    straight to the JSON decoder, and sizes of the bodies on the wire are counted::
+
+        client = ETGHotelsClient(auth, compression=Compression())
+        client.search_by_region(6308866, checkin, checkout, guests)
+        client.compression.stats()  # {'bytes_received': 1843120, 'wire_bytes_received': 151233, ...}
+    """
+
+    def __init__(self, encodings=None, request_encoding=None, min_request_size=1024, level=None):
+        """Init.
+
+        :param encodings: (optional) accepted encodings of responses in the order of preference,
+            e.g. ('zstd', 'gzip'), by default all installed ones.
+        :type encodings: tuple[str] or None
+        :param request_encoding: (optional) encoding of POST bodies, e.g. 'gzip', by default bodies are sent
+            as is. Use it only with endpoints accepting compressed bodies.
+        :type request_encoding: str or None
+        :param min_request_size: (optional) minimum size in bytes of the compressed bodies, defaults to 1024.
+        :type min_request_size: int
+        :param level: (optional) compression level of request bodies, by default a fast one.
+        :type level: int or None
+        """
+        installed = available_encodings()
+        self.encodings = tuple(encodings) if encodings is not None else installed
+        for encoding in self.encodings + ((request_encoding,) if request_encoding is not None else ()):
+            if encoding not in ENCODINGS:
+                raise ValueError('Unknown encoding {0}, expected one of {1}'.format(encoding, ', '.join(ENCODINGS)))
+            if encoding not in installed:
+                raise ImportError('Encoding {0} requires {1}, install it with `pip install etg[compression]`.'
+                                  .format(encoding, 'brotli' if encoding == 'br' else 'zstandard'))
+        self.request_encoding = request_encoding
+        self.min_request_size = min_request_size
+        self.level = level if level is not None else DEFAULT_LEVELS.get(request_encoding)
+
+        #: Value of Accept-Encoding header of requests.
+        self.accept_encoding = ', '.join(self.encodings) or 'identity'
+
+        self._lock = threading.Lock()
+        self._stats = dict(bytes_sent=0, wire_bytes_sent=0, bytes_received=0, wire_bytes_received=0)
+
+    def encode(self, body):
+        """Returns the body to send and headers of the request.
+
+        :param body: body of the request.
+        :type body: bytes or None
+        :rtype: (bytes or None, dict)
+        """
+        headers = {'Accept-Encoding': self.accept_encoding}
+        if body is None:
+            return body, headers
+        size = len(body)
+        if self.request_encoding is not None and size >= self.min_request_size:
+            body = compress(body, self.request_encoding, self.level)
+            headers['Content-Encoding'] = self.request_encoding
+        self.record(sent=size, wire_sent=len(body))
+        return body, headers
+
+    def decoder(self, encoding):
+        """Returns the incremental decoder of response bodies in the content encoding.
+
+        :raises ETGException: if the encoding is not supported.
+        """
+        return _Decoder(encoding)
+
+    def read(self, r, chunk_size=64 * 1024):
+        """Reads and decompresses the body of the transport response.
+
+        :return: decompressed body and its size on the wire.
+        :rtype: (bytes, int)
+        """
+        decoder = self.decoder(r.content_encoding)
+        for chunk in r.iter_raw(chunk_size):
+            decoder.feed(chunk)
+        content = decoder.close()
+        self.record(received=len(content), wire_received=decoder.wire_size)
+        return content, decoder.wire_size
+
+    async def aread(self, r, chunk_size=64 * 1024):
+        """Reads and decompresses the body of the async transport response, see :meth:`read`."""
+        decoder = self.decoder(r.content_encoding)
+        async for chunk in r.aiter_raw(chunk_size):
+            decoder.feed(chunk)
+        content = decoder.close()
+        self.record(received=len(content), wire_received=decoder.wire_size)
+        return content, decoder.wire_size
+
+    def record(self, sent=0, wire_sent=0, received=0, wire_received=0):
+        """Adds sizes of bodies to the statistics."""
+        with self._lock:
+            stats = self._stats
+            stats['bytes_sent'] += sent
+            stats['wire_bytes_sent'] += wire_sent
+            stats['bytes_received'] += received
+            stats['wire_bytes_received'] += wire_received
+
+    def stats(self):
+        """Returns total sizes in bytes of the bodies and their sizes on the wire.
+
+        :return: 'bytes_sent', 'wire_bytes_sent', 'bytes_received', 'wire_bytes_received',
+            and 'ratio' of received bytes to the received ones on the wire.
+        :rtype: dict
+        """
+        with self._lock:
+            stats = dict(self._stats)
+        wire = stats['wire_bytes_received']
+        stats['ratio'] = stats['bytes_received'] / wire if wire else None
+        return stats
+
+
+class _Decoder:
+    """Incremental decoder of a response body, counting its size on the wire."""
+
+    def __init__(self, encoding):
+        self.encoding = (encoding or 'identity').strip().lower()
+        self.wire_size = 0
+        self._chunks = list()
+        if self.encoding == 'identity':
+            self._decompress, self._flush = None, None
+        elif self.encoding in ('gzip', 'x-gzip'):
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            self._decompress, self._flush = decompressor.decompress, decompressor.flush
+        elif self.encoding == 'deflate':
+            decompressor = zlib.decompressobj()
+            self._decompress, self._flush = decompressor.decompress, decompressor.flush
+        elif self.encoding == 'br' and brotli is not None:
+            decompressor = brotli.Decompressor()
+            self._decompress = getattr(decompressor, 'process', None) or decompressor.decompress
+            self._flush = bytes
+        elif self.encoding == 'zstd' and zstandard is not None:
+            decompressor = zstandard.ZstdDecompressor().decompressobj()
+            self._decompress, self._flush = decompressor.decompress, bytes
+        else:
+            raise ETGException('Unsupported content encoding {0} of the response'.format(encoding))
+
+    def decompress(self, chunk):
+        """Returns the decompressed part of the chunk received from the wire."""
+        self.wire_size += len(chunk)
+        if self._decompress is None:
+            return chunk
+        try:
+            return self._decompress(chunk)
+        except Exception as ex:
+            raise NetworkException('Failed to decompress {0} response: {1}'.format(self.encoding, ex)) from ex
+
+    def flush(self):
+        """Returns the rest of the decompressed body."""
+        if self._flush is None:
+            return b''
+        try:
+            return self._flush()
+        except Exception as ex:
+            raise NetworkException('Failed to decompress {0} response: {1}'.format(self.encoding, ex)) from ex
+
+    def feed(self, chunk):
+        self._chunks.append(self.decompress(chunk))
+
+    def close(self):
+        self._chunks.append(self.flush())
+        return b''.join(self._chunks)
+
+
+def compress(body, encoding, level=None):
+    """Returns the body compressed with the content encoding."""
+    level = level if level is not None else DEFAULT_LEVELS[encoding]
+    if encoding == 'gzip':
+        # gzip.compress takes mtime since Python 3.8 only
+        buf = BytesIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', compresslevel=level, mtime=0) as f:
+            f.write(body)
+        return buf.getvalue()
+    if encoding == 'br':
+        return brotli.compress(body, quality=level)
+    if encoding == 'zstd':
+        return zstandard.ZstdCompressor(level=level).compress(body)
+    raise ValueError('Unknown encoding {0}'.format(encoding))
+
+
+def decompress(body, encoding):
+    """Returns the body decompressed from the content encoding."""
+    decoder = _Decoder(encoding)
+    decoder.feed(body)
+    return decoder.close()
@@ -18,3 +18,43 @@ class BadRequestException(ETGException, ValueError):
 
 class AuthErrorException(ETGException, ValueError):
     """Authentication failed."""
+
+
+class TransientException(ETGException):
+    """Temporary failure, the request may succeed if it is sent again."""
+
+
+class RateLimitExceededException(TransientException):
+    """Request limit of the endpoint is exceeded."""
+
+
+class ServerErrorException(TransientException):
+    """API Gateway failed to handle the request."""
+
+
+class NetworkException(TransientException):
+    """Connection to API Gateway failed or timed out."""
+
+
+class CircuitOpenException(ETGException):
+    """Requests to the endpoint are suspended after too many failures."""
+
+
+class PartialResultException(ETGException):
+    """Some of the requests sent on behalf of one call failed.
+
+    Results of the successful requests are kept in ``results``, errors are kept in ``errors``.
+    """
+    def __init__(self, results, errors):
+        super().__init__('{0} request(s) failed: {1}'.format(
+            len(errors), '; '.join(str(error) for error in errors.values())))
+        self.results = results
+        self.errors = errors
+
+
+class DeadlineExceededException(ETGException):
+    """Deadline of the call passed before the response was received."""
+
+
+class ReplayMissException(ETGException, LookupError):
+    """No response to the request was recorded for replay."""
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.export
+~~~~~~~~~~
+
+This module contains the writer of search results into Arrow record batches.
+"""
+
+import datetime
+import json
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover
+    pa = pq = None
+
+from .codec import MultiJSONEncoder
+from .filters import rate_price
+from .models.hotels import Rate
+
+
+def _schema():
+    return pa.schema([
+        ('fetched_at', pa.timestamp('us', tz='UTC')),
+        ('checkin', pa.date32()),
+        ('checkout', pa.date32()),
+        ('guests', pa.string()),
+        ('currency', pa.string()),
+        ('residency', pa.string()),
+        ('language', pa.string()),
+        ('hotel_id', pa.string()),
+        ('rate_index', pa.int32()),
+        ('book_hash', pa.string()),
+        ('match_hash', pa.string()),
+        ('room_name', pa.string()),
+        ('meal', pa.string()),
+        ('total_price', pa.float64()),
+        ('currency_code', pa.string()),
+        ('daily_prices', pa.list_(pa.float64())),
+        ('free_cancellation_before', pa.string()),
+    ])
+
+
+class SerpWriter:
+
+    """
+    Writer of search and hotelpage results into Parquet file or Arrow IPC stream, one row per rate.
+
+    Rows are buffered up to ``batch_size`` and written as record batches, so memory stays bounded
+    however many results are written. Hotels without rates are written as one row without rate fields.
+    """
+
+    def __init__(self, sink, format='parquet', batch_size=10000, compression='zstd'):
+        """Init.
+
+        :param sink: path or writable binary file.
+        :type sink: str or file
+        :param format: (optional) 'parquet' or 'ipc' (Arrow streaming format), defaults to 'parquet'.
+        :type format: str
+        :param batch_size: (optional) number of rows in one record batch, defaults to 10000.
+        :type batch_size: int
+        :param compression: (optional) compression codec of Parquet file, defaults to 'zstd'.
+        :type compression: str or None
+        """
+        if pa is None:
+            raise ImportError('SerpWriter requires pyarrow, install it with `pip install etg[export]`.')
+        if format not in ('parquet', 'ipc'):
+            raise ValueError('Unknown format: {0}'.format(format))
+
+        self.schema = _schema()
+        self.batch_size = batch_size
+        if format == 'parquet':
+            self._writer = pq.ParquetWriter(sink, self.schema, compression=compression)
+        else:
+            self._writer = pa.ipc.new_stream(sink, self.schema)
+        self._columns = {name: list() for name in self.schema.names}
+
+        #: Number of written rows.
+        self.rows = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, hotels, params, fetched_at=None):
+        """Adds the results of one request.
+
+        :param hotels: hotels of ``search``, ``iter_search`` or the hotel of ``hotelpage``,
+            as dicts or :class:`etg.Hotel` objects.
+        :type hotels: collections.abc.Iterable or dict or etg.Hotel
+        :param params: parameters of the request: ``checkin``, ``checkout``, ``guests``,
+            and optional ``currency``, ``residency``, ``language``.
+        :type params: dict
+        :param fetched_at: (optional) time the results were received, defaults to now.
+        :type fetched_at: datetime.datetime or None
+        """
+        if hotels is None:
+            return
+        if isinstance(hotels, dict) or hasattr(hotels, 'rates'):
+            hotels = [hotels]
+
+        request = (
+            fetched_at or datetime.datetime.now(datetime.timezone.utc),
+            _date(params.get('checkin')),
+            _date(params.get('checkout')),
+            json.dumps(params.get('guests'), cls=MultiJSONEncoder),
+            params.get('currency'),
+            params.get('residency'),
+            params.get('language'),
+        )
+        for hotel in hotels:
+            rates = hotel.get('rates') or [None]
+            for i, rate in enumerate(rates):
+                self._append(request, hotel.get('id'), i, rate)
+
+    def flush(self):
+        """Writes the buffered rows as a record batch."""
+        if not self._columns['hotel_id']:
+            return
+        batch = pa.RecordBatch.from_pydict(self._columns, schema=self.schema)
+        self._writer.write_batch(batch)
+        self.rows += batch.num_rows
+        for values in self._columns.values():
+            del values[:]
+
+    def close(self):
+        """Writes the buffered rows and closes the file."""
+        self.flush()
+        self._writer.close()
+
+    def _append(self, request, hotel_id, rate_index, rate):
+        columns = self._columns
+        for name, value in zip(('fetched_at', 'checkin', 'checkout', 'guests', 'currency', 'residency', 'language'),
+                               request):
+            columns[name].append(value)
+        columns['hotel_id'].append(hotel_id)
+        if rate is None:
+            for name in self.schema.names[8:]:
+                columns[name].append(None)
+        else:
+            currency_code, free_cancellation_before = _payment_terms(rate)
+            columns['rate_index'].append(rate_index)
+            columns['book_hash'].append(rate.get('book_hash'))
+            columns['match_hash'].append(rate.get('match_hash'))
+            columns['room_name'].append(rate.get('room_name'))
+            columns['meal'].append(rate.get('meal'))
+            columns['total_price'].append(rate_price(rate))
+            columns['currency_code'].append(currency_code)
+            columns['daily_prices'].append([float(price) for price in rate.get('daily_prices') or []])
+            columns['free_cancellation_before'].append(free_cancellation_before)
+
+        if len(columns['hotel_id']) >= self.batch_size:
+            self.flush()
+
+
+def _payment_terms(rate):
+    """Returns currency code and the time of free cancellation deadline of the rate."""
+    if isinstance(rate, Rate):
+        return rate.currency_code, rate.free_cancellation_before
+    payment_types = (rate.get('payment_options') or {}).get('payment_types') or [{}]
+    penalties = payment_types[0].get('cancellation_penalties') or {}
+    return (payment_types[0].get('show_currency_code') or payment_types[0].get('currency_code'),
+            penalties.get('free_cancellation_before'))
+
+
+def _date(value):
+    """Returns the date from ``datetime.date`` or 'YYYY-MM-DD' string."""
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    return value
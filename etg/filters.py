@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.filters
+~~~~~~~~~~~
+
+This module contains client-side filtering and top-K selection of search results.
+"""
+
+import heapq
+import itertools
+
+from .models.hotels import Hotel, Rate
+
+
+def rate_price(rate):
+    """Returns the price of the rate for the whole stay in the shown currency.
+
+    :param rate: rate of the search response.
+    :type rate: dict or Rate
+    :rtype: float or None
+    """
+    if isinstance(rate, Rate):
+        return rate.amount if rate.amount is not None else (sum(rate.get('daily_prices')) or None)
+    payment_types = (rate.get('payment_options') or {}).get('payment_types') or []
+    if payment_types:
+        amount = payment_types[0].get('show_amount') or payment_types[0].get('amount')
+        if amount is not None:
+            return float(amount)
+    daily_prices = rate.get('daily_prices')
+    if daily_prices:
+        return sum(float(price) for price in daily_prices)
+    return None
+
+
+def has_free_cancellation(rate):
+    """Returns True if the rate can be cancelled free of charge.
+
+    :param rate: rate of the search response.
+    :type rate: dict or Rate
+    :rtype: bool
+    """
+    if isinstance(rate, Rate):
+        return rate.free_cancellation_before is not None
+    payment_types = (rate.get('payment_options') or {}).get('payment_types') or []
+    if not payment_types:
+        return False
+    penalties = payment_types[0].get('cancellation_penalties') or {}
+    return penalties.get('free_cancellation_before') is not None
+
+
+def cheapest_price(hotel):
+    """Returns the price of the cheapest rate of the hotel, it is the default ordering of top-K selection."""
+    prices = [price for price in map(rate_price, hotel.get('rates') or []) if price is not None]
+    return min(prices) if prices else float('inf')
+
+
+class RateFilter:
+
+    """
+    Predicate of rates by price, meal and cancellation conditions.
+    """
+
+    def __init__(self, max_price=None, min_price=None, meals=None, free_cancellation=None, predicate=None):
+        """Init.
+
+        :param max_price: (optional) maximum price for the whole stay.
+        :type max_price: float or None
+        :param min_price: (optional) minimum price for the whole stay.
+        :type min_price: float or None
+        :param meals: (optional) acceptable meal types, e.g. ('breakfast', 'half-board').
+        :type meals: collections.abc.Container[str] or None
+        :param free_cancellation: (optional) whether the rate must (True) or must not (False) be cancellable
+            free of charge.
+        :type free_cancellation: bool or None
+        :param predicate: (optional) additional condition taking the rate.
+        :type predicate: callable or None
+        """
+        self.max_price = max_price
+        self.min_price = min_price
+        self.meals = meals
+        self.free_cancellation = free_cancellation
+        self.predicate = predicate
+
+    def __call__(self, rate):
+        """Returns True if the rate meets the conditions."""
+        if self.max_price is not None or self.min_price is not None:
+            price = rate_price(rate)
+            if price is None:
+                return False
+            if self.max_price is not None and price > self.max_price:
+                return False
+            if self.min_price is not None and price < self.min_price:
+                return False
+        if self.meals is not None and rate.get('meal') not in self.meals:
+            return False
+        if self.free_cancellation is not None and has_free_cancellation(rate) != self.free_cancellation:
+            return False
+        if self.predicate is not None and not self.predicate(rate):
+            return False
+        return True
+
+
+class HotelSelector:
+
+    """
+    Filters rates of hotels as they arrive and keeps only the top-K hotels in a bounded heap.
+
+    Hotels without acceptable rates are dropped right away.
+    """
+
+    def __init__(self, rate_filter=None, top_k=None, key=None):
+        """Init.
+
+        :param rate_filter: (optional) predicate of acceptable rates, e.g. :class:`RateFilter`.
+        :type rate_filter: callable or None
+        :param top_k: (optional) number of the best hotels to keep, by default all acceptable hotels are kept.
+        :type top_k: int or None
+        :param key: (optional) ordering of hotels, the least values are the best,
+            defaults to the price of the cheapest acceptable rate.
+        :type key: callable or None
+        """
+        self.rate_filter = rate_filter
+        self.top_k = top_k
+        self.key = key if key is not None else cheapest_price
+
+        self._hotels = list()
+        self._counter = itertools.count()
+
+    def add(self, hotel):
+        """Takes the next hotel of the search results."""
+        if self.rate_filter is not None:
+            hotel = filter_rates(hotel, self.rate_filter)
+            if hotel is None:
+                return
+
+        if self.top_k is None:
+            self._hotels.append(hotel)
+            return
+
+        # max-heap by the key, so the worst kept hotel is popped first
+        item = (_Reversed(self.key(hotel)), -next(self._counter), hotel)
+        if len(self._hotels) < self.top_k:
+            heapq.heappush(self._hotels, item)
+        elif self._hotels and item > self._hotels[0]:
+            heapq.heapreplace(self._hotels, item)
+
+    def result(self):
+        """Returns the selected hotels, ordered by the key if ``top_k`` is set."""
+        if self.top_k is None:
+            return list(self._hotels)
+        return [hotel for _, _, hotel in sorted(self._hotels, reverse=True)]
+
+
+def filter_rates(hotel, rate_filter):
+    """Returns the hotel with the acceptable rates only, or None if it has no acceptable rates.
+
+    :param hotel: hotel of the search response.
+    :type hotel: dict or Hotel
+    :param rate_filter: predicate of acceptable rates, e.g. :class:`RateFilter`.
+    :type rate_filter: callable
+    :rtype: dict or Hotel or None
+    """
+    rates = [rate for rate in hotel.get('rates') or [] if rate_filter(rate)]
+    if not rates:
+        return None
+    # the hotel may be shared with the response cache, so it is copied instead of modified
+    return hotel.replace(rates=rates) if isinstance(hotel, Hotel) else dict(hotel, rates=rates)
+
+
+def select_hotels(hotels, rate_filter=None, top_k=None, key=None):
+    """Filters rates of the hotels and selects top-K hotels, see :class:`HotelSelector`.
+
+    :param hotels: hotels of the search response.
+    :type hotels: collections.abc.Iterable[dict]
+    :rtype: list[dict]
+    """
+    selector = HotelSelector(rate_filter=rate_filter, top_k=top_k, key=key)
+    for hotel in hotels:
+        selector.add(hotel)
+    return selector.result()
+
+
+class _Reversed:
+    """Wrapper reversing the ordering of the value."""
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __gt__(self, other):
+        return self.value < other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.hedging
+~~~~~~~~~~~
+
+This module contains hedging of requests to idempotent endpoints.
+"""
+
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, wait
+
+from .exceptions import ETGException, TransientException
+from .ratelimit import endpoint_key
+
+
+class HedgingPolicy:
+
+    """
+    Sends a duplicate of a slow request to an idempotent endpoint, the first response wins.
+
+    The duplicate goes out when the request takes longer than the given percentile
+    of the recent latencies of the endpoint, so only the slowest requests are hedged.
+    """
+    #: Endpoints with any of these prefixes are hedged.
+    HEDGEABLE_PREFIXES = (
+        'search/serp/',
+        'search/hp/',
+        'search/multicomplete/',
+    )
+
+    def __init__(self, percentile=95, delay=1.0, min_samples=20, window=200):
+        """Init.
+
+        :param percentile: (optional) percentile of recent latencies after which the duplicate is sent,
+            defaults to 95.
+        :type percentile: float
+        :param delay: (optional) delay in seconds used until ``min_samples`` latencies are observed,
+            defaults to 1.0.
+        :type delay: float
+        :param min_samples: (optional) minimum number of latencies to estimate the percentile, defaults to 20.
+        :type min_samples: int
+        :param window: (optional) number of recent latencies kept by endpoint, defaults to 200.
+        :type window: int
+        """
+        self.percentile = percentile
+        self.delay = delay
+        self.min_samples = min_samples
+        self.window = window
+
+        #: Number of duplicate requests sent.
+        self.hedged = 0
+
+        self._lock = threading.Lock()
+        self._latencies = dict()
+
+    def is_hedgeable(self, endpoint):
+        """Returns True if requests to the endpoint may be duplicated."""
+        return endpoint_key(endpoint).startswith(self.HEDGEABLE_PREFIXES)
+
+    def observe(self, endpoint, elapsed):
+        """Records the latency in seconds of the response of the endpoint."""
+        key = endpoint_key(endpoint)
+        with self._lock:
+            latencies = self._latencies.get(key)
+            if latencies is None:
+                latencies = self._latencies[key] = deque(maxlen=self.window)
+            latencies.append(elapsed)
+
+    def hedge_delay(self, endpoint):
+        """Returns the delay in seconds after which the duplicate request is sent."""
+        with self._lock:
+            latencies = sorted(self._latencies.get(endpoint_key(endpoint), ()))
+        if len(latencies) < self.min_samples:
+            return self.delay
+        index = min(int(len(latencies) * self.percentile / 100.0), len(latencies) - 1)
+        return latencies[index]
+
+    def call(self, executor, endpoint, fn, discard=None):
+        """Calls the function in the executor, calls it once again if the first call is slow.
+
+        The delay is counted from the time the first call starts, not from the time it waited for a worker.
+        Exceptions of API are results as well, transient and unknown exceptions wait for the pending call.
+        The losing call is cancelled if it has not started yet.
+
+        :param executor: executor running the calls.
+        :type executor: concurrent.futures.Executor
+        :param fn: function sending the request.
+        :type fn: callable
+        :param discard: (optional) function called with the result of the losing call when it completes,
+            e.g. closing its response.
+        :type discard: callable or None
+        :return: result of the first completed call.
+        """
+        started = threading.Event()
+
+        def first():
+            started.set()
+            return fn()
+
+        pending = {executor.submit(first)}
+        started.wait()
+        done, pending = wait(pending, timeout=self.hedge_delay(endpoint))
+        if not done:
+            self.hedged += 1
+            pending.add(executor.submit(fn))
+
+        try:
+            while True:
+                if not done:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                future = done.pop()
+                ex = future.exception()
+                if ex is None or _is_final(ex) or not (done or pending):
+                    return future.result()
+        finally:
+            for other in done | pending:
+                if not other.cancel() and discard is not None:
+                    other.add_done_callback(lambda f: _discard(f, discard))
+
+    async def call_async(self, endpoint, fn, discard=None):
+        """Awaits the coroutine function, awaits it once again if the first call is slow.
+
+        See :meth:`call`, the slower call is cancelled.
+
+        :param fn: coroutine function sending the request.
+        :type fn: callable
+        :param discard: (optional) coroutine function awaited with the result of the losing call
+            if it completed as well, e.g. closing its response.
+        :type discard: callable or None
+        :return: result of the first completed call.
+        """
+        pending = {asyncio.ensure_future(fn())}
+        done = set()
+        try:
+            done, pending = await asyncio.wait(pending, timeout=self.hedge_delay(endpoint))
+            if not done:
+                self.hedged += 1
+                pending.add(asyncio.ensure_future(fn()))
+
+            while True:
+                if not done:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                task = done.pop()
+                ex = task.exception()
+                if ex is None or _is_final(ex) or not (done or pending):
+                    return task.result()
+        finally:
+            for task in pending:
+                task.cancel()
+            if discard is not None:
+                for task in done:
+                    if not task.cancelled() and task.exception() is None:
+                        await discard(task.result())
+
+
+def _discard(future, discard):
+    """Passes the result of the completed losing call to the discard function."""
+    if not future.cancelled() and future.exception() is None:
+        discard(future.result())
+
+
+def _is_final(ex):
+    """Returns True if the exception is an answer of API which the duplicate request would get as well."""
+    return isinstance(ex, ETGException) and not isinstance(ex, TransientException)
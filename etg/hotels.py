@@ -1,17 +1,51 @@
 # -*- coding: utf-8 -*-
 import datetime
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from .client import ETGClient
+from .exceptions import PartialResultException
+from .filters import filter_rates, select_hotels
 from .models.hotels import (
-    GuestData,
+    GuestData, Hotel, SearchCombination,
 )
+from .streaming import ijson
+from .utils import chunked, parallel_map
+
+#: Number of regions in one page of ``region_list`` if the limit is not given.
+REGION_LIST_DEFAULT_LIMIT = 1000
 
 
 class ETGHotelsClient(ETGClient):
+    def __init__(self, auth, autocomplete_index=None, autocomplete_cache=None, typed_models=False,
+                 **kwargs):
+        """Init.
+
+        :param auth: user (key_id) and password (key) for basic auth.
+        :type auth: (str, str)
+        :param autocomplete_index: (optional) local index answering ``autocomplete`` queries,
+            API is requested only if nothing is found in the index.
+        :type autocomplete_index: etg.AutocompleteIndex or None
+        :param autocomplete_cache: (optional) cache of ``autocomplete`` results received from API.
+        :type autocomplete_cache: etg.AutocompleteCache or None
+        :param typed_models: (optional) whether to return hotels of ``search``, ``iter_search`` and ``hotelpage``
+            as compact :class:`etg.Hotel` objects instead of dicts, defaults to False.
+        :type typed_models: bool
+        :param kwargs: optional parameters.
+            For more information, see the description of ``ETGClient.__init__`` method.
+        """
+        super().__init__(auth, **kwargs)
+        self.autocomplete_index = autocomplete_index
+        self.autocomplete_cache = autocomplete_cache
+        self.typed_models = typed_models
+
     def autocomplete(self, query,
                      language=None):
         """Finds regions and hotels by a part of their names.
 
+        If the client has ``autocomplete_index``, the index is searched first,
+        then ``autocomplete_cache`` is checked before requesting API.
+
         :param query: part of hotel or region name.
         :type query: str
         :param language: (optional) language of the response, e.g. 'en', 'ru'.
@@ -19,21 +53,38 @@ class ETGHotelsClient(ETGClient):
         :return: suggested hotels and regions, no more than 5 objects for each category.
         :rtype: dict
         """
-        endpoint = 'api/b2b/v3/search/multicomplete/'
-        data = {
-            'query': query,
-            'language': language,
-        }
+        if self.autocomplete_index is not None:
+            response = self.autocomplete_index.search(query, language=language)
+            if response['hotels'] or response['regions']:
+                return response
+
+        if self.autocomplete_cache is not None:
+            response = self.autocomplete_cache.get(query, language=language)
+            if response is not None:
+                return response
+
+        endpoint, data = _autocomplete_params(query, language=language)
         response = self.request('POST', endpoint, data=data)
+
+        if self.autocomplete_cache is not None and isinstance(response, dict):
+            self.autocomplete_cache.put(query, response, language=language)
         return response
 
     def search(self, ids, checkin, checkout, guests,
                currency=None, residency=None, timeout=None, upsells=None,
-               language=None):
+               language=None, rate_filter=None, top_k=None, key=None, stream=False, deadline=None):
         """Searches hotels with available accommodation that meets the given conditions.
 
         It is not recommended to let the users choose the rates from this method response.
 
+        If ``rate_filter`` or ``top_k`` is given, the response is decoded by the codec of the client and
+        the conditions are applied hotel by hotel. With ``stream`` the response is parsed incrementally instead
+        (when ijson is installed), so rejected hotels and rates of very large responses are not kept in memory,
+        at the cost of slower decoding.
+
+        If ``deadline`` is given, the response timeout of API is cut down to the time left,
+        so API returns the rates found so far instead of the client giving up.
+
         :param ids: list of hotels identifiers or region identifier.
         :type ids: list[str] or int
         :param checkin: check-in date, no later than 366 days from today.
@@ -57,37 +108,39 @@ class ETGHotelsClient(ETGClient):
         :param language: (optional) language of static information in the response, e.g. 'en', 'ru'.
             Default value is contract language.
         :type language: str or None
+        :param rate_filter: (optional) predicate of acceptable rates, e.g. :class:`etg.RateFilter`,
+            hotels without acceptable rates are dropped.
+        :type rate_filter: callable or None
+        :param top_k: (optional) number of the best hotels to return.
+        :type top_k: int or None
+        :param key: (optional) ordering of hotels for ``top_k``, the least values are the best,
+            defaults to the price of the cheapest acceptable rate.
+        :type key: callable or None
+        :param stream: (optional) whether to parse the response incrementally, defaults to False.
+        :type stream: bool
+        :param deadline: (optional) time of :func:`time.monotonic` by which the response must be received.
+        :type deadline: float or None
         :return: list of available hotels.
         :rtype: list
+        :raises DeadlineExceededException: if the deadline passed before the response was received.
         """
-        endpoint = None
-        if isinstance(ids, list):
-            endpoint = 'api/b2b/v3/search/serp/hotels/'
-        elif isinstance(ids, int):
-            endpoint = 'api/b2b/v3/search/serp/region/'
-        data = {
-            'ids': ids,
-            'region_id': ids,
-            'checkin': checkin.strftime('%Y-%m-%d'),
-            'checkout': checkout.strftime('%Y-%m-%d'),
-            'guests': guests,
-            'currency': currency,
-            'residency': residency,
-            'timeout': timeout,
-            'upsells': upsells if upsells is not None else {},
-            'language': language,
-        }
-        response = self.request('POST', endpoint, data=data)
+        endpoint, data = _search_params(ids, checkin, checkout, guests,
+                                       currency=currency, residency=residency, timeout=timeout,
+                                       upsells=upsells, language=language, deadline=deadline)
+        if stream and _is_streamable(self, endpoint):
+            hotels = self.stream('POST', endpoint, data=data, deadline=deadline)
+        else:
+            hotels = _serp_hotels(self.request('POST', endpoint, data=data, deadline=deadline))
+            if rate_filter is None and top_k is None:
+                return _hotel_models(self, hotels)
+        return _hotel_models(self, select_hotels(hotels or [], rate_filter=rate_filter, top_k=top_k, key=key))
 
-        hotels = list()
-        if isinstance(response, dict):
-            hotels = response.get('hotels')
-
-        return hotels
-
-    def search_by_hotels(self, ids, checkin, checkout, guests, **kwargs):
+    def search_by_hotels(self, ids, checkin, checkout, guests, chunk_size=None, max_workers=None, **kwargs):
         """Searches hotels with available accommodation that meets the given conditions.
 
+        Long lists of hotels can be split into chunks, which are searched concurrently.
+        Resulting hotels are merged in the order of the chunks.
+
         :param ids: list of hotels identifiers.
         :type ids: list[str]
         :param checkin: check-in date, no later than 366 days from today.
@@ -97,12 +150,36 @@ class ETGHotelsClient(ETGClient):
         :param guests: list of guests in the rooms.
             The max number of rooms in one request is 6.
         :type guests: list[GuestData]
+        :param chunk_size: (optional) maximum number of hotels in one request, by default all hotels are sent at once.
+        :type chunk_size: int or None
+        :param max_workers: (optional) maximum number of chunks searched at a time,
+            defaults to the connection pool size.
+        :type max_workers: int or None
         :param kwargs: optional parameters.
             For more information, see the description of ``self.search`` method.
         :return: list of available hotels (Hotels Search Engine Results Page).
         :rtype: list
+        :raises PartialResultException: if some of the chunks failed,
+            ``results`` contains hotels found by the other chunks,
+            ``errors`` maps tuples of hotels identifiers of the failed chunks to the exceptions.
         """
-        return self.search(ids, checkin, checkout, guests, **kwargs)
+        if chunk_size is None or len(ids) <= chunk_size:
+            return self.search(ids, checkin, checkout, guests, **kwargs)
+
+        chunks = chunked(ids, chunk_size)
+        results, errors = parallel_map(
+            lambda chunk: self.search(chunk, checkin, checkout, guests, **kwargs),
+            chunks, max_workers=max_workers or min(len(chunks), self.pool_maxsize))
+
+        hotels = list()
+        for i in sorted(results):
+            hotels.extend(results[i] or [])
+        if kwargs.get('top_k') is not None:
+            hotels = select_hotels(hotels, top_k=kwargs['top_k'], key=kwargs.get('key'))
+        if errors:
+            raise PartialResultException(hotels, {tuple(chunks[i]): ex for i, ex in errors.items()})
+
+        return hotels
 
     def search_by_region(self, region_id, checkin, checkout, guests, **kwargs):
         """Searches hotels with available accommodation that meets the given conditions.
@@ -123,8 +200,71 @@ class ETGHotelsClient(ETGClient):
         """
         return self.search(region_id, checkin, checkout, guests, **kwargs)
 
+    def search_matrix(self, ids, dates, occupancies, residencies=(None,), max_workers=None, **kwargs):
+        """Searches hotels for every combination of dates, occupancies and residencies concurrently.
+
+        Identical combinations (including equal guests configurations) are searched only once.
+
+        :param ids: list of hotels identifiers or region identifier.
+        :type ids: list[str] or int
+        :param dates: check-in and check-out dates.
+        :type dates: list[(datetime.date, datetime.date)]
+        :param occupancies: guests configurations, each one is a list of guests in the rooms.
+        :type occupancies: list[list[GuestData]]
+        :param residencies: (optional) guest's nationalities, by default residency is not sent.
+        :type residencies: list[str or None]
+        :param max_workers: (optional) maximum number of searches at a time, defaults to the connection pool size.
+        :type max_workers: int or None
+        :param kwargs: optional parameters.
+            For more information, see the description of ``self.search`` method.
+        :return: available hotels by combination of search conditions.
+        :rtype: dict[SearchCombination, list]
+        :raises PartialResultException: if some of the searches failed,
+            ``results`` contains hotels of the successful combinations,
+            ``errors`` maps the failed combinations to the exceptions.
+        """
+        combinations = _search_combinations(dates, occupancies, residencies)
+        results, errors = parallel_map(
+            lambda c: self.search(ids, c.checkin, c.checkout, list(c.guests), residency=c.residency, **kwargs),
+            combinations, max_workers=max_workers or min(len(combinations), self.pool_maxsize))
+
+        return _combination_results(combinations, results, errors)
+
+    def iter_search(self, ids, checkin, checkout, guests, rate_filter=None, **kwargs):
+        """Searches hotels like ``self.search``, yields hotels while the response is downloaded.
+
+        Memory does not grow with the response size, which matters for big regions.
+        Errors of API are raised after all hotels are yielded.
+        Hotels are yielded in the order of the response, so ``top_k`` and ``key`` are not supported.
+
+        :param ids: list of hotels identifiers or region identifier.
+        :type ids: list[str] or int
+        :param checkin: check-in date, no later than 366 days from today.
+        :type checkin: datetime.date
+        :param checkout: check-out date, no later than 30 days from check-in date.
+        :type checkout: datetime.date
+        :param guests: list of guests in the rooms.
+            The max number of rooms in one request is 6.
+        :type guests: list[GuestData]
+        :param rate_filter: (optional) predicate of acceptable rates, e.g. :class:`etg.RateFilter`,
+            hotels without acceptable rates are skipped.
+        :type rate_filter: callable or None
+        :param kwargs: optional parameters.
+            For more information, see the description of ``self.search`` method.
+        :return: available hotels one at a time.
+        :rtype: collections.abc.Iterator[dict]
+        :raises TypeError: if ``top_k`` or ``key`` is given.
+        """
+        endpoint, data = _iter_search_params(ids, checkin, checkout, guests, **kwargs)
+        hotels = self.stream('POST', endpoint, data=data, deadline=kwargs.get('deadline'))
+        if rate_filter is not None:
+            hotels = filter(None, (filter_rates(hotel, rate_filter) for hotel in hotels))
+        if not self.typed_models:
+            return hotels
+        return map(Hotel.from_dict, hotels)
+
     def hotelpage(self, hotel_id, checkin, checkout, guests,
-                  currency=None, residency=None, upsells=None, language=None):
+                  currency=None, residency=None, upsells=None, language=None, deadline=None):
         """Returns actual rates for the given hotel.
 
         This request is necessary to make a booking via API.
@@ -153,26 +293,19 @@ class ETGHotelsClient(ETGClient):
         :param language: (optional) language of static information in the response, e.g. 'en', 'ru'.
             Default value is contract language.
         :type language: str or None
+        :param deadline: (optional) time of :func:`time.monotonic` by which the response must be received.
+        :type deadline: float or None
         :return: hotel info with actual available rates.
         :rtype: dict or None
+        :raises DeadlineExceededException: if the deadline passed before the response was received.
         """
-        endpoint = 'api/b2b/v3/search/hp/'
-        data = {
-            'id': hotel_id,
-            'checkin': checkin.strftime('%Y-%m-%d'),
-            'checkout': checkout.strftime('%Y-%m-%d'),
-            'guests': guests,
-            'currency': currency,
-            'residency': residency,
-            'upsells': upsells if upsells is not None else {},
-            'language': language,
-        }
-        response = self.request('POST', endpoint, data=data)
-
-        hotel = None
-        if isinstance(response, dict) and isinstance(response.get('hotels'), list) and len(response.get('hotels')):
-            hotel = response.get('hotels')[0]
-
+        endpoint, data = _hotelpage_params(hotel_id, checkin, checkout, guests,
+                                          currency=currency, residency=residency, upsells=upsells,
+                                          language=language)
+        response = self.request('POST', endpoint, data=data, deadline=deadline)
+        hotel = _hotelpage_hotel(response)
+        if hotel is not None and self.typed_models:
+            hotel = Hotel.from_dict(hotel)
         return hotel
 
     def make_reservation(self, partner_order_id, book_hash, language, user_ip):
@@ -189,13 +322,7 @@ class ETGHotelsClient(ETGClient):
         :return: reservation info.
         :rtype: dict
         """
-        endpoint = 'api/b2b/v3/hotel/order/booking/form/'
-        data = {
-            'partner_order_id': partner_order_id,
-            'book_hash': book_hash,
-            'language': language,
-            'user_ip': user_ip,
-        }
+        endpoint, data = _make_reservation_params(partner_order_id, book_hash, language, user_ip)
         response = self.request('POST', endpoint, data=data)
 
         return response
@@ -235,17 +362,9 @@ class ETGHotelsClient(ETGClient):
         :return: True if the reservation is completed.
         :rtype: bool
         """
-        endpoint = 'api/b2b/v3/hotel/order/booking/finish/'
-        data = {
-            'partner': partner,
-            'payment_type': payment_type,
-            'rooms': rooms,
-            'user': user,
-            'language': language,
-            'arrival_datetime': arrival_datetime,
-            'upsell_data': upsell_data if upsell_data is not None else [],
-            'return_path': return_path,
-        }
+        endpoint, data = _finish_reservation_params(partner, payment_type, rooms, user, language,
+                                                   arrival_datetime=arrival_datetime, upsell_data=upsell_data,
+                                                   return_path=return_path)
         self.request('POST', endpoint, data=data)
         return True
 
@@ -257,10 +376,7 @@ class ETGHotelsClient(ETGClient):
         :return: True if the reservation is canceled.
         :rtype: bool
         """
-        endpoint = 'api/b2b/v3/hotel/order/cancel/'
-        data = {
-            'partner_order_id': partner_order_id,
-        }
+        endpoint, data = _cancel_params(partner_order_id)
         self.request('POST', endpoint, data=data)
         return True
 
@@ -280,14 +396,199 @@ class ETGHotelsClient(ETGClient):
         :return: returns information about regions.
         :rtype: list
         """
-        data = dict()
-        if last_id is not None:
-            data['last_id'] = last_id
-        if limit is not None:
-            data['limit'] = limit
-        if types is not None:
-            data['types'] = types
-
-        regions = self.request('GET', '/region/list', data=data)
+        endpoint, data = _region_list_params(last_id=last_id, limit=limit, types=types)
+        regions = self.request('GET', endpoint, data=data)
 
         return regions
+
+    def iter_regions(self, last_id=None, limit=None, types=None):
+        """Iterates over all regions page by page, following ``last_id``.
+
+        The next page is requested in background while the current one is consumed,
+        so no more than two pages are held in memory.
+
+        :param last_id: (optional) all retrieved regions will have an ID that exceeds the given value.
+        :type last_id: int or None
+        :param limit: (optional) number of regions in one page, cannot exceed 10000, default value = 1000.
+        :type limit: int or None
+        :param types: (optional) condition for filtering regions by region type,
+            see the description of ``self.region_list`` method.
+        :type types: list[str] or None
+        :return: regions one at a time.
+        :rtype: collections.abc.Iterator[dict]
+        """
+        executor = ThreadPoolExecutor(max_workers=1)
+        try:
+            page = executor.submit(self.region_list, last_id=last_id, limit=limit, types=types).result()
+            while page:
+                next_page = None
+                if len(page) >= (limit or REGION_LIST_DEFAULT_LIMIT):
+                    next_page = executor.submit(self.region_list,
+                                                last_id=page[-1].get('id'), limit=limit, types=types)
+                for region in page:
+                    yield region
+                page = next_page.result() if next_page is not None else None
+        finally:
+            executor.shutdown(wait=False)
+
+
+def _autocomplete_params(query, language=None):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.autocomplete`."""
+    endpoint = 'api/b2b/v3/search/multicomplete/'
+    data = {
+        'query': query,
+        'language': language,
+    }
+    return endpoint, data
+
+
+def _iter_search_params(ids, checkin, checkout, guests, top_k=None, key=None, **kwargs):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.iter_search`."""
+    if top_k is not None or key is not None:
+        raise TypeError('iter_search yields hotels in the order of the response, use search for top_k and key')
+    return _search_params(ids, checkin, checkout, guests, **kwargs)
+
+
+def _search_params(ids, checkin, checkout, guests,
+                  currency=None, residency=None, timeout=None, upsells=None, language=None, deadline=None):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.search`."""
+    if deadline is not None:
+        # API takes whole seconds, leave it a second to send the response
+        remaining = max(int(deadline - time.monotonic()) - 1, 1)
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    endpoint = None
+    if isinstance(ids, list):
+        endpoint = 'api/b2b/v3/search/serp/hotels/'
+    elif isinstance(ids, int):
+        endpoint = 'api/b2b/v3/search/serp/region/'
+    data = {
+        'ids': ids,
+        'region_id': ids,
+        'checkin': checkin.strftime('%Y-%m-%d'),
+        'checkout': checkout.strftime('%Y-%m-%d'),
+        'guests': guests,
+        'currency': currency,
+        'residency': residency,
+        'timeout': timeout,
+        'upsells': upsells if upsells is not None else {},
+        'language': language,
+    }
+    return endpoint, data
+
+
+def _serp_hotels(response):
+    """Returns list of hotels from the search response data."""
+    hotels = list()
+    if isinstance(response, dict):
+        hotels = response.get('hotels')
+
+    return hotels
+
+
+def _search_combinations(dates, occupancies, residencies):
+    """Returns unique combinations of search conditions in the order of the arguments."""
+    combinations = dict()
+    for checkin, checkout in dates:
+        for guests in occupancies:
+            for residency in residencies:
+                combination = SearchCombination(checkin, checkout, tuple(guests), residency)
+                combinations.setdefault(combination, None)
+    return list(combinations)
+
+
+def _combination_results(combinations, results, errors):
+    """Returns search results by combination, raises :class:`PartialResultException` if some searches failed."""
+    hotels = {combinations[i]: results[i] for i in sorted(results)}
+    if errors:
+        raise PartialResultException(hotels, {combinations[i]: ex for i, ex in errors.items()})
+
+    return hotels
+
+
+def _hotel_models(client, hotels):
+    """Returns hotels as :class:`Hotel` objects if the client uses typed models."""
+    if not client.typed_models or hotels is None:
+        return hotels
+    return [Hotel.from_dict(hotel) for hotel in hotels]
+
+
+def _is_streamable(client, endpoint):
+    """Returns True if the response can be parsed incrementally, cached responses are decoded as a whole."""
+    return ijson is not None and not (client.cache is not None and client.cache.is_cacheable(endpoint))
+
+
+def _hotelpage_params(hotel_id, checkin, checkout, guests,
+                     currency=None, residency=None, upsells=None, language=None):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.hotelpage`."""
+    endpoint = 'api/b2b/v3/search/hp/'
+    data = {
+        'id': hotel_id,
+        'checkin': checkin.strftime('%Y-%m-%d'),
+        'checkout': checkout.strftime('%Y-%m-%d'),
+        'guests': guests,
+        'currency': currency,
+        'residency': residency,
+        'upsells': upsells if upsells is not None else {},
+        'language': language,
+    }
+    return endpoint, data
+
+
+def _hotelpage_hotel(response):
+    """Returns the hotel from the hotelpage response data."""
+    hotel = None
+    if isinstance(response, dict) and isinstance(response.get('hotels'), list) and len(response.get('hotels')):
+        hotel = response.get('hotels')[0]
+
+    return hotel
+
+
+def _make_reservation_params(partner_order_id, book_hash, language, user_ip):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.make_reservation`."""
+    endpoint = 'api/b2b/v3/hotel/order/booking/form/'
+    data = {
+        'partner_order_id': partner_order_id,
+        'book_hash': book_hash,
+        'language': language,
+        'user_ip': user_ip,
+    }
+    return endpoint, data
+
+
+def _finish_reservation_params(partner, payment_type, rooms, user, language,
+                              arrival_datetime=None, upsell_data=None, return_path=None):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.finish_reservation`."""
+    endpoint = 'api/b2b/v3/hotel/order/booking/finish/'
+    data = {
+        'partner': partner,
+        'payment_type': payment_type,
+        'rooms': rooms,
+        'user': user,
+        'language': language,
+        'arrival_datetime': arrival_datetime,
+        'upsell_data': upsell_data if upsell_data is not None else [],
+        'return_path': return_path,
+    }
+    return endpoint, data
+
+
+def _cancel_params(partner_order_id):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.cancel`."""
+    endpoint = 'api/b2b/v3/hotel/order/cancel/'
+    data = {
+        'partner_order_id': partner_order_id,
+    }
+    return endpoint, data
+
+
+def _region_list_params(last_id=None, limit=None, types=None):
+    """Returns endpoint and request data of :meth:`ETGHotelsClient.region_list`."""
+    endpoint = '/region/list'
+    data = dict()
+    if last_id is not None:
+        data['last_id'] = last_id
+    if limit is not None:
+        data['limit'] = limit
+    if types is not None:
+        data['types'] = types
+    return endpoint, data
@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.instrumentation
+~~~~~~~~~~~~~~~~~~~
+
+This module contains the hooks around requests and in-process latency metrics.
+"""
+
+import math
+import threading
+
+
+class RequestEvent:
+
+    """
+    Timings and sizes of one request passed to the listeners of :class:`Instrumentation`.
+
+    Times are in seconds since ``started``, they are None until the stage is reached.
+    """
+    __slots__ = (
+        'method', 'endpoint', 'request_size', 'wire_request_size', 'started', 'http_status', 'response_size',
+        'wire_response_size', 'headers_elapsed', 'body_elapsed', 'decode_elapsed', 'error',
+    )
+
+    def __init__(self, method, endpoint, request_size=0):
+        #: HTTP method of the request.
+        self.method = method
+
+        #: API endpoint the request was sent to.
+        self.endpoint = endpoint
+
+        #: Size of the request body in bytes.
+        self.request_size = request_size
+
+        #: Size of the request body on the wire, known if the client compresses bodies itself.
+        self.wire_request_size = None
+
+        #: Time of :func:`time.monotonic` when the request was sent.
+        self.started = None
+
+        #: HTTP status code of the response.
+        self.http_status = None
+
+        #: Size of the decompressed response body in bytes.
+        self.response_size = None
+
+        #: Size of the response body on the wire, known if the client decompresses responses itself.
+        self.wire_response_size = None
+
+        #: Time until the response headers were received, i.e. time spent by API.
+        self.headers_elapsed = None
+
+        #: Time until the response body was received.
+        self.body_elapsed = None
+
+        #: Time until the response body was decoded.
+        self.decode_elapsed = None
+
+        #: Exception of the failed request.
+        self.error = None
+
+    @property
+    def decode_time(self):
+        """Time spent decoding the response body."""
+        if self.decode_elapsed is None or self.body_elapsed is None:
+            return None
+        return self.decode_elapsed - self.body_elapsed
+
+    def __repr__(self):
+        return '<RequestEvent {0} {1} [{2}]>'.format(self.method, self.endpoint, self.http_status)
+
+
+class Instrumentation:
+
+    """
+    Registry of listeners called around every request of the client.
+
+    Listeners take :class:`RequestEvent`, their exceptions are propagated to the caller.
+    The client does not build events at all while no listener is registered.
+    """
+    #: Events in the order they are emitted, ``on_error`` replaces the rest once the request fails.
+    EVENTS = ('before_send', 'after_headers', 'after_body', 'after_decode', 'on_error')
+
+    def __init__(self):
+        self._listeners = {name: () for name in self.EVENTS}
+        self._lock = threading.Lock()
+
+        #: True if any listener is registered.
+        self.active = False
+
+    def subscribe(self, name, listener):
+        """Registers the listener of the event."""
+        if name not in self._listeners:
+            raise ValueError('Unknown event {0}, expected one of {1}'.format(name, ', '.join(self.EVENTS)))
+        with self._lock:
+            # listeners are replaced rather than appended, so emitting needs no lock
+            self._listeners[name] += (listener,)
+            self.active = True
+
+    def unsubscribe(self, name, listener):
+        """Removes the listener of the event."""
+        with self._lock:
+            listeners = list(self._listeners[name])
+            listeners.remove(listener)
+            self._listeners[name] = tuple(listeners)
+            self.active = any(self._listeners.values())
+
+    def emit(self, name, event):
+        """Calls the listeners of the event."""
+        for listener in self._listeners[name]:
+            listener(event)
+
+
+class LatencyHistogram:
+
+    """
+    Histogram of latencies with logarithmic buckets, relative error of percentiles is within ``precision``.
+    """
+
+    def __init__(self, precision=0.02, min_value=1e-4):
+        """Init.
+
+        :param precision: (optional) relative width of the buckets, defaults to 0.02.
+        :type precision: float
+        :param min_value: (optional) the least distinguished value, defaults to 0.1 ms.
+        :type min_value: float
+        """
+        self.min_value = min_value
+        self._log_base = math.log1p(precision)
+        self._counts = dict()
+
+        #: Number of recorded values.
+        self.count = 0
+
+        #: Sum of recorded values.
+        self.total = 0.0
+
+    def record(self, value):
+        """Records the value."""
+        index = int(math.log(value / self.min_value) / self._log_base) if value > self.min_value else 0
+        self._counts[index] = self._counts.get(index, 0) + 1
+        self.count += 1
+        self.total += value
+
+    def percentile(self, q):
+        """Returns the value of the percentile (0..100), None if nothing is recorded."""
+        if not self.count:
+            return None
+        rank = max(math.ceil(self.count * q / 100.0), 1)
+        seen = 0
+        for index in sorted(self._counts):
+            seen += self._counts[index]
+            if seen >= rank:
+                # the middle of the bucket
+                return self.min_value * math.exp((index + 0.5) * self._log_base)
+
+
+class LatencyMetrics:
+
+    """
+    Per-endpoint histograms of request latencies, built-in listener of :class:`Instrumentation`.
+
+    Besides the total time it keeps the time to headers (spent by API), body download and decoding.
+    """
+    #: Stages of the request kept in separate histograms.
+    STAGES = ('total', 'headers', 'body', 'decode')
+
+    def __init__(self, precision=0.02):
+        """Init.
+
+        :param precision: (optional) relative error of percentiles, defaults to 0.02.
+        :type precision: float
+        """
+        self.precision = precision
+        self._lock = threading.Lock()
+        self._endpoints = dict()
+
+    def attach(self, instrumentation):
+        """Subscribes the metrics to the events of the instrumentation."""
+        instrumentation.subscribe('after_decode', self.record)
+        instrumentation.subscribe('on_error', self.record_error)
+        return self
+
+    def detach(self, instrumentation):
+        """Unsubscribes the metrics from the events of the instrumentation."""
+        instrumentation.unsubscribe('after_decode', self.record)
+        instrumentation.unsubscribe('on_error', self.record_error)
+
+    def record(self, event):
+        """Records timings and sizes of the decoded response."""
+        with self._lock:
+            self._stats(event.endpoint).record(event)
+
+    def record_error(self, event):
+        """Records the failed request, the response may have been recorded already if API returned an error."""
+        with self._lock:
+            self._stats(event.endpoint).record_error(event)
+
+    def _stats(self, endpoint):
+        stats = self._endpoints.get(endpoint)
+        if stats is None:
+            stats = self._endpoints[endpoint] = _EndpointStats(self.precision)
+        return stats
+
+    def endpoints(self):
+        """Returns the endpoints with recorded requests."""
+        with self._lock:
+            return list(self._endpoints)
+
+    def percentiles(self, endpoint, stage='total', qs=(50, 95, 99)):
+        """Returns the percentiles of latency in seconds of the stage of requests to the endpoint.
+
+        :param stage: (optional) one of 'total', 'headers', 'body', or 'decode', defaults to 'total'.
+        :type stage: str
+        :param qs: (optional) percentiles to return, defaults to (50, 95, 99).
+        :type qs: tuple[float]
+        :return: values by names like 'p95', None for unknown endpoints.
+        :rtype: dict[str, float]
+        """
+        with self._lock:
+            stats = self._endpoints.get(endpoint)
+            histogram = stats.histograms[stage] if stats is not None else LatencyHistogram(self.precision)
+            return {'p{0:g}'.format(q): histogram.percentile(q) for q in qs}
+
+    def summary(self):
+        """Returns counts, errors, bytes received and percentiles of total latency by endpoint.
+
+        Sizes on the wire are equal to the decompressed ones unless the client is configured
+        with :class:`etg.Compression`, otherwise the transport decompresses responses unseen.
+
+        :rtype: dict[str, dict]
+        """
+        summary = dict()
+        with self._lock:
+            # listeners insert endpoints from other threads, so the whole summary is taken under the lock
+            for endpoint, stats in self._endpoints.items():
+                histogram = stats.histograms['total']
+                summary[endpoint] = dict(count=stats.count, errors=stats.errors,
+                                         bytes_received=stats.bytes_received, bytes_sent=stats.bytes_sent,
+                                         wire_bytes_received=stats.wire_bytes_received,
+                                         wire_bytes_sent=stats.wire_bytes_sent,
+                                         **{'p{0:g}'.format(q): histogram.percentile(q) for q in (50, 95, 99)})
+        return summary
+
+
+class _EndpointStats:
+    def __init__(self, precision):
+        self.histograms = {stage: LatencyHistogram(precision) for stage in LatencyMetrics.STAGES}
+        self.count = 0
+        self.errors = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.wire_bytes_sent = 0
+        self.wire_bytes_received = 0
+
+    def record(self, event):
+        self.count += 1
+        self._record_sizes(event)
+
+        histograms = self.histograms
+        histograms['total'].record(event.decode_elapsed)
+        histograms['headers'].record(event.headers_elapsed)
+        histograms['body'].record(event.body_elapsed - event.headers_elapsed)
+        histograms['decode'].record(event.decode_time)
+
+    def record_error(self, event):
+        self.errors += 1
+        if event.decode_elapsed is None:
+            self.count += 1
+            self._record_sizes(event)
+
+    def _record_sizes(self, event):
+        self.bytes_sent += event.request_size or 0
+        self.bytes_received += event.response_size or 0
+        self.wire_bytes_sent += (event.wire_request_size if event.wire_request_size is not None
+                                 else event.request_size) or 0
+        self.wire_bytes_received += (event.wire_response_size if event.wire_response_size is not None
+                                     else event.response_size) or 0
@@ -7,13 +7,14 @@ This module contains the primary objects.
 """
 
 from etg.exceptions import (
-    ETGException, AuthErrorException, BadRequestException
+    ETGException, AuthErrorException, BadRequestException, RateLimitExceededException, ServerErrorException,
 )
 
 
 class Response:
     __attrs__ = [
         'data', 'debug', 'error', 'status',
+        'endpoint', 'http_status', 'elapsed', 'size',
     ]
 
     def __init__(self, **kwargs):
@@ -30,6 +31,18 @@ class Response:
         #: Response status code.
         self.status = kwargs.pop('status')
 
+        #: API endpoint the request was sent to.
+        self.endpoint = kwargs.pop('endpoint', None)
+
+        #: HTTP status code of the response.
+        self.http_status = kwargs.pop('http_status', None)
+
+        #: Time in seconds elapsed between sending the request and decoding the response.
+        self.elapsed = kwargs.pop('elapsed', None)
+
+        #: Size of the raw response body in bytes.
+        self.size = kwargs.pop('size', None)
+
     @property
     def ok(self):
         """Returns True if there is no error in the response."""
@@ -47,6 +60,10 @@ class Response:
             if self.debug is not None and self.debug.get('validation_error') is not None:
                 error_msg = ": ".join([error_msg, self.debug.get('validation_error')])
             raise BadRequestException(error_msg)
+        elif self.error == 'endpoint_exceeded_limit' or self.http_status == 429:
+            raise RateLimitExceededException(self.error)
+        elif self.http_status is not None and self.http_status >= 500:
+            raise ServerErrorException(self.error)
         else:
             raise ETGException(self.error)
 
@@ -1,18 +1,206 @@
 # -*- coding: utf-8 -*-
+import dataclasses
+from array import array
+from collections import namedtuple
+
+
+@dataclasses.dataclass(eq=False, repr=False)
 class GuestData:
-    def __init__(self, adults, children=None):
-        """Init.
+    """Guests in one room.
 
-        :param adults: number of adult guests.
-        :type adults: int
-        :param children: (optional) age of children who will stay in the room.
-        :type children: list[int] or None
-        """
-        self.adults = adults
-        self.children = children if children is not None else []
+    It is a dataclass, so fast JSON codecs serialize it natively.
+
+    :param adults: number of adult guests.
+    :type adults: int
+    :param children: (optional) age of children who will stay in the room.
+    :type children: list[int] or None
+    """
+    adults: int
+    children: list = None
+
+    def __post_init__(self):
+        if self.children is None:
+            self.children = []
 
     def to_json(self):
         return {
             'adults': self.adults,
             'children': self.children,
         }
+
+    def __eq__(self, other):
+        if not isinstance(other, GuestData):
+            return NotImplemented
+        return self._key() == other._key()
+
+    def __hash__(self):
+        return hash(self._key())
+
+    def __repr__(self):
+        return 'GuestData({0!r}, {1!r})'.format(self.adults, self.children)
+
+    def _key(self):
+        # order of children ages does not change the room configuration
+        return self.adults, tuple(sorted(self.children))
+
+
+#: One combination of search conditions of :meth:`etg.ETGHotelsClient.search_matrix`,
+#: ``guests`` is a tuple of :class:`GuestData`.
+SearchCombination = namedtuple('SearchCombination', ['checkin', 'checkout', 'guests', 'residency'])
+
+
+class DailyPrice:
+    """Price of one night of the stay."""
+    __slots__ = ('night', 'amount')
+
+    def __init__(self, night, amount):
+        """Init.
+
+        :param night: index of the night starting from 0 (the night after check-in).
+        :type night: int
+        :param amount: price of the night.
+        :type amount: float
+        """
+        self.night = night
+        self.amount = amount
+
+    def __eq__(self, other):
+        if not isinstance(other, DailyPrice):
+            return NotImplemented
+        return (self.night, self.amount) == (other.night, other.amount)
+
+    def __repr__(self):
+        return 'DailyPrice({0!r}, {1!r})'.format(self.night, self.amount)
+
+
+class _CompactModel:
+    """Compact model of an API object: the main fields are kept in slots,
+    the rest is kept in one dict shared by copies of the object."""
+    __slots__ = ('_extra',)
+
+    #: Fields kept as is in slots.
+    _FIELDS = ()
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self.extra[name]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    @property
+    def extra(self):
+        """Fields of the object besides the main ones."""
+        return self._extra
+
+    def get(self, key, default=None):
+        """Returns the field like ``dict.get`` for compatibility with plain dict results."""
+        if key in self._FIELDS:
+            value = getattr(self, key)
+            return value if value is not None else default
+        return self.extra.get(key, default)
+
+    def _set_extra(self, data, fields):
+        self._extra = {key: value for key, value in data.items() if key not in fields}
+
+
+class Rate(_CompactModel):
+    """Compact rate of the search or hotelpage response.
+
+    Daily prices are kept in an array of floats, other fields not listed in ``__slots__``
+    (payment options, taxes, amenities, etc.) are available as attributes, e.g. ``rate.payment_options``.
+    """
+    __slots__ = ('book_hash', 'match_hash', 'room_name', 'meal',
+                 'amount', 'currency_code', 'free_cancellation_before', '_daily_prices')
+
+    _FIELDS = ('book_hash', 'match_hash', 'room_name', 'meal', 'daily_prices')
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the rate built from the rate of API response.
+
+        :param data: rate of API response.
+        :type data: dict
+        :rtype: Rate
+        """
+        rate = cls.__new__(cls)
+        rate.book_hash = data.get('book_hash')
+        rate.match_hash = data.get('match_hash')
+        rate.room_name = data.get('room_name')
+        rate.meal = data.get('meal')
+        rate._daily_prices = array('d', (float(price) for price in data.get('daily_prices') or []))
+
+        payment_types = (data.get('payment_options') or {}).get('payment_types') or [{}]
+        amount = payment_types[0].get('show_amount') or payment_types[0].get('amount')
+        rate.amount = float(amount) if amount is not None else None
+        rate.currency_code = payment_types[0].get('show_currency_code') or payment_types[0].get('currency_code')
+        penalties = payment_types[0].get('cancellation_penalties') or {}
+        rate.free_cancellation_before = penalties.get('free_cancellation_before')
+
+        rate._set_extra(data, cls._FIELDS)
+        return rate
+
+    @property
+    def daily_prices(self):
+        """Prices by night.
+
+        :rtype: list[DailyPrice]
+        """
+        return [DailyPrice(night, amount) for night, amount in enumerate(self._daily_prices)]
+
+    def get(self, key, default=None):
+        if key == 'daily_prices':
+            return list(self._daily_prices)
+        return super().get(key, default)
+
+    def to_dict(self):
+        """Returns the rate as a plain dict like in API response, daily prices are floats."""
+        data = {key: getattr(self, key) for key in self._FIELDS if key != 'daily_prices'}
+        data['daily_prices'] = list(self._daily_prices)
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return 'Rate(book_hash={0!r}, amount={1!r}, meal={2!r})'.format(self.book_hash, self.amount, self.meal)
+
+
+class Hotel(_CompactModel):
+    """Compact hotel of the search or hotelpage response.
+
+    Rates are kept as :class:`Rate` objects, other fields are available as attributes.
+    """
+    __slots__ = ('id', 'rates')
+
+    _FIELDS = ('id', 'rates')
+
+    @classmethod
+    def from_dict(cls, data):
+        """Returns the hotel built from the hotel of API response.
+
+        :param data: hotel of API response.
+        :type data: dict
+        :rtype: Hotel
+        """
+        hotel = cls.__new__(cls)
+        hotel.id = data.get('id')
+        hotel.rates = [Rate.from_dict(rate) for rate in data.get('rates') or []]
+        hotel._set_extra(data, cls._FIELDS)
+        return hotel
+
+    def replace(self, rates):
+        """Returns a copy of the hotel with the given rates."""
+        hotel = Hotel.__new__(Hotel)
+        hotel.id = self.id
+        hotel.rates = rates
+        hotel._extra = self._extra
+        return hotel
+
+    def to_dict(self):
+        """Returns the hotel as a plain dict like in API response."""
+        data = {'id': self.id, 'rates': [rate.to_dict() for rate in self.rates]}
+        data.update(self.extra)
+        return data
+
+    def __repr__(self):
+        return 'Hotel(id={0!r}, rates={1!r})'.format(self.id, len(self.rates))
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.ratelimit
+~~~~~~~~~~~~~
+
+This module contains the rate limiter of requests to API endpoints.
+"""
+
+import asyncio
+import json
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None
+
+from .exceptions import DeadlineExceededException
+
+_API_PREFIX = 'api/b2b/v3/'
+
+
+def endpoint_key(endpoint):
+    """Returns the endpoint path without the API prefix, e.g. 'search/serp/region/'."""
+    endpoint = endpoint.lstrip('/')
+    if endpoint.startswith(_API_PREFIX):
+        endpoint = endpoint[len(_API_PREFIX):]
+    return endpoint
+
+
+class MemoryBackend:
+
+    """
+    Storage of token buckets shared by the threads of one process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._states = dict()
+
+    def update(self, key, fn):
+        """Replaces the state of the bucket with the result of the function, returns the rest of the result."""
+        with self._lock:
+            state, result = fn(self._states.get(key))
+            self._states[key] = state
+            return result
+
+
+class FileBackend:
+
+    """
+    Storage of token buckets in a file locked on every update, so processes of one host share the budget.
+    """
+
+    def __init__(self, path):
+        """Init.
+
+        :param path: path to the file with the state of the buckets, it is created if it does not exist.
+        :type path: str
+        """
+        if fcntl is None:
+            raise ImportError('FileBackend requires fcntl, it is not available on this platform.')
+        self.path = path
+        self._lock = threading.Lock()
+
+    def update(self, key, fn):
+        """Replaces the state of the bucket with the result of the function, returns the rest of the result."""
+        with self._lock, open(self.path, 'a+', encoding='utf-8') as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                f.seek(0)
+                content = f.read()
+                states = json.loads(content) if content else {}
+                state, result = fn(states.get(key))
+                states[key] = state
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(states))
+                f.flush()
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+        return result
+
+
+class RateLimiter:
+
+    """
+    Token bucket rate limiter with one bucket per API endpoint.
+
+    A request takes a token from the bucket of its endpoint, the caller waits if there are no tokens.
+    When API signals that the limit is exceeded, the rate of the endpoint is halved (down to ``min_slowdown``)
+    and then recovers linearly to the configured one within ``recovery`` seconds.
+    """
+
+    def __init__(self, limits, default=None, backend=None, min_slowdown=1 / 16, recovery=60):
+        """Init.
+
+        :param limits: number of requests per number of seconds by endpoint,
+            e.g. ``{'search/serp/region/': (10, 1), 'search/hp/': (30, 1)}``, the API prefix is optional.
+        :type limits: dict[str, (int, float)]
+        :param default: (optional) limit of the other endpoints, by default they are not limited.
+        :type default: (int, float) or None
+        :param backend: (optional) storage of the buckets, defaults to :class:`MemoryBackend`,
+            use :class:`FileBackend` to share the limits between processes.
+        :type backend: MemoryBackend or FileBackend or None
+        :param min_slowdown: (optional) the least share of the configured rate after throttling, defaults to 1/16.
+        :type min_slowdown: float
+        :param recovery: (optional) time in seconds to recover from the least rate to the configured one.
+        :type recovery: float
+        """
+        self.limits = {endpoint_key(endpoint): limit for endpoint, limit in limits.items()}
+        self.default = default
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.min_slowdown = min_slowdown
+        self.recovery = recovery
+
+    def reserve(self, endpoint):
+        """Takes a token from the bucket of the endpoint.
+
+        :return: time in seconds the caller must wait before sending the request.
+        :rtype: float
+        """
+        key = endpoint_key(endpoint)
+        limit = self.limits.get(key, self.default)
+        if limit is None:
+            return 0.0
+        requests, seconds = limit
+        rate = requests / seconds
+
+        def take(state):
+            state = self._refill(state, time.time(), rate, requests)
+            state['tokens'] -= 1
+            wait = -state['tokens'] / (rate * state['slowdown']) if state['tokens'] < 0 else 0.0
+            return state, wait
+
+        return self.backend.update(key, take)
+
+    def acquire(self, endpoint, deadline=None):
+        """Blocks until a request to the endpoint can be sent.
+
+        :param deadline: (optional) time of :func:`time.monotonic` by which the request must be sent.
+        :type deadline: float or None
+        :raises DeadlineExceededException: if the wait would pass the deadline, the token is given back.
+        """
+        wait = self._reserve_by(endpoint, deadline)
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self, endpoint, deadline=None):
+        """Waits without blocking the event loop until a request to the endpoint can be sent, see :meth:`acquire`."""
+        wait = self._reserve_by(endpoint, deadline)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def throttled(self, endpoint):
+        """Slows down requests to the endpoint after API signaled that the limit is exceeded."""
+        key = endpoint_key(endpoint)
+        limit = self.limits.get(key, self.default)
+        if limit is None:
+            return
+        requests, seconds = limit
+
+        def slow_down(state):
+            state = self._refill(state, time.time(), requests / seconds, requests)
+            state['slowdown'] = max(self.min_slowdown, state['slowdown'] / 2)
+            state['tokens'] = min(state['tokens'], 0.0)
+            return state, None
+
+        self.backend.update(key, slow_down)
+
+    def _reserve_by(self, endpoint, deadline):
+        """Takes a token if the request can be sent before the deadline, returns the time to wait."""
+        wait = self.reserve(endpoint)
+        if deadline is not None and wait > 0 and time.monotonic() + wait >= deadline:
+            self._give_back(endpoint)
+            raise DeadlineExceededException('Deadline would pass waiting for the rate limit of {0}'
+                                            .format(endpoint_key(endpoint)))
+        return wait
+
+    def _give_back(self, endpoint):
+        """Returns the unused token to the bucket of the endpoint."""
+        key = endpoint_key(endpoint)
+        requests, seconds = self.limits.get(key, self.default)
+
+        def give_back(state):
+            state = self._refill(state, time.time(), requests / seconds, requests)
+            state['tokens'] = min(float(requests), state['tokens'] + 1)
+            return state, None
+
+        self.backend.update(key, give_back)
+
+    def _refill(self, state, now, rate, capacity):
+        """Returns the state of the bucket with the tokens gained since the last update."""
+        if state is None:
+            return {'tokens': float(capacity), 'updated': now, 'slowdown': 1.0}
+        elapsed = max(0.0, now - state['updated'])
+        slowdown = min(1.0, state['slowdown'] + elapsed / self.recovery * (1 - self.min_slowdown))
+        tokens = min(float(capacity), state['tokens'] + elapsed * rate * slowdown)
+        return {'tokens': tokens, 'updated': now, 'slowdown': slowdown}
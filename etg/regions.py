@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.regions
+~~~~~~~~~~~
+
+This module contains the local store of regions.
+"""
+
+import json
+import sqlite3
+import threading
+
+# the biggest code point, used as the upper bound of prefix ranges
+_MAX_CHAR = chr(0x10FFFF)
+
+
+class RegionStore:
+
+    """
+    Local SQLite store of regions with lookups by id, type and name.
+
+    The store is filled from :meth:`etg.ETGHotelsClient.region_list` results
+    and kept up to date by :meth:`sync`, which fetches only regions past the stored ``last_id``.
+    """
+
+    def __init__(self, path=':memory:'):
+        """Init.
+
+        :param path: (optional) path to the database file, by default the store is kept in memory.
+        :type path: str
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS regions (
+                    id INTEGER PRIMARY KEY,
+                    type TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS regions_type ON regions (type);
+                CREATE TABLE IF NOT EXISTS region_names (
+                    region_id INTEGER NOT NULL,
+                    language TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    PRIMARY KEY (region_id, language)
+                );
+                CREATE INDEX IF NOT EXISTS region_names_name ON region_names (name);
+            ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM regions').fetchone()[0]
+
+    def __iter__(self):
+        """Iterates over all stored regions ordered by id."""
+        last_id = -1
+        while True:
+            with self._lock:
+                rows = self._conn.execute('SELECT id, data FROM regions WHERE id > ? ORDER BY id LIMIT 1000',
+                                          (last_id,)).fetchall()
+            if not rows:
+                return
+            for _, data in rows:
+                yield json.loads(data)
+            last_id = rows[-1][0]
+
+    def close(self):
+        """Closes the database."""
+        self._conn.close()
+
+    @property
+    def last_id(self):
+        """The biggest identifier of the stored regions or None if the store is empty."""
+        with self._lock:
+            return self._conn.execute('SELECT MAX(id) FROM regions').fetchone()[0]
+
+    def update(self, regions):
+        """Adds regions to the store, replaces already stored ones.
+
+        :param regions: regions from ``region_list`` response.
+        :type regions: list[dict]
+        :return: number of the saved regions.
+        :rtype: int
+        """
+        rows, names = list(), list()
+        for region in regions:
+            rows.append((region.get('id'), region.get('type'), json.dumps(region, ensure_ascii=False)))
+            for language, name in _region_names(region):
+                names.append((region.get('id'), language, name.casefold()))
+
+        with self._lock, self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO regions (id, type, data) VALUES (?, ?, ?)', rows)
+            self._conn.executemany('DELETE FROM region_names WHERE region_id = ?', [row[:1] for row in rows])
+            self._conn.executemany('INSERT INTO region_names (region_id, language, name) VALUES (?, ?, ?)', names)
+        return len(rows)
+
+    def sync(self, client, limit=None, types=None):
+        """Fetches regions past the stored ``last_id`` and saves them.
+
+        :param client: client used for fetching regions.
+        :type client: etg.ETGHotelsClient
+        :param limit: (optional) number of regions in one page of ``region_list``.
+        :type limit: int or None
+        :param types: (optional) condition for filtering regions by region type.
+            Stored regions are expected to be filtered by the same types.
+        :type types: list[str] or None
+        :return: number of the fetched regions.
+        :rtype: int
+        """
+        count = 0
+        batch = list()
+        for region in client.iter_regions(last_id=self.last_id, limit=limit, types=types):
+            batch.append(region)
+            if len(batch) >= (limit or 1000):
+                count += self.update(batch)
+                batch = list()
+        if batch:
+            count += self.update(batch)
+        return count
+
+    def get(self, region_id):
+        """Returns the region by identifier.
+
+        :param region_id: region identifier.
+        :type region_id: int
+        :return: region or None if there is no such region in the store.
+        :rtype: dict or None
+        """
+        with self._lock:
+            row = self._conn.execute('SELECT data FROM regions WHERE id = ?', (region_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def find_by_type(self, region_type):
+        """Returns regions of the given type, e.g. 'City', 'Country'.
+
+        :param region_type: region type.
+        :type region_type: str
+        :rtype: list[dict]
+        """
+        with self._lock:
+            rows = self._conn.execute('SELECT data FROM regions WHERE type = ? ORDER BY id',
+                                      (region_type,)).fetchall()
+        return [json.loads(data) for data, in rows]
+
+    def find_by_name(self, name, language=None, prefix=False):
+        """Returns regions by name, case insensitive.
+
+        :param name: region name or its beginning if ``prefix`` is True.
+        :type name: str
+        :param language: (optional) language of the name, e.g. 'en', 'ru', by default names in all languages match.
+        :type language: str or None
+        :param prefix: (optional) whether to match names starting with the given one, defaults to False.
+        :type prefix: bool
+        :rtype: list[dict]
+        """
+        name = name.casefold()
+        if prefix:
+            condition, params = 'n.name >= ? AND n.name < ?', [name, name + _MAX_CHAR]
+        else:
+            condition, params = 'n.name = ?', [name]
+        if language is not None:
+            condition += ' AND n.language = ?'
+            params.append(language)
+
+        query = ('SELECT DISTINCT r.id, r.data FROM region_names n JOIN regions r ON r.id = n.region_id '
+                 'WHERE {0} ORDER BY r.id').format(condition)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(data) for _, data in rows]
+
+
+def _region_names(region):
+    """Returns pairs of language and name of the region, the name is either a string or a dict by language."""
+    name = region.get('name')
+    if isinstance(name, dict):
+        return [(language, value) for language, value in name.items() if value]
+    if name:
+        return [('', name)]
+    return []
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.replay
+~~~~~~~~~~
+
+This module contains recording of API traffic and its offline replay.
+"""
+
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from .cache import ResponseCache
+from .compression import decompress
+from .exceptions import ReplayMissException
+from .transport import AsyncTransport, Transport, TransportResponse
+
+#: Recorded request and response, ``started`` is the Unix time the request was sent at.
+Exchange = namedtuple('Exchange', 'key method endpoint data status body started latency')
+
+
+class TrafficStore:
+
+    """
+    Local SQLite store of recorded requests and responses.
+
+    Request data and response bodies are kept compressed, exchanges are indexed by the canonical key
+    of the request, the same as the key of :class:`etg.ResponseCache`.
+    """
+
+    def __init__(self, path=':memory:', compression_level=6):
+        """Init.
+
+        :param path: (optional) path to the database file, by default the store is kept in memory.
+        :type path: str
+        :param compression_level: (optional) zlib compression level of the stored bodies, defaults to 6.
+        :type compression_level: int
+        """
+        self.path = path
+        self.compression_level = compression_level
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS exchanges (
+                    id INTEGER PRIMARY KEY,
+                    key TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    endpoint TEXT NOT NULL,
+                    data BLOB,
+                    status INTEGER NOT NULL,
+                    body BLOB NOT NULL,
+                    started REAL NOT NULL,
+                    latency REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS exchanges_key ON exchanges (key, id);
+            ''')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def __len__(self):
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM exchanges').fetchone()[0]
+
+    def __iter__(self):
+        """Iterates over all recorded exchanges in the order they were recorded."""
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    'SELECT id, key, method, endpoint, data, status, body, started, latency FROM exchanges '
+                    'WHERE id > ? ORDER BY id LIMIT 100', (last_id,)).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield self._exchange(row[1:])
+            last_id = rows[-1][0]
+
+    def close(self):
+        """Closes the database."""
+        self._conn.close()
+
+    def add(self, method, endpoint, data, status, body, started, latency):
+        """Records the exchange.
+
+        :param method: HTTP method of the request.
+        :type method: str
+        :param endpoint: API endpoint, e.g. 'api/b2b/v3/search/serp/region/'.
+        :type endpoint: str
+        :param data: parameters of the request.
+        :type data: dict or None
+        :param status: HTTP status code of the response.
+        :type status: int
+        :param body: raw body of the response.
+        :type body: bytes
+        :param started: Unix time the request was sent at.
+        :type started: float
+        :param latency: time in seconds until the whole body was received.
+        :type latency: float
+        :return: canonical key of the request.
+        :rtype: str
+        """
+        key = ResponseCache.key(method, endpoint, data)
+        packed = None
+        if data is not None:
+            packed = zlib.compress(json.dumps(data, separators=(',', ':')).encode('utf-8'), self.compression_level)
+        row = (key, method, endpoint, packed, status, zlib.compress(body, self.compression_level), started, latency)
+        with self._lock, self._conn:
+            self._conn.execute('INSERT INTO exchanges (key, method, endpoint, data, status, body, started, latency) '
+                               'VALUES (?, ?, ?, ?, ?, ?, ?, ?)', row)
+        return key
+
+    def count(self, key):
+        """Returns the number of exchanges recorded for the request key."""
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM exchanges WHERE key = ?', (key,)).fetchone()[0]
+
+    def find(self, key, n=0):
+        """Returns the n-th exchange recorded for the request key, or None if there are not so many of them.
+
+        :rtype: Exchange or None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT key, method, endpoint, data, status, body, started, latency FROM exchanges '
+                'WHERE key = ? ORDER BY id LIMIT 1 OFFSET ?', (key, n)).fetchone()
+        return self._exchange(row) if row is not None else None
+
+    @staticmethod
+    def _exchange(row):
+        key, method, endpoint, data, status, body, started, latency = row
+        data = json.loads(zlib.decompress(data).decode('utf-8')) if data is not None else None
+        return Exchange(key, method, endpoint, data, status, zlib.decompress(body), started, latency)
+
+
+class RecordingTransport(Transport):
+
+    """
+    Transport recording every exchange of the wrapped transport to :class:`TrafficStore`.
+
+    Responses are read whole before they are returned, failed connections are not recorded.
+    """
+
+    def __init__(self, transport, store):
+        """Init.
+
+        :param transport: transport sending the requests.
+        :type transport: etg.transport.Transport
+        :param store: store the exchanges are recorded to.
+        :type store: TrafficStore
+        """
+        self.transport = transport
+        self.store = store
+
+    @property
+    def session(self):
+        """Session of the wrapped transport, if it has one."""
+        return getattr(self.transport, 'session', None)
+
+    @property
+    def pool_size(self):
+        """Pool size of the wrapped transport."""
+        return getattr(self.transport, 'pool_size', None)
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        endpoint, payload = _endpoint_and_data(url, params, data, headers)
+        started, sent_at = time.monotonic(), time.time()
+        with self.transport.request(method, url, params=params, data=data, headers=headers, timeout=timeout) as r:
+            content = r.content
+        self.store.add(method, endpoint, payload, r.status_code, content, sent_at, time.monotonic() - started)
+        return TransportResponse(r.status_code, content, headers=r.headers, request=r.request)
+
+    def close(self):
+        self.transport.close()
+
+
+class AsyncRecordingTransport(AsyncTransport):
+
+    """
+    Transport recording every exchange of the wrapped async transport, see :class:`RecordingTransport`.
+    """
+
+    def __init__(self, transport, store):
+        """Init.
+
+        :param transport: transport sending the requests.
+        :type transport: etg.transport.AsyncTransport
+        :param store: store the exchanges are recorded to.
+        :type store: TrafficStore
+        """
+        self.transport = transport
+        self.store = store
+
+    @property
+    def session(self):
+        """Session of the wrapped transport, if it has one."""
+        return getattr(self.transport, 'session', None)
+
+    @property
+    def pool_size(self):
+        """Pool size of the wrapped transport."""
+        return getattr(self.transport, 'pool_size', None)
+
+    @session.setter
+    def session(self, value):
+        self.transport.session = value
+
+    async def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        endpoint, payload = _endpoint_and_data(url, params, data, headers)
+        started, sent_at = time.monotonic(), time.time()
+        r = await self.transport.request(method, url, params=params, data=data, headers=headers, timeout=timeout)
+        async with r:
+            content = await r.aread()
+        self.store.add(method, endpoint, payload, r.status_code, content, sent_at, time.monotonic() - started)
+        return TransportResponse(r.status_code, content, headers=r.headers, request=r.request)
+
+    async def aclose(self):
+        await self.transport.aclose()
+
+
+class ReplayTransport(Transport):
+
+    """
+    Transport answering requests with the responses recorded to :class:`TrafficStore`, API is never called.
+
+    Requests are matched by the canonical key, so the host and the order of parameters do not matter.
+    Requests recorded several times get their responses in turn.
+    """
+
+    def __init__(self, store, speed=1.0):
+        """Init.
+
+        :param store: store of the recorded exchanges.
+        :type store: TrafficStore
+        :param speed: (optional) factor the recorded latencies are divided by, e.g. 10 replays responses
+            ten times faster, None returns them immediately, defaults to 1.0.
+        :type speed: float or None
+        """
+        self.store = store
+        self.speed = speed
+        self._lock = threading.Lock()
+        self._served = dict()
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        exchange = self._find(method, url, params, data, headers)
+        if self.speed:
+            time.sleep(exchange.latency / self.speed)
+        return _response(exchange)
+
+    def _find(self, method, url, params, data, headers):
+        """Returns the recorded exchange to answer the request with."""
+        endpoint, payload = _endpoint_and_data(url, params, data, headers)
+        key = ResponseCache.key(method, endpoint, payload)
+        with self._lock:
+            n = self._served.get(key, 0)
+            self._served[key] = n + 1
+        exchange = self.store.find(key, n)
+        if exchange is None and n:
+            exchange = self.store.find(key, n % self.store.count(key))
+        if exchange is None:
+            raise ReplayMissException('No recorded response to {0} {1}'.format(method, endpoint))
+        return exchange
+
+
+class AsyncReplayTransport(ReplayTransport, AsyncTransport):
+
+    """
+    Async transport answering requests with the recorded responses, see :class:`ReplayTransport`.
+    """
+
+    async def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        exchange = self._find(method, url, params, data, headers)
+        if self.speed:
+            await asyncio.sleep(exchange.latency / self.speed)
+        return _response(exchange)
+
+
+def replay_traffic(store, client, speed=1.0, max_workers=32):
+    """Sends the recorded requests again with the client, keeping the recorded intervals between them.
+
+    Combined with :class:`ReplayTransport` it reproduces the recorded load offline::
+
+        client = ETGClient(auth, transport=ReplayTransport(store, speed=10))
+        results, errors = replay_traffic(store, client, speed=10)
+
+    :param store: store of the recorded exchanges.
+    :type store: TrafficStore
+    :param client: client sending the requests.
+    :type client: etg.ETGClient
+    :param speed: (optional) factor the recorded intervals are divided by, None sends the requests
+        as fast as the workers allow, defaults to 1.0.
+    :type speed: float or None
+    :param max_workers: (optional) maximum number of requests in flight, defaults to 32.
+    :type max_workers: int
+    :return: responses and errors keyed by the index of the exchange.
+    :rtype: (dict, dict)
+    """
+    futures = list()
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='etg-replay') as executor:
+        first = started = None
+        for exchange in store:
+            if first is None:
+                first, started = exchange.started, time.monotonic()
+            if speed:
+                delay = started + (exchange.started - first) / speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            futures.append(executor.submit(client.send, exchange.method, exchange.endpoint, exchange.data))
+
+    results, errors = dict(), dict()
+    for i, future in enumerate(futures):
+        try:
+            results[i] = future.result()
+        except Exception as ex:
+            errors[i] = ex
+    return results, errors
+
+
+def _response(exchange):
+    return TransportResponse(exchange.status, exchange.body, headers={'Content-Type': 'application/json'})
+
+
+def _endpoint_and_data(url, params, data, headers=None):
+    """Returns the endpoint and the decoded parameters of the request."""
+    endpoint = urlsplit(url).path.lstrip('/')
+    if params and 'data' in params:
+        return endpoint, json.loads(params['data'])
+    if data:
+        if headers and 'Content-Encoding' in headers:
+            data = decompress(data, headers['Content-Encoding'])
+        return endpoint, json.loads(data)
+    return endpoint, None
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.retry
+~~~~~~~~~
+
+This module contains the retry policy and the circuit breaker of requests.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+
+from .exceptions import (
+    CircuitOpenException, NetworkException, ServerErrorException, TransientException,
+)
+from .ratelimit import endpoint_key
+
+
+class RetryPolicy:
+
+    """
+    Retries requests to idempotent endpoints failed with transient errors,
+    waiting an exponentially growing delay with full jitter between the attempts.
+    """
+    #: Endpoints with any of these prefixes are never retried, the request may have changed an order.
+    NON_IDEMPOTENT_PREFIXES = (
+        'hotel/order/',
+    )
+
+    def __init__(self, max_attempts=3, backoff=0.5, max_backoff=10.0, retry_on=(TransientException,)):
+        """Init.
+
+        :param max_attempts: (optional) maximum number of attempts including the first one, defaults to 3.
+        :type max_attempts: int
+        :param backoff: (optional) upper bound in seconds of the delay before the first retry,
+            it doubles with every retry, defaults to 0.5.
+        :type backoff: float
+        :param max_backoff: (optional) maximum upper bound in seconds of the delay, defaults to 10.0.
+        :type max_backoff: float
+        :param retry_on: (optional) types of exceptions to retry, defaults to :class:`TransientException`.
+        :type retry_on: tuple[type]
+        """
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.retry_on = retry_on
+
+        #: Number of retried requests.
+        self.retries = 0
+
+    def is_idempotent(self, endpoint):
+        """Returns True if requests to the endpoint may be sent again."""
+        return not endpoint_key(endpoint).startswith(self.NON_IDEMPOTENT_PREFIXES)
+
+    def should_retry(self, endpoint, ex, attempt):
+        """Returns True if the request failed at the given attempt (counting from 0) should be sent again."""
+        return attempt + 1 < self.max_attempts and isinstance(ex, self.retry_on) and self.is_idempotent(endpoint)
+
+    def delay(self, attempt):
+        """Returns the delay in seconds before the retry of the given attempt (counting from 0)."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+
+class CircuitBreaker:
+
+    """
+    Suspends requests to the endpoint when the rate of failures exceeds the threshold.
+
+    While the circuit is open, requests fail fast with :class:`CircuitOpenException`.
+    After ``reset_timeout`` one trial request is let through: its success closes the circuit,
+    its failure opens it again. The trial request is told by the token returned from :meth:`before_call`,
+    late outcomes of the requests let through before the circuit opened are ignored meanwhile.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_rate=0.5, min_requests=20, window=60, reset_timeout=30.0,
+                 failure_types=(NetworkException, ServerErrorException)):
+        """Init.
+
+        :param failure_rate: (optional) share of failed requests opening the circuit, defaults to 0.5.
+        :type failure_rate: float
+        :param min_requests: (optional) minimum number of requests in the window to open the circuit,
+            defaults to 20.
+        :type min_requests: int
+        :param window: (optional) length in seconds of the window of counted requests, defaults to 60.
+        :type window: int
+        :param reset_timeout: (optional) time in seconds the circuit stays open, defaults to 30.0.
+        :type reset_timeout: float
+        :param failure_types: (optional) types of exceptions counted as failures,
+            defaults to network and server errors.
+        :type failure_types: tuple[type]
+        """
+        self.failure_rate = failure_rate
+        self.min_requests = min_requests
+        self.window = window
+        self.reset_timeout = reset_timeout
+        self.failure_types = failure_types
+
+        self._lock = threading.Lock()
+        self._circuits = dict()
+
+    def state(self, endpoint):
+        """Returns state of the circuit of the endpoint: 'closed', 'open', or 'half_open'."""
+        with self._lock:
+            return self._circuit(endpoint_key(endpoint)).state
+
+    def before_call(self, endpoint):
+        """Raises :class:`CircuitOpenException` if requests to the endpoint are suspended.
+
+        :return: token of the trial request of the half-open circuit to pass to :meth:`record`,
+            None for the other requests.
+        :rtype: object or None
+        """
+        key = endpoint_key(endpoint)
+        with self._lock:
+            circuit = self._circuit(key)
+            if circuit.state == self.OPEN:
+                retry_after = circuit.opened_at + self.reset_timeout - time.monotonic()
+                if retry_after > 0:
+                    raise CircuitOpenException('Circuit of {0} is open, retry after {1:.1f}s'.format(key, retry_after))
+                circuit.state = self.HALF_OPEN
+                circuit.trial = None
+            if circuit.state == self.HALF_OPEN:
+                if circuit.trial is not None:
+                    raise CircuitOpenException('Circuit of {0} is half open, waiting for the trial request'.format(key))
+                circuit.trial = object()
+                return circuit.trial
+            return None
+
+    def record(self, endpoint, ex=None, token=None):
+        """Records the outcome of the request to the endpoint, ``ex`` is the exception if it failed.
+
+        :param token: (optional) token returned by :meth:`before_call` for the request,
+            only the outcome of the trial request changes the state of the half-open circuit.
+        :type token: object or None
+        """
+        failed = isinstance(ex, self.failure_types)
+        now = time.monotonic()
+        with self._lock:
+            circuit = self._circuit(endpoint_key(endpoint))
+            if circuit.state == self.HALF_OPEN:
+                if token is None or token is not circuit.trial:
+                    # a late outcome of the request let through before the circuit opened
+                    return
+                if failed:
+                    circuit.open(now)
+                else:
+                    circuit.close()
+                return
+            if circuit.state == self.OPEN:
+                return
+
+            second = int(now)
+            buckets = circuit.buckets
+            if not buckets or buckets[-1][0] != second:
+                buckets.append([second, 0, 0])
+            buckets[-1][1] += 1
+            buckets[-1][2] += failed
+            while buckets[0][0] <= second - self.window:
+                buckets.popleft()
+
+            total = sum(bucket[1] for bucket in buckets)
+            failures = sum(bucket[2] for bucket in buckets)
+            if failed and total >= self.min_requests and failures >= self.failure_rate * total:
+                circuit.open(now)
+
+    def cancel(self, endpoint, token=None):
+        """Records the request to the endpoint interrupted before its outcome was known, e.g. cancelled.
+
+        An interrupted trial request of the half-open circuit counts as a failure and opens the circuit again,
+        so the next trial is let through after ``reset_timeout``.
+
+        :param token: (optional) token returned by :meth:`before_call` for the request.
+        :type token: object or None
+        """
+        with self._lock:
+            circuit = self._circuit(endpoint_key(endpoint))
+            if circuit.state == self.HALF_OPEN and token is not None and token is circuit.trial:
+                circuit.open(time.monotonic())
+
+    def _circuit(self, key):
+        circuit = self._circuits.get(key)
+        if circuit is None:
+            circuit = self._circuits[key] = _Circuit()
+        return circuit
+
+
+class _Circuit:
+    __slots__ = ('state', 'opened_at', 'trial', 'buckets')
+
+    def __init__(self):
+        self.close()
+
+    def open(self, now):
+        self.state = CircuitBreaker.OPEN
+        self.opened_at = now
+        self.trial = None
+        self.buckets = deque()
+
+    def close(self):
+        self.state = CircuitBreaker.CLOSED
+        self.opened_at = None
+        self.trial = None
+        self.buckets = deque()
+
+
+def call_with_retries(fn, endpoint, retry_policy=None, circuit_breaker=None, deadline=None):
+    """Calls the function sending the request to the endpoint under the retry policy and the circuit breaker.
+
+    Retries are not started if the delay would pass the deadline.
+
+    :param fn: function sending the request.
+    :type fn: callable
+    :param deadline: (optional) time of :func:`time.monotonic` by which the response must be received.
+    :type deadline: float or None
+    :return: result of the function.
+    """
+    attempt = 0
+    while True:
+        token = circuit_breaker.before_call(endpoint) if circuit_breaker is not None else None
+        try:
+            result = fn()
+        except Exception as ex:
+            if circuit_breaker is not None:
+                circuit_breaker.record(endpoint, ex, token)
+            delay = _retry_delay(retry_policy, endpoint, ex, attempt, deadline)
+            if delay is None:
+                raise
+            time.sleep(delay)
+            attempt += 1
+        except BaseException:
+            # interrupted, the trial slot of the half-open circuit must not stay taken
+            if circuit_breaker is not None:
+                circuit_breaker.cancel(endpoint, token)
+            raise
+        else:
+            if circuit_breaker is not None:
+                circuit_breaker.record(endpoint, token=token)
+            return result
+
+
+async def call_with_retries_async(fn, endpoint, retry_policy=None, circuit_breaker=None, deadline=None):
+    """Awaits the coroutine function sending the request to the endpoint, see :func:`call_with_retries`."""
+    attempt = 0
+    while True:
+        token = circuit_breaker.before_call(endpoint) if circuit_breaker is not None else None
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # a subclass of Exception in Python 3.7
+            if circuit_breaker is not None:
+                circuit_breaker.cancel(endpoint, token)
+            raise
+        except Exception as ex:
+            if circuit_breaker is not None:
+                circuit_breaker.record(endpoint, ex, token)
+            delay = _retry_delay(retry_policy, endpoint, ex, attempt, deadline)
+            if delay is None:
+                raise
+            await asyncio.sleep(delay)
+            attempt += 1
+        except BaseException:
+            if circuit_breaker is not None:
+                circuit_breaker.cancel(endpoint, token)
+            raise
+        else:
+            if circuit_breaker is not None:
+                circuit_breaker.record(endpoint, token=token)
+            return result
+
+
+def _retry_delay(retry_policy, endpoint, ex, attempt, deadline):
+    """Returns the delay before the retry, or None if the request should not be retried."""
+    if retry_policy is None or not retry_policy.should_retry(endpoint, ex, attempt):
+        return None
+    delay = retry_policy.delay(attempt)
+    if deadline is not None and time.monotonic() + delay >= deadline:
+        return None
+    retry_policy.retries += 1
+    return delay
@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.scheduler
+~~~~~~~~~~~~~
+
+This module contains the priority scheduler of concurrent requests.
+"""
+
+import asyncio
+import contextlib
+import heapq
+import itertools
+import threading
+
+from .ratelimit import endpoint_key
+
+#: Priority classes from the highest to the lowest.
+PRIORITIES = ('booking', 'hotelpage', 'search', 'static')
+
+
+def priority_class(endpoint):
+    """Returns the priority class of the endpoint: 'booking', 'hotelpage', 'search', or 'static'."""
+    key = endpoint_key(endpoint)
+    if key.startswith('hotel/order/'):
+        return 'booking'
+    if key.startswith('search/hp/'):
+        return 'hotelpage'
+    if key.startswith('search/'):
+        return 'search'
+    return 'static'
+
+
+class _Slots:
+
+    """
+    Accounting of reserved and shared slots, the owner must hold its lock.
+
+    A request takes a free slot reserved for its class first, then a shared slot.
+    Shared slots are given to waiting requests in the order of priority classes, then in the order of arrival.
+    """
+
+    def __init__(self, reserved, shared):
+        self.reserved = {name: reserved.get(name, 0) for name in PRIORITIES}
+        self.shared = shared
+        self.reserved_in_use = {name: 0 for name in PRIORITIES}
+        self.shared_in_use = 0
+        self.waiting = list()
+        self._counter = itertools.count()
+
+    def wait(self, name):
+        """Registers the waiting request, returns its ticket."""
+        ticket = (PRIORITIES.index(name), next(self._counter))
+        heapq.heappush(self.waiting, ticket)
+        return ticket
+
+    def take(self, name, ticket):
+        """Takes a slot for the request if it can run now, returns True if it is shared."""
+        if self.reserved_in_use[name] < self.reserved[name]:
+            self.reserved_in_use[name] += 1
+            shared = False
+        elif self.shared_in_use < self.shared and self.waiting[0] == ticket:
+            self.shared_in_use += 1
+            shared = True
+        else:
+            return None
+        self.waiting.remove(ticket)
+        heapq.heapify(self.waiting)
+        return shared
+
+    def release(self, name, shared):
+        if shared:
+            self.shared_in_use -= 1
+        else:
+            self.reserved_in_use[name] -= 1
+
+    def cancel(self, ticket):
+        self.waiting.remove(ticket)
+        heapq.heapify(self.waiting)
+
+
+class RequestScheduler:
+
+    """
+    Limits the number of concurrent requests of the client threads giving slots by priority:
+    bookings first, then hotelpage, then search, then static data.
+
+    Every priority class has its own reserved slots, so high-priority requests get a slot quickly
+    even if all shared slots are busy with searches. The slots must fit into the connection pool of the client,
+    otherwise requests wait for connections in the pool regardless of their priority.
+    """
+    #: Default number of slots reserved for every priority class.
+    DEFAULT_RESERVED = {'booking': 2, 'hotelpage': 2, 'search': 0, 'static': 1}
+
+    #: Default size of the connection pool the slots are fitted into, the same as of the client.
+    DEFAULT_POOL_SIZE = 10
+
+    def __init__(self, reserved=None, shared=None):
+        """Init.
+
+        :param reserved: (optional) number of slots reserved by priority class, defaults to ``DEFAULT_RESERVED``.
+        :type reserved: dict[str, int] or None
+        :param shared: (optional) number of slots shared by all classes, by default the connections of the pool
+            left after the reserved slots, see :meth:`fit`.
+        :type shared: int or None
+        """
+        self._slots = _Slots(reserved if reserved is not None else self.DEFAULT_RESERVED, shared)
+        self._fixed_shared = shared is not None
+        if shared is None:
+            self._slots.shared = max(self.DEFAULT_POOL_SIZE - sum(self._slots.reserved.values()), 1)
+        self._condition = threading.Condition()
+
+    @property
+    def size(self):
+        """Total number of slots."""
+        return self._slots.shared + sum(self._slots.reserved.values())
+
+    def fit(self, pool_size):
+        """Fits the slots into the connection pool of the client, called by the client it is given to.
+
+        Shared slots not given explicitly take the connections left after the reserved slots.
+
+        :param pool_size: maximum number of connections of the pool, None if it is unlimited.
+        :type pool_size: int or None
+        :raises ValueError: if the slots do not fit into the pool.
+        """
+        if pool_size is None:
+            return
+        reserved = sum(self._slots.reserved.values())
+        if not self._fixed_shared:
+            if pool_size <= reserved:
+                raise ValueError('Connection pool of {0} is too small for {1} reserved slots of the scheduler'
+                                 .format(pool_size, reserved))
+            self._slots.shared = pool_size - reserved
+        elif self.size > pool_size:
+            raise ValueError('{0} slots of the scheduler do not fit into the connection pool of {1}'
+                             .format(self.size, pool_size))
+
+    @contextlib.contextmanager
+    def slot(self, endpoint):
+        """Blocks until the request to the endpoint gets a slot, releases it on exit."""
+        name = priority_class(endpoint)
+        with self._condition:
+            ticket = self._slots.wait(name)
+            try:
+                shared = self._slots.take(name, ticket)
+                while shared is None:
+                    self._condition.wait()
+                    shared = self._slots.take(name, ticket)
+            except BaseException:
+                self._slots.cancel(ticket)
+                self._condition.notify_all()
+                raise
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._slots.release(name, shared)
+                self._condition.notify_all()
+
+
+class AsyncRequestScheduler(RequestScheduler):
+
+    """
+    Priority scheduler of the client coroutines, see :class:`RequestScheduler`.
+    """
+
+    def __init__(self, reserved=None, shared=None):
+        super().__init__(reserved=reserved, shared=shared)
+        self._condition = None
+
+    @contextlib.asynccontextmanager
+    async def slot(self, endpoint):
+        """Waits until the request to the endpoint gets a slot, releases it on exit."""
+        if self._condition is None:
+            # created lazily to bind to the running event loop
+            self._condition = asyncio.Condition()
+        name = priority_class(endpoint)
+        async with self._condition:
+            ticket = self._slots.wait(name)
+            try:
+                shared = self._slots.take(name, ticket)
+                while shared is None:
+                    await self._condition.wait()
+                    shared = self._slots.take(name, ticket)
+            except BaseException:
+                self._slots.cancel(ticket)
+                self._condition.notify_all()
+                raise
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self._slots.release(name, shared)
+                self._condition.notify_all()
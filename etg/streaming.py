@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.streaming
+~~~~~~~~~~~~~
+
+This module contains the incremental parser of API responses.
+"""
+
+try:
+    import ijson
+except ImportError:  # pragma: no cover
+    ijson = None
+
+#: Prefix of hotels in search responses.
+HOTELS_PREFIX = 'data.hotels.item'
+
+# top-level keys of API response besides ``data``
+_RESPONSE_KEYS = ('debug', 'error', 'status')
+
+# change of the nesting depth by the parser events
+_NESTING = {'start_map': 1, 'start_array': 1, 'end_map': -1, 'end_array': -1}
+
+
+class ResponseParser:
+
+    """
+    Push parser of API response yielding objects at the given prefix as soon as they are decoded.
+
+    Objects are built by the items coroutine of ijson, so with its C backend they never pass through Python
+    event by event. Only the object being decoded is held in memory, so memory does not grow with the response
+    size. Other top-level values of the response (``debug``, ``error``, ``status``) are collected into ``rest``
+    from the events of the top-level object, the values nested deeper are skipped without being built.
+    """
+
+    def __init__(self, prefix=HOTELS_PREFIX):
+        """Init.
+
+        :param prefix: (optional) ijson prefix of the yielded objects, defaults to hotels of search response.
+        :type prefix: str
+        """
+        if ijson is None:
+            raise ImportError('Streaming requires ijson, install it with `pip install etg[stream]`.')
+
+        self.prefix = prefix
+        self.rest = {key: None for key in _RESPONSE_KEYS}
+
+        #: Number of bytes fed to the parser.
+        self.size = 0
+
+        self._items = ijson.sendable_list()
+        self._coro = ijson.items_coro(self._items, prefix, use_float=True)
+        self._events = ijson.sendable_list()
+        self._top = ijson.basic_parse_coro(self._events, use_float=True)
+        # nesting depth of the top-level parser, the key and the builder of the collected value
+        self._depth = 0
+        self._key = None
+        self._builder = None
+
+    def feed(self, chunk):
+        """Parses the next chunk of the response body.
+
+        :param chunk: part of the response body.
+        :type chunk: bytes
+        :return: objects completely decoded in the chunk.
+        :rtype: list
+        """
+        if not chunk:
+            # empty chunk would be taken as the end of the body
+            return []
+        self.size += len(chunk)
+        self._coro.send(chunk)
+        self._top.send(chunk)
+        self._collect()
+        return self._process()
+
+    def close(self):
+        """Finishes parsing, raises ijson error if the response body is incomplete.
+
+        :return: objects decoded in the last chunk.
+        :rtype: list
+        """
+        self._coro.close()
+        self._top.close()
+        self._collect()
+        return self._process()
+
+    def _process(self):
+        items = list(self._items)
+        del self._items[:]
+        return items
+
+    def _collect(self):
+        """Builds the values of the top-level keys of the response from the parsed events."""
+        depth, key, builder = self._depth, self._key, self._builder
+        nesting, rest = _NESTING, self.rest
+        for event, value in self._events:
+            if builder is None:
+                if depth == 1 and event == 'map_key' and value in rest:
+                    key, builder = value, ijson.ObjectBuilder()
+                else:
+                    depth += nesting.get(event, 0)
+                continue
+            builder.event(event, value)
+            depth += nesting.get(event, 0)
+            if depth == 1:
+                rest[key] = builder.value
+                builder = None
+        del self._events[:]
+        self._depth, self._key, self._builder = depth, key, builder
@@ -0,0 +1,355 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.testing
+~~~~~~~~~~~
+
+This module contains the local stand-in of API Gateway for tests and benchmarks.
+"""
+
+import argparse
+import hashlib
+import random
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from .codec import get_codec
+from .compression import available_encodings, compress, decompress
+from .ratelimit import endpoint_key
+
+MEALS = ('nomeal', 'breakfast', 'half-board', 'full-board', 'all-inclusive')
+REGION_TYPES = ('City', 'Airport', 'Railway Station', 'Point of Interest', 'Country')
+
+_BAD_GATEWAY = b'<html><body>502 Bad Gateway</body></html>'
+
+
+class FakeETGServer:
+
+    """
+    Local HTTP server answering the endpoints used by :class:`etg.ETGHotelsClient` with generated data.
+
+    Responses are deterministic for the same request, their sizes and latencies are configurable,
+    so the overhead of the SDK can be measured without the live API::
+
+        with FakeETGServer(hotels=1000, latency=0.05) as server:
+            client = server.client(ETGHotelsClient)
+            client.search_by_region(6308866, checkin, checkout, guests)
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, hotels=100, rates=5, regions=5000,
+                 latency=0.0, jitter=0.0, error_rate=0.0, seed=0, compression=False):
+        """Init.
+
+        :param host: (optional) address to listen on, defaults to '127.0.0.1'.
+        :type host: str
+        :param port: (optional) port to listen on, by default a free one.
+        :type port: int
+        :param hotels: (optional) number of hotels found by region search, defaults to 100.
+        :type hotels: int
+        :param rates: (optional) number of rates of every found hotel, defaults to 5.
+        :type rates: int
+        :param regions: (optional) total number of regions of region list, defaults to 5000.
+        :type regions: int
+        :param latency: (optional) delay in seconds before the response,
+            or delays by endpoint like 'search/serp/region/', defaults to 0.
+        :type latency: float or dict[str, float]
+        :param jitter: (optional) maximum random delay in seconds added to the latency, defaults to 0.
+        :type jitter: float
+        :param error_rate: (optional) share of requests failed with 502 Bad Gateway, defaults to 0.
+        :type error_rate: float
+        :param seed: (optional) seed of the random delays and errors, defaults to 0.
+        :type seed: int
+        :param compression: (optional) controls whether responses are compressed as requested
+            by Accept-Encoding header, defaults to False.
+        :type compression: bool
+        """
+        self.hotels = hotels
+        self.rates = rates
+        self.regions = regions
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.compression = compression
+
+        #: Number of requests by endpoint.
+        self.requests = dict()
+
+        self._codec = get_codec()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._bodies = OrderedDict()
+        self._httpd = _Server((host, port), _Handler)
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL of the server to be used as ``API_HOST`` of the client."""
+        host, port = self._httpd.server_address[:2]
+        return 'http://{0}:{1}'.format(host, port)
+
+    def client(self, cls, auth=('key_id', 'key'), **kwargs):
+        """Returns the client of the given class sending requests to the server."""
+        client = cls(auth, **kwargs)
+        client.API_HOST = self.url
+        return client
+
+    def start(self):
+        """Starts serving in a background thread."""
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='etg-fake-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stops serving and closes the socket."""
+        if self._thread is not None:
+            self._httpd.shutdown()
+            self._thread.join()
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def handle(self, method, path, data):
+        """Returns HTTP status, delay in seconds and body of the response to the request."""
+        key = endpoint_key(path)
+        with self._lock:
+            self.requests[key] = self.requests.get(key, 0) + 1
+            delay = self.latency.get(key, 0.0) if isinstance(self.latency, dict) else self.latency
+            if self.jitter:
+                delay += self._random.uniform(0, self.jitter)
+            if self.error_rate and self._random.random() < self.error_rate:
+                return 502, delay, _BAD_GATEWAY
+
+        answer = _ANSWERS.get(key)
+        if answer is None:
+            return 404, delay, self._codec.dumps(_response(error='endpoint_not_found', status='error'))
+
+        cache_key = hashlib.sha1(key.encode('utf-8') + self._codec.dumps(data)).digest()
+        with self._lock:
+            body = self._bodies.get(cache_key)
+        if body is None:
+            body = self._codec.dumps(_response(data=answer(self, data or {})))
+            with self._lock:
+                self._bodies[cache_key] = body
+                if len(self._bodies) > 256:
+                    self._bodies.popitem(last=False)
+        return 200, delay, body
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    # concurrent clients open many connections at once
+    request_queue_size = 128
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in one write, so keep-alive connections are not stalled by delayed ACKs
+    wbufsize = 64 * 1024
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        data = self.server.fake._codec.loads(query['data'][0]) if 'data' in query else None
+        self._answer('GET', data)
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length)
+        if body and self.headers.get('Content-Encoding'):
+            body = decompress(body, self.headers['Content-Encoding'])
+        self._answer('POST', self.server.fake._codec.loads(body) if body else None)
+
+    def _answer(self, method, data):
+        fake = self.server.fake
+        if self.headers.get('Authorization') is None:
+            status, delay = 401, 0
+            body = fake._codec.dumps(_response(error='no_auth_header', status='error'))
+        else:
+            status, delay, body = fake.handle(method, urlparse(self.path).path, data)
+        if delay:
+            time.sleep(delay)
+
+        content_type = 'text/html' if body is _BAD_GATEWAY else 'application/json'
+        encoding = _negotiate(self.headers.get('Accept-Encoding')) if fake.compression else None
+        if encoding is not None:
+            body = compress(body, encoding)
+
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        if encoding is not None:
+            self.send_header('Content-Encoding', encoding)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _negotiate(accept_encoding):
+    """Returns the first encoding accepted by the client which the server supports, or None."""
+    supported = available_encodings()
+    for encoding in (accept_encoding or '').split(','):
+        encoding = encoding.split(';')[0].strip().lower()
+        if encoding in supported:
+            return encoding
+    return None
+
+
+def _response(data=None, error=None, status='ok'):
+    return {'data': data, 'debug': None, 'error': error, 'status': status}
+
+
+def _rates(seed, count, nights=3):
+    """Returns generated rates of the hotel."""
+    rnd = random.Random(seed)
+    rates = list()
+    for i in range(count):
+        daily_prices = [round(rnd.uniform(30, 400), 2) for _ in range(nights)]
+        amount = round(sum(daily_prices), 2)
+        free_cancellation = rnd.random() < 0.5
+        rates.append({
+            'book_hash': 'h-{0:x}-{1}'.format(seed & 0xffffffff, i),
+            'match_hash': 'm-{0:x}-{1}'.format(seed & 0xffffffff, i),
+            'room_name': rnd.choice(('Standard Double Room', 'Superior Twin Room', 'Deluxe Suite', 'Studio')),
+            'meal': rnd.choice(MEALS),
+            'daily_prices': [str(price) for price in daily_prices],
+            'payment_options': {'payment_types': [{
+                'amount': str(amount),
+                'show_amount': str(amount),
+                'currency_code': 'EUR',
+                'show_currency_code': 'EUR',
+                'type': 'deposit',
+                'cancellation_penalties': {
+                    'free_cancellation_before': '2030-01-01T12:00:00' if free_cancellation else None,
+                    'policies': [],
+                },
+            }]},
+            'allotment': rnd.randint(1, 10),
+            'amenities_data': ['non-smoking', 'wi-fi'][:rnd.randint(0, 2)],
+            'any_residency': True,
+            'sell_price_limits': None,
+        })
+    return rates
+
+
+def _hotel(fake, hotel_id):
+    seed = int(hashlib.md5(str(hotel_id).encode('utf-8')).hexdigest()[:8], 16)
+    return {'id': hotel_id, 'rates': _rates(seed, fake.rates)}
+
+
+def _serp_hotels(fake, data):
+    return {'hotels': [_hotel(fake, hotel_id) for hotel_id in data.get('ids') or []], 'total_hotels': 0}
+
+
+def _serp_region(fake, data):
+    region_id = data.get('region_id') or 0
+    ids = ['hotel_{0}_{1}'.format(region_id, i) for i in range(fake.hotels)]
+    return {'hotels': [_hotel(fake, hotel_id) for hotel_id in ids], 'total_hotels': len(ids)}
+
+
+def _hotelpage(fake, data):
+    return {'hotels': [_hotel(fake, data.get('id'))]}
+
+
+def _multicomplete(fake, data):
+    query = data.get('query') or ''
+    return {
+        'hotels': [{'id': '{0}_hotel_{1}'.format(query.lower(), i), 'name': '{0} Hotel {1}'.format(query, i)}
+                   for i in range(5)],
+        'regions': [{'id': 1000 + i, 'name': '{0} {1}'.format(query, i), 'type': REGION_TYPES[i % 5],
+                     'country_code': 'GB'} for i in range(5)],
+    }
+
+
+def _region_list(fake, data):
+    last_id, limit = data.get('last_id') or 0, data.get('limit') or 1000
+    types = data.get('types')
+    regions = list()
+    for region_id in range(last_id + 1, fake.regions + 1):
+        region_type = REGION_TYPES[region_id % len(REGION_TYPES)]
+        if types and region_type not in types:
+            continue
+        regions.append({'id': region_id, 'type': region_type, 'country_code': 'GB',
+                        'name': {'en': 'Region {0}'.format(region_id), 'ru': 'Регион {0}'.format(region_id)}})
+        if len(regions) >= limit:
+            break
+    return regions
+
+
+def _booking_form(fake, data):
+    return {
+        'partner_order_id': data.get('partner_order_id'),
+        'order_id': 100500,
+        'item_id': 200500,
+        'payment_types': [{'type': 'deposit', 'amount': '100.00', 'currency_code': 'EUR'}],
+    }
+
+
+def _booking_finish(fake, data):
+    return None
+
+
+def _cancel(fake, data):
+    return {'amount_payable': {'amount': '0.00', 'currency_code': 'EUR'},
+            'amount_refunded': {'amount': '100.00', 'currency_code': 'EUR'}}
+
+
+def _contract_data_info(fake, data):
+    return {'contract_datas': [{'id': 1, 'currency': 'EUR', 'is_active': True}]}
+
+
+def _financial_info(fake, data):
+    return {'contract_datas': [{'id': 1, 'currency': 'EUR', 'balance': '1000.00'}]}
+
+
+_ANSWERS = {
+    'search/multicomplete/': _multicomplete,
+    'search/serp/hotels/': _serp_hotels,
+    'search/serp/region/': _serp_region,
+    'search/hp/': _hotelpage,
+    'hotel/order/booking/form/': _booking_form,
+    'hotel/order/booking/finish/': _booking_finish,
+    'hotel/order/cancel/': _cancel,
+    'region/list': _region_list,
+    'general/contract/data/info/': _contract_data_info,
+    'general/financial/info/': _financial_info,
+}
+
+
+def main(argv=None):
+    """Serves the fake API until interrupted, e.g. ``python -m etg.testing --hotels 2000``."""
+    parser = argparse.ArgumentParser(description='Local stand-in of ETG API Gateway.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=0)
+    parser.add_argument('--hotels', type=int, default=100, help='hotels found by region search')
+    parser.add_argument('--rates', type=int, default=5, help='rates of every hotel')
+    parser.add_argument('--regions', type=int, default=5000, help='regions of region list')
+    parser.add_argument('--latency', type=float, default=0.0, help='delay of responses in seconds')
+    parser.add_argument('--jitter', type=float, default=0.0, help='maximum random delay added in seconds')
+    parser.add_argument('--compression', action='store_true', help='compress responses as requested by clients')
+    args = parser.parse_args(argv)
+
+    server = FakeETGServer(host=args.host, port=args.port, hotels=args.hotels, rates=args.rates,
+                           regions=args.regions, latency=args.latency, jitter=args.jitter,
+                           compression=args.compression)
+    print(server.url, flush=True)
+    try:
+        server._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
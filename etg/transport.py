@@ -0,0 +1,418 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.transport
+~~~~~~~~~~~~~
+
+This module contains the HTTP transports of the client.
+"""
+
+import threading
+
+import requests
+import urllib3
+from requests.adapters import HTTPAdapter
+from requests.auth import HTTPBasicAuth
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover
+    httpx = None
+
+try:
+    import h2
+except ImportError:  # pragma: no cover
+    h2 = None
+
+from .exceptions import NetworkException
+
+#: Exceptions of requests raised when the connection failed, timed out or broke while reading the body.
+_REQUESTS_ERRORS = (requests.Timeout, requests.ConnectionError, requests.exceptions.ChunkedEncodingError)
+
+#: Exceptions of urllib3 raised while reading the raw body.
+_URLLIB3_ERRORS = (urllib3.exceptions.ProtocolError, urllib3.exceptions.TimeoutError, urllib3.exceptions.SSLError)
+
+
+class TransportResponse:
+
+    """
+    Response of a transport, the body is read on the first access to ``content`` or ``iter_content``.
+    """
+
+    def __init__(self, status_code, content, headers=None, request=None):
+        #: HTTP status code of the response.
+        self.status_code = status_code
+
+        #: HTTP headers of the response.
+        self.headers = headers if headers is not None else {}
+
+        #: Request sent by the transport, if the transport keeps it.
+        self.request = request
+
+        self._content = content
+
+    @property
+    def content(self):
+        """Body of the response."""
+        return self._content
+
+    @property
+    def content_encoding(self):
+        """Content encoding of the raw body, e.g. 'gzip', bodies of recorded responses are not encoded."""
+        return 'identity'
+
+    def iter_content(self, chunk_size):
+        """Yields chunks of the body of at most ``chunk_size`` bytes."""
+        content = self.content
+        for i in range(0, len(content), chunk_size):
+            yield content[i:i + chunk_size]
+
+    def iter_raw(self, chunk_size):
+        """Yields chunks of the body as received, not decoded from ``content_encoding``."""
+        return self.iter_content(chunk_size)
+
+    def close(self):
+        """Releases the connection of the response."""
+
+    async def aread(self):
+        """Returns the body of the response received by :class:`AsyncTransport`."""
+        return self.content
+
+    async def aiter_content(self, chunk_size):
+        """Yields chunks of the body of the response received by :class:`AsyncTransport`."""
+        for chunk in self.iter_content(chunk_size):
+            yield chunk
+
+    async def aiter_raw(self, chunk_size):
+        """Yields chunks of the raw body of the response received by :class:`AsyncTransport`."""
+        for chunk in self.iter_raw(chunk_size):
+            yield chunk
+
+    async def aclose(self):
+        """Releases the connection of the response received by :class:`AsyncTransport`."""
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+class Transport:
+
+    """
+    Interface of HTTP transports of :class:`etg.ETGClient`.
+    """
+    #: Maximum number of connections kept by the transport, None if it is not limited or not known.
+    pool_size = None
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        """Sends the request, returns the response as soon as its headers are received.
+
+        :param method: HTTP method, possible values: ``GET``, or ``POST``.
+        :type method: str
+        :param url: URL of the request.
+        :type url: str
+        :param params: (optional) query string parameters.
+        :type params: dict or None
+        :param data: (optional) body of the request.
+        :type data: bytes or None
+        :param headers: (optional) HTTP headers of the request.
+        :type headers: dict or None
+        :param timeout: (optional) connect and read timeouts in seconds, or one timeout for both.
+        :type timeout: (float, float) or float or None
+        :rtype: TransportResponse
+        :raises NetworkException: if the connection failed or timed out.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """Closes all pooled connections."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncTransport:
+
+    """
+    Interface of HTTP transports of :class:`etg.AsyncETGClient`, the same as :class:`Transport` but awaitable.
+    """
+    #: Maximum number of connections kept by the transport, None if it is not limited or not known.
+    pool_size = None
+
+    async def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        """Sends the request, returns the response as soon as its headers are received.
+
+        See :meth:`Transport.request` for the description of parameters.
+
+        :rtype: TransportResponse
+        :raises NetworkException: if the connection failed or timed out.
+        """
+        raise NotImplementedError
+
+    async def aclose(self):
+        """Closes all pooled connections."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+
+class RequestsTransport(Transport):
+
+    """
+    Transport based on a pooled :class:`requests.Session`, the default one.
+    """
+
+    def __init__(self, auth, verify_ssl=True,
+                 pool_connections=10, pool_maxsize=10, pool_block=False, keep_alive=True):
+        """Init.
+
+        See :class:`etg.ETGClient` for the description of parameters.
+        """
+        self.session = requests.Session()
+        self.session.auth = auth if isinstance(auth, HTTPBasicAuth) else HTTPBasicAuth(*auth)
+        self.session.verify = verify_ssl
+        if not keep_alive:
+            self.session.headers['Connection'] = 'close'
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=pool_block)
+        self.pool_size = pool_maxsize
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        try:
+            r = self.session.request(method, url, params=params, data=data, headers=headers, timeout=timeout,
+                                     stream=True)
+        except _REQUESTS_ERRORS as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+        return _RequestsResponse(r)
+
+    def close(self):
+        self.session.close()
+
+
+class _RequestsResponse(TransportResponse):
+    def __init__(self, r):
+        super().__init__(r.status_code, None, headers=r.headers, request=r.request)
+        self._r = r
+
+    @property
+    def content(self):
+        try:
+            return self._r.content
+        except _REQUESTS_ERRORS as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    @property
+    def content_encoding(self):
+        return self.headers.get('Content-Encoding', 'identity')
+
+    def iter_content(self, chunk_size):
+        try:
+            for chunk in self._r.iter_content(chunk_size):
+                yield chunk
+        except _REQUESTS_ERRORS as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    def iter_raw(self, chunk_size):
+        try:
+            for chunk in self._r.raw.stream(chunk_size, decode_content=False):
+                yield chunk
+        except _URLLIB3_ERRORS as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    def close(self):
+        self._r.close()
+
+
+class HTTPXTransport(Transport):
+
+    """
+    Transport based on :class:`httpx.Client` speaking HTTP/2 if the server supports it.
+
+    Over HTTP/2 concurrent requests are multiplexed over a few connections,
+    so fan-out searches do not open a socket per request.
+    No more than ``max_connections`` requests are in flight at a time, the other threads wait
+    for a response to be closed.
+    """
+
+    def __init__(self, auth=None, verify_ssl=True, http2=True,
+                 max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0, session=None):
+        """Init.
+
+        :param auth: (optional) user (key_id) and password (key) for basic auth, required unless ``session``
+            is given.
+        :type auth: (str, str) or httpx.BasicAuth or None
+        :param verify_ssl: (optional) controls whether we verify the server's SSL certificate, defaults to True.
+        :type verify_ssl: bool
+        :param http2: (optional) controls whether HTTP/2 is negotiated, defaults to True.
+        :type http2: bool
+        :param max_connections: (optional) maximum number of concurrent connections, defaults to 100.
+        :type max_connections: int or None
+        :param max_keepalive_connections: (optional) maximum number of idle connections kept open, defaults to 20.
+        :type max_keepalive_connections: int or None
+        :param keepalive_expiry: (optional) time in seconds an idle connection is kept open, defaults to 5.0.
+        :type keepalive_expiry: float or None
+        :param session: (optional) configured httpx client used instead of a new one.
+        :type session: httpx.Client or None
+        """
+        if session is None:
+            session = httpx.Client(**_httpx_options(type(self).__name__, auth, verify_ssl, http2, max_connections,
+                                                    max_keepalive_connections, keepalive_expiry))
+            self.pool_size = max_connections
+        self.session = session
+
+        # Requests queued in the sync pool of httpcore race with the responses being closed: the pool may
+        # close an idle connection as expired after it was handed to a waiting thread which already sends
+        # over it. Threads wait here instead, so the pool always has a connection for the request.
+        self._slots = threading.BoundedSemaphore(self.pool_size) if self.pool_size else None
+
+    def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        timeout = _httpx_timeout(timeout)
+        if self._slots is not None and not self._slots.acquire(timeout=timeout.pool):
+            raise NetworkException('Timed out waiting for a connection of the pool')
+        release = self._slots.release if self._slots is not None else None
+        request = self.session.build_request(method, url, params=params, content=data, headers=headers,
+                                             timeout=timeout)
+        try:
+            try:
+                r = self.session.send(request, stream=True)
+            except httpx.TransportError as ex:
+                raise NetworkException(str(ex) or type(ex).__name__) from ex
+        except BaseException:
+            if release is not None:
+                release()
+            raise
+        return _HTTPXResponse(r, release)
+
+    def close(self):
+        self.session.close()
+
+
+class AsyncHTTPXTransport(AsyncTransport):
+
+    """
+    Transport based on :class:`httpx.AsyncClient`, the default one of :class:`etg.AsyncETGClient`.
+
+    See :class:`HTTPXTransport` for the description of parameters.
+    """
+
+    def __init__(self, auth=None, verify_ssl=True, http2=True,
+                 max_connections=100, max_keepalive_connections=20, keepalive_expiry=5.0, session=None):
+        """Init."""
+        if session is None:
+            session = httpx.AsyncClient(**_httpx_options(type(self).__name__, auth, verify_ssl, http2,
+                                                         max_connections, max_keepalive_connections,
+                                                         keepalive_expiry))
+            self.pool_size = max_connections
+        self.session = session
+
+    async def request(self, method, url, params=None, data=None, headers=None, timeout=None):
+        request = self.session.build_request(method, url, params=params, content=data, headers=headers,
+                                             timeout=_httpx_timeout(timeout))
+        try:
+            r = await self.session.send(request, stream=True)
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+        return _HTTPXResponse(r)
+
+    async def aclose(self):
+        await self.session.aclose()
+
+
+class _HTTPXResponse(TransportResponse):
+    def __init__(self, r, release=None):
+        super().__init__(r.status_code, None, headers=r.headers, request=r.request)
+        self._r = r
+        self._release = release
+
+    @property
+    def content(self):
+        try:
+            return self._r.read()
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    @property
+    def content_encoding(self):
+        return self.headers.get('Content-Encoding', 'identity')
+
+    def iter_content(self, chunk_size):
+        try:
+            for chunk in self._r.iter_bytes(chunk_size):
+                yield chunk
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    def iter_raw(self, chunk_size):
+        try:
+            for chunk in self._r.iter_raw(chunk_size):
+                yield chunk
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    def close(self):
+        try:
+            self._r.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+    async def aread(self):
+        try:
+            return await self._r.aread()
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    async def aiter_content(self, chunk_size):
+        try:
+            async for chunk in self._r.aiter_bytes(chunk_size):
+                yield chunk
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    async def aiter_raw(self, chunk_size):
+        try:
+            async for chunk in self._r.aiter_raw(chunk_size):
+                yield chunk
+        except httpx.TransportError as ex:
+            raise NetworkException(str(ex) or type(ex).__name__) from ex
+
+    async def aclose(self):
+        await self._r.aclose()
+
+
+def _httpx_options(name, auth, verify_ssl, http2, max_connections, max_keepalive_connections, keepalive_expiry):
+    """Returns options of httpx client of the transport, checks that the dependencies are installed."""
+    if httpx is None:
+        raise ImportError('{0} requires httpx, install it with `pip install etg[http2]`.'.format(name))
+    if http2 and h2 is None:
+        raise ImportError('HTTP/2 requires h2, install it with `pip install etg[http2]`.')
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections,
+                          keepalive_expiry=keepalive_expiry)
+    if auth is not None and not isinstance(auth, httpx.BasicAuth):
+        auth = httpx.BasicAuth(*auth)
+    return dict(auth=auth, verify=verify_ssl, http2=http2, limits=limits)
+
+
+def _httpx_timeout(timeouts):
+    """Returns httpx timeout of connect and read timeouts."""
+    if not isinstance(timeouts, tuple):
+        return httpx.Timeout(timeouts)
+    connect, read = timeouts
+    return httpx.Timeout(read, connect=connect)
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+
+"""
+etg.utils
+~~~~~~~~~
+
+This module contains helpers used within the package.
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+
+def chunked(items, size):
+    """Splits the list into chunks of the given size."""
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def parallel_map(fn, items, max_workers=None):
+    """Calls the function for every item in worker threads, no more than ``max_workers`` at a time.
+
+    :return: results and errors keyed by the index of the item.
+    :rtype: (dict, dict)
+    """
+    results, errors = dict(), dict()
+    if not items:
+        return results, errors
+    if len(items) == 1 or max_workers == 1:
+        for i, item in enumerate(items):
+            try:
+                results[i] = fn(item)
+            except Exception as ex:
+                errors[i] = ex
+        return results, errors
+
+    with ThreadPoolExecutor(max_workers=max_workers or len(items)) as executor:
+        futures = [executor.submit(fn, item) for item in items]
+        for i, future in enumerate(futures):
+            try:
+                results[i] = future.result()
+            except Exception as ex:
+                errors[i] = ex
+    return results, errors
+
+
+async def gather_map(fn, items, max_concurrency=None):
+    """Awaits the coroutine function for every item, no more than ``max_concurrency`` at a time.
+
+    :return: results and errors keyed by the index of the item.
+    :rtype: (dict, dict)
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or len(items) or 1)
+
+    async def call(item):
+        async with semaphore:
+            return await fn(item)
+
+    outcomes = await asyncio.gather(*(call(item) for item in items), return_exceptions=True)
+    results, errors = dict(), dict()
+    for i, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            if not isinstance(outcome, Exception):
+                raise outcome
+            errors[i] = outcome
+        else:
+            results[i] = outcome
+    return results, errors
@@ -7,11 +7,20 @@ if sys.version_info[0] < 3:
 
 here = os.path.abspath(os.path.dirname(__file__))
 
-packages = ['etg']
+packages = ['etg', 'etg.aio', 'etg.models']
 
 requires = [
     'requests>=2.21.0, <3',
 ]
+extras_require = {
+    'async': ['httpx>=0.18'],
+    'http2': ['httpx[http2]>=0.18'],
+    'compression': ['brotli>=1.0', 'zstandard>=0.15'],
+    'fast': ['orjson>=3.0'],
+    'stream': ['ijson>=3.1'],
+    'columnar': ['numpy>=1.17'],
+    'export': ['pyarrow>=1.0'],
+}
 test_requirements = [
     'pytest>=5.4',
 ]
@@ -37,7 +46,9 @@ setup(
     packages=packages,
     package_dir={'etg': 'etg'},
     include_package_data=True,
+    python_requires='>=3.7',
     install_requires=requires,
+    extras_require=extras_require,
     license=about['__license__'],
     zip_safe=False,
     classifiers=[
@@ -45,10 +56,8 @@ setup(
         'Intended Audience :: Developers',
         'Natural Language :: English',
         'Programming Language :: Python',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3 :: Only',
         'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
     ],
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import json
+import time
+
+import httpx
+import pytest
+
+from etg import AsyncETGHotelsClient, RateFilter, ResponseCache
+from etg import (  # models
+    GuestData,
+)
+from etg.exceptions import AuthErrorException, DeadlineExceededException
+
+from .utils import load_response
+
+auth = ('key_id', 'key')
+
+
+def mock_client(handler, **kwargs):
+    client = AsyncETGHotelsClient(auth, **kwargs)
+    client.session = httpx.AsyncClient(auth=client.auth, transport=httpx.MockTransport(handler))
+    return client
+
+
+class TestAsyncClient:
+    checkin = datetime.date.today() + datetime.timedelta(days=60)
+    checkout = checkin + datetime.timedelta(days=5)
+
+    def test_search(self):
+        requests = []
+
+        def handler(request):
+            requests.append(request)
+            payload = json.loads(request.content)
+            hotels = [{'id': hotel_id, 'rates': []} for hotel_id in payload['ids']]
+            return httpx.Response(200, json={'data': {'hotels': hotels}, 'debug': None,
+                                             'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler) as client:
+                return await asyncio.gather(*(
+                    client.search_by_hotels([str(i)], self.checkin, self.checkout, [GuestData(2, [5])])
+                    for i in range(10)
+                ))
+
+        results = asyncio.run(run())
+        assert [hotels[0]['id'] for hotels in results] == [str(i) for i in range(10)]
+        assert json.loads(requests[0].content)['guests'] == [{'adults': 2, 'children': [5]}]
+        assert requests[0].url.path == '/api/b2b/v3/search/serp/hotels/'
+
+    def test_raise_for_error(self):
+        def handler(request):
+            return httpx.Response(401, json=load_response('error_incorrect_credentials.json'))
+
+        async def run():
+            async with mock_client(handler) as client:
+                await client.financial_info()
+
+        with pytest.raises(AuthErrorException):
+            asyncio.run(run())
+
+    def test_task_local_response(self):
+        def handler(request):
+            payload = json.loads(request.content)
+            return httpx.Response(200, json={'data': None, 'debug': {'request': payload},
+                                             'error': None, 'status': 'ok'})
+
+        async def search(client, hotel_id):
+            resp = await client.send('POST', 'api/b2b/v3/search/serp/hotels/', data={'ids': [hotel_id]})
+            await asyncio.sleep(0)
+            assert client.resp is resp
+            assert resp.http_status == 200
+            assert resp.size > 0
+            return client.resp.debug['request']['ids']
+
+        async def run():
+            async with mock_client(handler) as client:
+                return await asyncio.gather(*(search(client, str(i)) for i in range(5)))
+
+        assert asyncio.run(run()) == [[str(i)] for i in range(5)]
+
+    def test_search_matrix(self):
+        def handler(request):
+            payload = json.loads(request.content)
+            return httpx.Response(200, json={'data': {'hotels': [{'id': payload['residency']}]}, 'debug': None,
+                                             'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler) as client:
+                return await client.search_matrix(['hotel_1'], [(self.checkin, self.checkout)],
+                                                  [[GuestData(2)], [GuestData(2)]], residencies=['gb', 'us'],
+                                                  max_concurrency=2)
+
+        results = asyncio.run(run())
+        assert len(results) == 2
+        assert all(hotels[0]['id'] == combination.residency for combination, hotels in results.items())
+
+    def test_search_matrix_pool_size(self):
+        active, peak = [0], [0]
+
+        async def handler(request):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await asyncio.sleep(0.01)
+            active[0] -= 1
+            return httpx.Response(200, json={'data': {'hotels': []}, 'debug': None, 'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler, max_connections=3) as client:
+                dates = [(self.checkin + datetime.timedelta(days=i), self.checkout) for i in range(4)]
+                occupancies = [[GuestData(i)] for i in range(1, 4)]
+                results = await client.search_matrix(['hotel_1'], dates, occupancies)
+                hotels = await client.search_by_hotels([str(i) for i in range(20)], self.checkin, self.checkout,
+                                                       [GuestData(2)], chunk_size=2)
+                return results, hotels
+
+        results, hotels = asyncio.run(run())
+        assert len(results) == 12 and hotels == []
+        assert peak[0] == 3
+
+    def test_iter_regions(self):
+        def handler(request):
+            last_id = json.loads(request.url.params['data']).get('last_id', 0)
+            regions = [{'id': i} for i in range(last_id + 1, min(last_id + 1000, 1500) + 1)]
+            return httpx.Response(200, json={'data': regions, 'debug': None, 'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler) as client:
+                return [region['id'] async for region in client.iter_regions()]
+
+        assert asyncio.run(run()) == list(range(1, 1501))
+
+    def test_cache_coalescing(self):
+        requests = []
+
+        async def handler(request):
+            requests.append(request)
+            await asyncio.sleep(0.05)
+            return httpx.Response(200, json={'data': {'hotels': [{'id': 'test_hotel'}]}, 'debug': None,
+                                             'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler) as client:
+                client.cache = ResponseCache()
+                return await asyncio.gather(*(
+                    client.hotelpage('test_hotel', self.checkin, self.checkout, [GuestData(2)]) for _ in range(5)
+                ))
+
+        assert asyncio.run(run()) == [{'id': 'test_hotel'}] * 5
+        assert len(requests) == 1
+
+    def test_iter_search(self):
+        hotels = [{'id': str(i), 'rates': []} for i in range(100)]
+
+        def handler(request):
+            return httpx.Response(200, json={'data': {'hotels': hotels}, 'debug': None,
+                                             'error': None, 'status': 'ok'})
+
+        async def run(**kwargs):
+            async with mock_client(handler) as client:
+                return [hotel async for hotel in client.iter_search(6308866, self.checkin, self.checkout,
+                                                                    [GuestData(2)], **kwargs)]
+
+        assert asyncio.run(run()) == hotels
+        assert asyncio.run(run(rate_filter=RateFilter(max_price=100))) == []
+        with pytest.raises(TypeError):
+            asyncio.run(run(top_k=10))
+
+    def test_deadline(self):
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json={'data': {'hotels': []}, 'debug': None, 'error': None, 'status': 'ok'})
+
+        async def run():
+            async with mock_client(handler) as client:
+                await client.search(['test_hotel'], self.checkin, self.checkout, [GuestData(2)],
+                                    deadline=time.monotonic() + 0.05)
+
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededException):
+            asyncio.run(run())
+        assert time.monotonic() - started < 0.5
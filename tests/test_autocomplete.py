@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+from etg import AutocompleteCache, AutocompleteIndex, ETGHotelsClient, RegionStore
+
+from .utils import api_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+
+regions = [
+    {'id': 1, 'type': 'Country', 'country_code': 'DE', 'name': {'en': 'Germany', 'de': 'Deutschland'}},
+    {'id': 2, 'type': 'City', 'country_code': 'DE', 'name': {'en': 'Berlin', 'ru': 'Берлин'}},
+    {'id': 3, 'type': 'City', 'country_code': 'NO', 'name': {'en': 'Bergen'}},
+    {'id': 4, 'type': 'City', 'country_code': 'US', 'name': {'en': 'New York'}},
+]
+hotels = [
+    {'id': 'hotel_adlon', 'name': 'Hotel Adlon Kempinski Berlin'},
+]
+
+
+class TestAutocompleteIndex:
+    def test_search(self):
+        index = AutocompleteIndex.from_regions(regions, hotels=hotels)
+        results = index.search('ber')
+        assert [region['id'] for region in results['regions']] == [3, 2]
+        assert [hotel['id'] for hotel in results['hotels']] == ['hotel_adlon']
+        assert index.search('  YORK')['regions'][0] == {'id': 4, 'name': 'New York', 'type': 'City',
+                                                        'country_code': 'US'}
+        assert index.search('берл', language='ru')['regions'][0]['id'] == 2
+        assert index.search('berl', language='ru')['regions'] == []
+        assert index.search('ber', limit=1)['regions'][0]['id'] == 3
+
+    def test_save_load(self, tmp_path):
+        with RegionStore() as store:
+            store.update(regions)
+            index = AutocompleteIndex.from_regions(store, languages=('en', 'ru'))
+        path = str(tmp_path / 'index.json.gz')
+        index.save(path)
+        loaded = AutocompleteIndex.load(path)
+        assert loaded.search('Ber', language='en') == index.search('Ber', language='en')
+
+    def test_client_fallback(self):
+        client = ETGHotelsClient(auth, autocomplete_index=AutocompleteIndex.from_regions(regions))
+        adapter = mount_fake_adapter(client, lambda request: api_response(data={'hotels': [], 'regions': []}))
+        assert client.autocomplete('Berlin', language='en')['regions'][0]['id'] == 2
+        assert len(adapter.requests) == 0
+        client.autocomplete('Paris', language='en')
+        assert len(adapter.requests) == 1
+
+
+class TestAutocompleteCache:
+    def test_prefix_filtering(self):
+        cache = AutocompleteCache(maxsize=2)
+        cache.put('Berl', {'hotels': [{'id': 'h1', 'name': 'Berlin Mitte Hotel'}, {'id': 'h2', 'name': 'Berlo'}],
+                           'regions': [{'id': 2, 'name': 'Berlin'}]}, language='en')
+        assert cache.get('berlin', language='en') == {'hotels': [{'id': 'h1', 'name': 'Berlin Mitte Hotel'}],
+                                                      'regions': [{'id': 2, 'name': 'Berlin'}]}
+        assert cache.get('berlin', language='ru') is None
+        assert (cache.hits, cache.misses) == (1, 1)
+
+        # names match by the beginning of words only
+        cache.put('par', {'hotels': [{'id': 'h3', 'name': 'Sparkle Paris'}, {'id': 'h4', 'name': 'Hotel Parkside'}],
+                          'regions': []})
+        assert cache.get('park') == {'hotels': [{'id': 'h4', 'name': 'Hotel Parkside'}], 'regions': []}
+
+        # full categories could be cut off by API
+        cache.put('Par', {'hotels': [{'id': str(i), 'name': 'Paris'} for i in range(5)], 'regions': []})
+        assert cache.get('Paris') is None
+        assert len(cache) == 2
+
+    def test_client(self):
+        client = ETGHotelsClient(auth, autocomplete_cache=AutocompleteCache())
+        adapter = mount_fake_adapter(client, lambda request: api_response(
+            data={'hotels': [], 'regions': [{'id': 2, 'name': 'Berlin'}]}))
+        for query in ('Berl', 'Berli', 'Berlin'):
+            assert client.autocomplete(query, language='en')['regions'][0]['id'] == 2
+        assert len(adapter.requests) == 1
+        assert client.autocomplete_cache.hits == 2
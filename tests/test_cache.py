@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import gc
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from etg import ETGHotelsClient, GuestData, ResponseCache
+
+from .utils import api_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+
+
+class TestResponseCache:
+    checkin = datetime.date.today() + datetime.timedelta(days=60)
+    checkout = checkin + datetime.timedelta(days=5)
+
+    def test_uncacheable_endpoints(self):
+        with pytest.raises(ValueError):
+            ResponseCache(ttls={'api/b2b/v3/hotel/order/booking/form/': 10})
+
+    def test_ttl_and_lru(self):
+        cache = ResponseCache(ttls={'search/': 0.05}, maxsize=2)
+        for i in range(3):
+            cache.get_or_call('POST', 'search/', {'id': i}, lambda: i)
+        assert len(cache) == 2
+        assert cache.get_or_call('POST', 'search/', {'id': 2}, lambda: None) == 2
+        time.sleep(0.06)
+        assert cache.get_or_call('POST', 'search/', {'id': 2}, lambda: 'new') == 'new'
+        assert (cache.hits, cache.misses) == (1, 4)
+
+    def test_client(self):
+        client = ETGHotelsClient(auth, cache=ResponseCache())
+        adapter = mount_fake_adapter(client, lambda request: api_response(data={'hotels': [{'id': 'test_hotel'}]}))
+        for children in ([3, 7], [7, 3]):
+            client.hotelpage('test_hotel', self.checkin, self.checkout, [GuestData(2, children)])
+        assert len(adapter.requests) == 1  # order of children ages does not change the request
+        assert ResponseCache.key('POST', 'search/', {'guests': [GuestData(2, [7, 3])]}) == \
+            ResponseCache.key('POST', 'search/', {'guests': [GuestData(2, [3, 7])]})
+        assert client.resp.data == {'hotels': [{'id': 'test_hotel'}]}
+
+        client.make_reservation('order_1', 'book_hash', 'en', '8.8.8.8')
+        client.make_reservation('order_1', 'book_hash', 'en', '8.8.8.8')
+        assert len(adapter.requests) == 3
+
+    def test_coalescing(self):
+        client = ETGHotelsClient(auth, cache=ResponseCache())
+
+        def handler(request):
+            time.sleep(0.1)
+            return api_response(data={'hotels': [{'id': 'test_hotel'}]})
+
+        adapter = mount_fake_adapter(client, handler)
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            futures = [executor.submit(client.search_by_hotels, ['test_hotel'], self.checkin, self.checkout,
+                                       [GuestData(2)]) for _ in range(5)]
+            hotels = [future.result() for future in futures]
+        assert len(adapter.requests) == 1
+        assert all(result == [{'id': 'test_hotel'}] for result in hotels)
+        assert client.cache.coalesced + client.cache.hits == 4
+
+    def test_cancelled_leader(self):
+        cache = ResponseCache(ttls={'search/': 60})
+        calls, errors = [], []
+
+        async def search(result):
+            calls.append(result)
+            await asyncio.sleep(0.05)
+            if isinstance(result, Exception):
+                raise result
+            return result
+
+        async def run():
+            asyncio.get_running_loop().set_exception_handler(lambda loop, context: errors.append(context))
+            leader = asyncio.ensure_future(cache.aget_or_call('POST', 'search/', {'id': 1}, lambda: search('ok')))
+            follower = asyncio.ensure_future(cache.aget_or_call('POST', 'search/', {'id': 1}, lambda: search('dup')))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            assert await follower == 'ok'
+            # the result of the cancelled leader is cached
+            assert await cache.aget_or_call('POST', 'search/', {'id': 1}, lambda: search('new')) == 'ok'
+
+            leader = asyncio.ensure_future(cache.aget_or_call('POST', 'search/', {'id': 2},
+                                                              lambda: search(ValueError('failed'))))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            await asyncio.sleep(0.1)
+            assert not cache._async_inflight
+            gc.collect()
+
+        asyncio.run(run())
+        assert calls[0] == 'ok' and len(calls) == 2
+        assert not errors  # the exception of the task was retrieved
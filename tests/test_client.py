@@ -1,10 +1,15 @@
 # -*- coding: utf-8 -*-
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+import requests
 
 from etg import ETGClient
-from etg import ETGException
+from etg import DeadlineExceededException, ETGException, NetworkException
+
+from .utils import api_response, mount_fake_adapter
 
 auth = (os.getenv('ETG_KEY_ID'), os.getenv('ETG_KEY'))
 client = ETGClient(auth)
@@ -29,3 +34,75 @@ class TestResources:
     def test_financial_info(self):
         contracts = client.financial_info().get('contract_datas', [])
         assert len(contracts)
+
+
+class TestConnectionPool:
+    def test_pool_settings(self):
+        with ETGClient(auth, pool_connections=2, pool_maxsize=20, pool_block=True) as pooled_client:
+            adapter = pooled_client.session.get_adapter(pooled_client.API_HOST)
+            assert adapter._pool_connections == 2
+            assert adapter._pool_maxsize == 20
+            assert adapter._pool_block is True
+
+    def test_keep_alive(self):
+        with ETGClient(auth, keep_alive=False) as pooled_client:
+            assert pooled_client.session.headers.get('Connection') == 'close'
+
+
+class TestRequestScopedResponse:
+    def test_thread_local_response(self):
+        local_client = ETGClient(auth)
+        local_client.resp = 'main'
+
+        def worker():
+            assert local_client.resp is None
+            local_client.resp = 'worker'
+            return local_client.resp
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            assert executor.submit(worker).result() == 'worker'
+        assert local_client.resp == 'main'
+
+    def test_send(self):
+        local_client = ETGClient(auth)
+        mount_fake_adapter(local_client, lambda request: api_response(data={'contract_datas': []}))
+        resp = local_client.send('GET', 'api/b2b/v3/general/contract/data/info/')
+        assert resp is local_client.resp
+        assert resp.data == {'contract_datas': []}
+        assert resp.endpoint == 'api/b2b/v3/general/contract/data/info/'
+        assert resp.http_status == 200
+        assert resp.size > 0
+        assert resp.elapsed >= 0
+
+
+class TestDeadline:
+    endpoint = 'api/b2b/v3/general/contract/data/info/'
+
+    def test_http_timeout(self):
+        local_client = ETGClient(auth)
+        adapter = mount_fake_adapter(local_client, lambda request: api_response(data={}))
+        local_client.request('GET', self.endpoint)
+        local_client.request('GET', self.endpoint, deadline=time.monotonic() + 5)
+        assert adapter.timeouts[0] == (10, 120)
+        assert 4 < adapter.timeouts[1][0] <= 5
+        assert 4 < adapter.timeouts[1][1] <= 5
+
+    def test_deadline_passed(self):
+        local_client = ETGClient(auth)
+        adapter = mount_fake_adapter(local_client, lambda request: api_response(data={}))
+        with pytest.raises(DeadlineExceededException):
+            local_client.request('GET', self.endpoint, deadline=time.monotonic() - 1)
+        assert adapter.requests == []
+
+    def test_timeout_by_deadline(self):
+        def handler(request):
+            time.sleep(0.05)
+            raise requests.ReadTimeout()
+
+        local_client = ETGClient(auth)
+        mount_fake_adapter(local_client, handler)
+        with pytest.raises(NetworkException) as exinfo:
+            local_client.request('GET', self.endpoint)
+        assert isinstance(exinfo.value.__cause__, requests.ReadTimeout)
+        with pytest.raises(DeadlineExceededException):
+            local_client.request('GET', self.endpoint, deadline=time.monotonic() + 0.01)
@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+import json
+
+import pytest
+
+from etg import GuestData
+from etg.codec import CODECS, get_codec
+
+
+class TestCodecs:
+    @pytest.mark.parametrize('name', sorted(CODECS))
+    def test_roundtrip(self, name):
+        codec = get_codec(name)
+        data = {'guests': [GuestData(2, [5]), GuestData(1)], 'language': 'ru', 'query': 'Берлин'}
+        encoded = codec.dumps(data)
+        assert isinstance(encoded, bytes)
+        assert json.loads(encoded) == {'guests': [{'adults': 2, 'children': [5]}, {'adults': 1, 'children': []}],
+                                       'language': 'ru', 'query': 'Берлин'}
+        assert codec.loads(encoded) == json.loads(encoded)
+
+    def test_to_json_hook(self):
+        class Model:
+            def to_json(self):
+                return {'id': 1}
+
+        for name in CODECS:
+            assert json.loads(get_codec(name).dumps([Model()])) == [{'id': 1}]
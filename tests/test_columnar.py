@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+from etg import Hotel, RateTable
+
+from .test_filters import hotels
+
+
+class TestRateTable:
+    def test_from_hotels(self):
+        table = RateTable.from_hotels(hotels)
+        assert len(table) == 6
+        assert table.hotel_ids == ['expensive', 'cheap', 'middle', 'no_breakfast']
+        assert table.meals == ['breakfast', 'nomeal']
+        assert table.total_price.tolist() == [500.0, 80.0, 100.0, 200.0, 150.0, 90.0]
+        assert table.per_night_price.tolist() == [250.0, 40.0, 50.0, 100.0, 75.0, 45.0]
+        assert table.free_cancellation.tolist() == [True, False, True, True, False, False]
+
+        typed = RateTable.from_hotels(Hotel.from_dict(hotel) for hotel in hotels)
+        assert typed.total_price.tolist() == table.total_price.tolist()
+        assert typed.meal_code.tolist() == table.meal_code.tolist()
+
+    def test_ranking(self):
+        table = RateTable.from_hotels(hotels)
+        breakfast = table.where(meals=['breakfast'], free_cancellation=True, max_price=300).sort()
+        assert [table.hotel_ids[i] for i in breakfast.hotel_index] == ['cheap', 'middle']
+
+        cheapest = table.cheapest_per_hotel()
+        assert [record['hotel_id'] for record in cheapest.to_records()] == ['cheap', 'no_breakfast', 'middle',
+                                                                            'expensive']
+        assert cheapest.rate_index.tolist() == [0, 0, 1, 0]
+        np.testing.assert_array_equal(table.min_price_by_hotel(), [500.0, 80.0, 150.0, 90.0])
+        assert table.sort(by='per_night_price', descending=True).total_price[0] == 500.0
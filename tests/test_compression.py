@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+
+import pytest
+
+from etg import (
+    AsyncETGHotelsClient, Compression, ETGException, ETGHotelsClient, GuestData, HTTPXTransport, Instrumentation,
+    LatencyMetrics, RecordingTransport, ReplayTransport, RequestsTransport, TrafficStore,
+)
+from etg.compression import available_encodings, compress, decompress
+from etg.testing import FakeETGServer
+
+auth = ('key_id', 'key')
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=3)
+guests = [GuestData(2)]
+serp_region = 'api/b2b/v3/search/serp/region/'
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeETGServer(hotels=50, rates=3, compression=True) as server:
+        yield server
+
+
+class TestCompression:
+    @pytest.mark.parametrize('encoding', available_encodings())
+    def test_decoder(self, encoding):
+        body = b'{"data": [' + b','.join(b'{"id": %d}' % i for i in range(1000)) + b']}'
+        compressed = compress(body, encoding)
+        assert len(compressed) < len(body) / 3
+        assert decompress(compressed, encoding) == body
+
+        decoder = Compression().decoder(encoding)
+        chunks = [decoder.decompress(compressed[i:i + 7]) for i in range(0, len(compressed), 7)]
+        assert b''.join(chunks) + decoder.flush() == body
+        assert decoder.wire_size == len(compressed)
+
+    def test_encode(self):
+        compression = Compression(encodings=('gzip',), request_encoding='gzip', min_request_size=100)
+        body, headers = compression.encode(b'{}')
+        assert body == b'{}' and headers == {'Accept-Encoding': 'gzip'}
+
+        body, headers = compression.encode(b'{"ids": [%s]}' % b','.join(b'"hotel"' for _ in range(100)))
+        assert headers == {'Accept-Encoding': 'gzip', 'Content-Encoding': 'gzip'}
+        stats = compression.stats()
+        assert stats['wire_bytes_sent'] < stats['bytes_sent'] and stats['ratio'] is None
+
+    def test_errors(self):
+        with pytest.raises(ValueError):
+            Compression(encodings=('lzma',))
+        with pytest.raises(ETGException):
+            Compression().decoder('lzma')
+
+
+class TestClient:
+    @pytest.mark.parametrize('encoding', available_encodings())
+    def test_search(self, server, encoding):
+        instrumentation = Instrumentation()
+        metrics = LatencyMetrics().attach(instrumentation)
+        compression = Compression(encodings=(encoding,))
+        with server.client(ETGHotelsClient, compression=compression, instrumentation=instrumentation) as client:
+            hotels = client.search_by_region(6308866, checkin, checkout, guests)
+            assert len(hotels) == 50 and client.resp.size > 0
+            items = list(client.stream('POST', serp_region, {'region_id': 6308866, 'checkin': str(checkin)}))
+            assert [item['id'] for item in items] == [hotel['id'] for hotel in hotels]
+
+        stats = compression.stats()
+        assert stats['ratio'] > 3
+        summary = metrics.summary()[serp_region]
+        assert summary['count'] == 2
+        assert summary['wire_bytes_received'] == stats['wire_bytes_received']
+        assert summary['bytes_received'] == stats['bytes_received']
+
+    def test_compressed_body(self, server):
+        compression = Compression(encodings=('gzip',), request_encoding='gzip', min_request_size=0)
+        with server.client(ETGHotelsClient, compression=compression) as client:
+            ids = ['hotel_{0}'.format(i) for i in range(300)]
+            hotels = client.search_by_hotels(ids, checkin, checkout, guests, chunk_size=300)
+            assert [hotel['id'] for hotel in hotels] == ids
+            assert client.req.headers['Content-Encoding'] == 'gzip'
+        stats = compression.stats()
+        assert stats['wire_bytes_sent'] < stats['bytes_sent'] / 3
+
+    def test_httpx(self, server):
+        compression = Compression()
+        transport = HTTPXTransport(auth, http2=False)
+        with server.client(ETGHotelsClient, compression=compression, transport=transport) as client:
+            assert len(client.search_by_region(6308866, checkin, checkout, guests)) == 50
+            assert len(list(client.stream('POST', serp_region, {'region_id': 1}))) == 50
+        assert compression.stats()['ratio'] > 3
+
+    def test_async(self, server):
+        compression = Compression()
+
+        async def run():
+            async with server.client(AsyncETGHotelsClient, compression=compression) as client:
+                hotels = await client.search_by_region(6308866, checkin, checkout, guests)
+                items = [item async for item in client.stream('POST', serp_region, {'region_id': 1})]
+                return hotels, items
+
+        hotels, items = asyncio.run(run())
+        assert len(hotels) == len(items) == 50
+        assert compression.stats()['ratio'] > 3
+
+    def test_replay(self, server):
+        store = TrafficStore()
+        compression = Compression(encodings=('gzip',), request_encoding='gzip', min_request_size=0)
+        transport = RecordingTransport(RequestsTransport(auth), store)
+        with server.client(ETGHotelsClient, compression=compression, transport=transport) as client:
+            hotel = client.hotelpage('a', checkin, checkout, guests)
+
+        client = ETGHotelsClient(auth, compression=compression, transport=ReplayTransport(store, speed=None))
+        assert client.hotelpage('a', checkin, checkout, guests) == hotel
@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+import datetime
+import io
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from etg import GuestData, Hotel, SerpWriter
+
+from .test_filters import hotels
+
+params = {
+    'checkin': datetime.date(2030, 1, 1),
+    'checkout': '2030-01-03',
+    'guests': [GuestData(2, [5])],
+    'currency': 'EUR',
+}
+
+
+class TestSerpWriter:
+    def test_parquet(self, tmp_path):
+        path = str(tmp_path / 'serp.parquet')
+        with SerpWriter(path, batch_size=4) as writer:
+            writer.write(hotels, params)
+            writer.write(Hotel.from_dict({'id': 'no_rates', 'rates': []}), params)
+        assert writer.rows == 7
+
+        table = pq.read_table(path)
+        assert table.num_rows == 7
+        assert table.column('hotel_id').to_pylist()[:3] == ['expensive', 'cheap', 'cheap']
+        assert table.column('total_price').to_pylist()[:3] == [500.0, 80.0, 100.0]
+        assert table.column('daily_prices').to_pylist()[0] == [250.0, 250.0]
+        assert table.column('checkout').to_pylist()[0] == datetime.date(2030, 1, 3)
+        assert table.column('guests').to_pylist()[0] == '[{"adults": 2, "children": [5]}]'
+        assert table.column('rate_index').to_pylist()[-1] is None
+
+    def test_ipc(self):
+        sink = io.BytesIO()
+        with SerpWriter(sink, format='ipc') as writer:
+            writer.write((Hotel.from_dict(hotel) for hotel in hotels), params)
+        table = pa.ipc.open_stream(sink.getvalue()).read_all()
+        assert table.column('free_cancellation_before').to_pylist()[:2] == ['2030-01-01T12:00:00', None]
+        assert table.column('currency_code').to_pylist()[0] is None
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+import datetime
+
+from etg import ETGHotelsClient, GuestData, Hotel, RateFilter
+from etg.filters import has_free_cancellation, rate_price, select_hotels
+
+from .utils import api_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+
+
+def make_rate(amount, meal='nomeal', free_cancellation_before=None):
+    return {
+        'meal': meal,
+        'daily_prices': [str(amount / 2)] * 2,
+        'payment_options': {'payment_types': [{
+            'amount': str(amount),
+            'show_amount': str(amount),
+            'cancellation_penalties': {'free_cancellation_before': free_cancellation_before},
+        }]},
+    }
+
+
+hotels = [
+    {'id': 'expensive', 'rates': [make_rate(500, 'breakfast', '2030-01-01T12:00:00')]},
+    {'id': 'cheap', 'rates': [make_rate(80), make_rate(100, 'breakfast', '2030-01-01T12:00:00')]},
+    {'id': 'middle', 'rates': [make_rate(200, 'breakfast', '2030-01-01T12:00:00'), make_rate(150)]},
+    {'id': 'no_breakfast', 'rates': [make_rate(90)]},
+]
+
+
+class TestFilters:
+    def test_rate_helpers(self):
+        assert rate_price(make_rate(80)) == 80.0
+        assert rate_price({'daily_prices': ['10.5', '20']}) == 30.5
+        assert has_free_cancellation(make_rate(80, free_cancellation_before='2030-01-01T12:00:00'))
+        assert not has_free_cancellation(make_rate(80))
+
+    def test_rate_filter(self):
+        rate_filter = RateFilter(max_price=300, meals=('breakfast',), free_cancellation=True)
+        assert rate_filter(make_rate(100, 'breakfast', '2030-01-01T12:00:00'))
+        assert not rate_filter(make_rate(400, 'breakfast', '2030-01-01T12:00:00'))
+        assert not rate_filter(make_rate(100, 'nomeal', '2030-01-01T12:00:00'))
+        assert not rate_filter(make_rate(100, 'breakfast'))
+
+    def test_select_hotels(self):
+        rate_filter = RateFilter(meals=('breakfast',), free_cancellation=True)
+        selected = select_hotels(hotels, rate_filter=rate_filter, top_k=2)
+        assert [hotel['id'] for hotel in selected] == ['cheap', 'middle']
+        assert [rate_price(rate) for rate in selected[1]['rates']] == [200.0]
+        # source hotels are not modified
+        assert len(hotels[2]['rates']) == 2
+
+        assert [hotel['id'] for hotel in select_hotels(hotels, top_k=3)] == ['cheap', 'no_breakfast', 'middle']
+        assert len(select_hotels(hotels, rate_filter=RateFilter(max_price=90))) == 2
+
+    def test_search(self):
+        client = ETGHotelsClient(auth)
+        mount_fake_adapter(client, lambda request: api_response(data={'hotels': hotels}))
+        checkin = datetime.date.today() + datetime.timedelta(days=60)
+        selected = client.search_by_region(6308866, checkin, checkin + datetime.timedelta(days=2), [GuestData(2)],
+                                           rate_filter=RateFilter(meals=('breakfast',)), top_k=1)
+        assert [hotel['id'] for hotel in selected] == ['cheap']
+
+    def test_search_stream(self):
+        client = ETGHotelsClient(auth)
+        mount_fake_adapter(client, lambda request: api_response(data={'hotels': hotels}))
+        checkin = datetime.date.today() + datetime.timedelta(days=60)
+        checkout = checkin + datetime.timedelta(days=2)
+        kwargs = dict(rate_filter=RateFilter(meals=('breakfast',)), top_k=2)
+        selected = client.search_by_region(6308866, checkin, checkout, [GuestData(2)], **kwargs)
+        # decoded as a whole by default
+        assert client.resp.data is not None
+        assert client.search_by_region(6308866, checkin, checkout, [GuestData(2)], stream=True, **kwargs) == selected
+        assert client.resp.data is None
+
+    def test_search_typed_models(self):
+        client = ETGHotelsClient(auth, typed_models=True)
+        mount_fake_adapter(client, lambda request: api_response(data={'hotels': hotels}))
+        checkin = datetime.date.today() + datetime.timedelta(days=60)
+        checkout = checkin + datetime.timedelta(days=2)
+        selected = client.search_by_hotels([hotel['id'] for hotel in hotels], checkin, checkout, [GuestData(2)],
+                                           rate_filter=RateFilter(meals=('breakfast',)), top_k=2)
+        assert [(hotel.id, len(hotel.rates)) for hotel in selected] == [('cheap', 1), ('middle', 1)]
+        assert isinstance(selected[0], Hotel)
+
+        hotel = client.hotelpage('cheap', checkin, checkout, [GuestData(2)])
+        assert hotel.rates[0].amount == 500.0
@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+
+from etg import AsyncETGHotelsClient, ETGHotelsClient, GuestData, HedgingPolicy
+
+from .test_hotels import serp_handler
+from .utils import api_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=5)
+
+
+class TestHedgingPolicy:
+    def test_is_hedgeable(self):
+        policy = HedgingPolicy()
+        assert policy.is_hedgeable('api/b2b/v3/search/serp/hotels/')
+        assert policy.is_hedgeable('api/b2b/v3/search/hp/')
+        assert not policy.is_hedgeable('api/b2b/v3/hotel/order/booking/form/')
+
+    def test_hedge_delay(self):
+        policy = HedgingPolicy(percentile=95, delay=0.5, min_samples=10)
+        endpoint = 'api/b2b/v3/search/hp/'
+        assert policy.hedge_delay(endpoint) == 0.5
+        for i in range(100):
+            policy.observe(endpoint, i / 100.0)
+        assert policy.hedge_delay(endpoint) == 0.95
+        assert policy.hedge_delay('api/b2b/v3/search/serp/hotels/') == 0.5
+
+    def test_delay_from_start(self):
+        policy = HedgingPolicy(delay=0.1)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            executor.submit(time.sleep, 0.2)
+            # the first call waits for the busy worker, but it is fast once it starts
+            assert policy.call(executor, 'api/b2b/v3/search/hp/', lambda: time.sleep(0.01) or 'first') == 'first'
+        assert policy.hedged == 0
+
+    def test_discard(self):
+        policy = HedgingPolicy(delay=0.05)
+        results = iter([0.3, 0.01])
+        discarded = []
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            def fn():
+                delay = next(results)
+                time.sleep(delay)
+                return delay
+
+            assert policy.call(executor, 'api/b2b/v3/search/hp/', fn, discard=discarded.append) == 0.01
+        assert policy.hedged == 1 and discarded == [0.3]
+
+
+class TestHedgedRequests:
+    def test_first_response_wins(self):
+        calls = []
+        lock = threading.Lock()
+
+        def handler(request):
+            with lock:
+                calls.append(request)
+                first = len(calls) == 1
+            if first:
+                time.sleep(0.5)
+            return serp_handler(request)
+
+        policy = HedgingPolicy(delay=0.05)
+        client = ETGHotelsClient(auth, hedging=policy)
+        mount_fake_adapter(client, handler)
+        started = time.monotonic()
+        hotels = client.search(['hotel_1'], checkin, checkout, [GuestData(2)])
+        assert time.monotonic() - started < 0.4
+        assert hotels[0]['id'] == 'hotel_1'
+        assert client.resp.data == {'hotels': hotels}
+        assert client.req is not None
+        assert policy.hedged == 1 and len(calls) == 2
+
+    def test_fast_response_is_not_hedged(self):
+        policy = HedgingPolicy(delay=1.0)
+        client = ETGHotelsClient(auth, hedging=policy)
+        adapter = mount_fake_adapter(client, lambda request: api_response(data={}))
+        client.hotelpage('test_hotel', checkin, checkout, [GuestData(2)])
+        client.contract_data_info()
+        assert policy.hedged == 0 and len(adapter.requests) == 2
+
+    def test_async(self):
+        calls = []
+
+        async def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                await asyncio.sleep(0.5)
+            hotels = [{'id': hotel_id, 'rates': []} for hotel_id in json.loads(request.content)['ids']]
+            return httpx.Response(200, json=api_response(data={'hotels': hotels}))
+
+        policy = HedgingPolicy(delay=0.05)
+
+        async def run():
+            client = AsyncETGHotelsClient(auth, hedging=policy)
+            client.session = httpx.AsyncClient(auth=client.auth, transport=httpx.MockTransport(handler))
+            async with client:
+                hotels = await client.search(['hotel_1'], checkin, checkout, [GuestData(2)])
+                return hotels, client.resp
+
+        started = time.monotonic()
+        hotels, resp = asyncio.run(run())
+        assert time.monotonic() - started < 0.4
+        assert resp.data == {'hotels': hotels}
+        assert policy.hedged == 1 and len(calls) == 2
+
+    def test_stream(self):
+        calls = []
+        lock = threading.Lock()
+
+        def handler(request):
+            with lock:
+                calls.append(request)
+                first = len(calls) == 1
+            if first:
+                time.sleep(0.5)
+            return serp_handler(request)
+
+        policy = HedgingPolicy(delay=0.05)
+        client = ETGHotelsClient(auth, hedging=policy)
+        mount_fake_adapter(client, handler)
+        started = time.monotonic()
+        hotels = client.search(['hotel_1'], checkin, checkout, [GuestData(2)], top_k=1, stream=True)
+        assert time.monotonic() - started < 0.4
+        assert hotels[0]['id'] == 'hotel_1' and client.resp.ok
+        assert policy.hedged == 1 and len(calls) == 2
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import os
 import datetime
+import json
 import time
 import uuid
 
@@ -8,9 +9,11 @@ import pytest
 
 from etg import ETGHotelsClient
 from etg import (  # models
-    GuestData,
+    GuestData, SearchCombination,
 )
-from etg import ETGException
+from etg import ETGException, PartialResultException
+
+from .utils import api_response, mount_fake_adapter, region_list_handler
 
 auth = (os.getenv('ETG_KEY_ID'), os.getenv('ETG_KEY'))
 partner_email = os.getenv('ETG_MAIL')
@@ -187,3 +190,76 @@ class TestMainFlow:
             break
 
         assert is_canceled
+
+
+def serp_handler(request):
+    """Answers hotels search with one rate per hotel, fails for hotel ids starting with 'bad'."""
+    payload = json.loads(request.body)
+    if any(hotel_id.startswith('bad') for hotel_id in payload['ids']):
+        return api_response(error='invalid_params', status='error')
+    return api_response(data={'hotels': [{'id': hotel_id, 'rates': [{}]} for hotel_id in payload['ids']]})
+
+
+class TestConcurrentSearch:
+    checkin = datetime.date.today() + datetime.timedelta(days=60)
+    checkout = checkin + datetime.timedelta(days=5)
+    guests = [GuestData(2)]
+
+    def test_search_by_hotels_chunks(self):
+        local_client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(local_client, serp_handler)
+        ids = ['hotel_{0}'.format(i) for i in range(25)]
+        hotels = local_client.search_by_hotels(ids, self.checkin, self.checkout, self.guests,
+                                               chunk_size=10, max_workers=3)
+        assert [hotel['id'] for hotel in hotels] == ids
+        assert len(adapter.requests) == 3
+
+    def test_search_by_hotels_partial_result(self):
+        local_client = ETGHotelsClient(auth)
+        mount_fake_adapter(local_client, serp_handler)
+        ids = ['hotel_1', 'hotel_2', 'bad_3', 'hotel_4']
+        with pytest.raises(PartialResultException) as exinfo:
+            local_client.search_by_hotels(ids, self.checkin, self.checkout, self.guests, chunk_size=2)
+        assert [hotel['id'] for hotel in exinfo.value.results] == ['hotel_1', 'hotel_2']
+        assert list(exinfo.value.errors) == [('bad_3', 'hotel_4')]
+
+    def test_search_matrix(self):
+        local_client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(local_client, serp_handler)
+        dates = [(self.checkin, self.checkout), (self.checkout, self.checkout + datetime.timedelta(days=2))]
+        occupancies = [[GuestData(2, [3, 7])], [GuestData(2, [7, 3])], [GuestData(1)]]
+        residencies = ['gb', 'us']
+        results = local_client.search_matrix(['hotel_1'], dates, occupancies, residencies=residencies)
+
+        # equal guests configurations are searched once
+        assert len(results) == len(adapter.requests) == 2 * 2 * 2
+        combination = SearchCombination(self.checkin, self.checkout, (GuestData(2, [7, 3]),), 'us')
+        assert results[combination][0]['id'] == 'hotel_1'
+
+    def test_search_matrix_empty(self):
+        local_client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(local_client, serp_handler)
+        assert local_client.search_matrix(['hotel_1'], [], [self.guests]) == {}
+        assert not adapter.requests
+
+    def test_search_deadline(self):
+        local_client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(local_client, serp_handler)
+        local_client.search_by_hotels(['hotel_1', 'hotel_2'], self.checkin, self.checkout, self.guests,
+                                      chunk_size=1, timeout=20, deadline=time.monotonic() + 10)
+        local_client.search(['hotel_1'], self.checkin, self.checkout, self.guests, timeout=5,
+                            deadline=time.monotonic() + 10)
+
+        # API timeout is cut down to the time left before the deadline
+        assert [json.loads(request.body)['timeout'] for request in adapter.requests] == [8, 8, 5]
+        assert all(timeout[1] <= 10 for timeout in adapter.timeouts)
+
+
+class TestRegions:
+    def test_iter_regions(self):
+        local_client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(local_client, region_list_handler)
+        regions = local_client.iter_regions(limit=1000)
+        assert next(regions)['id'] == 1
+        assert [region['id'] for region in regions] == list(range(2, 2501))
+        assert len(adapter.requests) == 3
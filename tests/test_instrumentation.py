@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from etg import AsyncETGClient, ETGClient, Instrumentation, LatencyMetrics
+from etg.exceptions import BadRequestException
+from etg.instrumentation import LatencyHistogram, RequestEvent
+
+from .utils import api_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+endpoint = 'api/b2b/v3/general/contract/data/info/'
+
+
+def recorder(instrumentation):
+    """Subscribes to all events, returns the list of received event names."""
+    received = []
+    for name in Instrumentation.EVENTS:
+        instrumentation.subscribe(name, lambda event, name=name: received.append((name, event)))
+    return received
+
+
+class TestInstrumentation:
+    def test_subscribe(self):
+        instrumentation = Instrumentation()
+        assert not instrumentation.active
+        instrumentation.subscribe('after_body', print)
+        assert instrumentation.active
+        instrumentation.unsubscribe('after_body', print)
+        assert not instrumentation.active
+        with pytest.raises(ValueError):
+            instrumentation.subscribe('after_everything', print)
+
+    def test_events(self):
+        instrumentation = Instrumentation()
+        received = recorder(instrumentation)
+        client = ETGClient(auth, instrumentation=instrumentation)
+        mount_fake_adapter(client, lambda request: api_response(data={'contract_datas': []}))
+        client.request('POST', endpoint, data={'limit': 1})
+
+        assert [name for name, _ in received] == ['before_send', 'after_headers', 'after_body', 'after_decode']
+        event = received[-1][1]
+        assert event.endpoint == endpoint and event.http_status == 200
+        assert event.request_size == len(client.codec.dumps({'limit': 1}))
+        assert event.response_size == client.resp.size
+        assert 0 <= event.headers_elapsed <= event.body_elapsed <= event.decode_elapsed
+        assert event.decode_time >= 0 and event.error is None
+
+    def test_on_error(self):
+        instrumentation = Instrumentation()
+        received = recorder(instrumentation)
+        client = ETGClient(auth, instrumentation=instrumentation)
+        mount_fake_adapter(client, lambda request: api_response(error='invalid_params', status='error'))
+        with pytest.raises(BadRequestException):
+            client.request('GET', endpoint)
+        assert [name for name, _ in received][-2:] == ['after_decode', 'on_error']
+        assert isinstance(received[-1][1].error, BadRequestException)
+
+    def test_no_listeners(self):
+        instrumentation = Instrumentation()
+        client = ETGClient(auth, instrumentation=instrumentation)
+        mount_fake_adapter(client, lambda request: api_response(data={}))
+        assert client._event('GET', endpoint, None, None) is None
+        assert client.request('GET', endpoint) == {}
+
+    def test_async(self):
+        instrumentation = Instrumentation()
+        received = recorder(instrumentation)
+
+        def handler(request):
+            return httpx.Response(200, json=api_response(data={'contract_datas': []}))
+
+        async def run():
+            client = AsyncETGClient(auth, instrumentation=instrumentation)
+            client.session = httpx.AsyncClient(auth=client.auth, transport=httpx.MockTransport(handler))
+            async with client:
+                return await client.contract_data_info()
+
+        assert asyncio.run(run()) == {'contract_datas': []}
+        assert [name for name, _ in received] == ['before_send', 'after_headers', 'after_body', 'after_decode']
+        assert received[-1][1].http_status == 200
+
+
+class TestLatencyMetrics:
+    def test_histogram(self):
+        histogram = LatencyHistogram(precision=0.01)
+        assert histogram.percentile(50) is None
+        for i in range(1, 1001):
+            histogram.record(i / 1000.0)
+        assert histogram.percentile(50) == pytest.approx(0.5, rel=0.01)
+        assert histogram.percentile(99) == pytest.approx(0.99, rel=0.01)
+        assert histogram.percentile(100) == pytest.approx(1.0, rel=0.01)
+
+    def test_metrics(self):
+        instrumentation = Instrumentation()
+        metrics = LatencyMetrics().attach(instrumentation)
+        client = ETGClient(auth, instrumentation=instrumentation)
+        adapter = mount_fake_adapter(client, lambda request: api_response(data={}))
+        for _ in range(10):
+            client.request('GET', endpoint)
+        adapter.handler = lambda request: api_response(error='invalid_params', status='error')
+        with pytest.raises(BadRequestException):
+            client.request('GET', endpoint)
+
+        summary = metrics.summary()[endpoint]
+        assert summary['count'] == 11 and summary['errors'] == 1
+        assert summary['bytes_received'] > 0
+        assert 0 < summary['p50'] <= summary['p95'] <= summary['p99']
+        assert set(metrics.percentiles(endpoint, stage='decode')) == {'p50', 'p95', 'p99'}
+        assert metrics.percentiles('unknown') == {'p50': None, 'p95': None, 'p99': None}
+
+        metrics.detach(instrumentation)
+        assert not instrumentation.active
+
+    def test_summary_while_recording(self):
+        metrics = LatencyMetrics()
+
+        def record():
+            for i in range(5000):
+                metrics.record_error(RequestEvent('GET', 'endpoint/{0}/'.format(i)))
+
+        thread = threading.Thread(target=record)
+        thread.start()
+        while thread.is_alive():
+            for summary in metrics.summary().values():
+                assert summary['count'] == summary['errors'] == 1
+        thread.join()
+        assert len(metrics.summary()) == 5000
@@ -2,8 +2,9 @@
 import pytest
 
 from etg import Response
+from etg import DailyPrice, Hotel, Rate
 from etg.exceptions import (
-    ETGException, BadRequestException, AuthErrorException
+    ETGException, BadRequestException, AuthErrorException, RateLimitExceededException
 )
 
 from .utils import load_response
@@ -17,7 +18,7 @@ class TestClientResponse:
             (AuthErrorException, 'error_no_auth_header.json'),
             (BadRequestException, 'error_invalid_params.json'),
             (ETGException, 'error_decoding_json.json'),
-            (ETGException, 'error_endpoint_exceeded_limit.json'),
+            (RateLimitExceededException, 'error_endpoint_exceeded_limit.json'),
             (ETGException, 'error_unknown.json'),
         ))
     def test_raise_for_error(self, exception, fn):
@@ -25,3 +26,38 @@ class TestClientResponse:
             resp = Response(**load_response(fn))
             resp.raise_for_error()
         print(str(exinfo.value))
+
+
+class TestHotelModels:
+    rate = {
+        'book_hash': 'h-1',
+        'match_hash': 'm-1',
+        'room_name': 'Standard Double',
+        'meal': 'breakfast',
+        'daily_prices': ['50.00', '60.50'],
+        'payment_options': {'payment_types': [{
+            'amount': '110.50', 'show_amount': '110.50', 'currency_code': 'EUR', 'show_currency_code': 'EUR',
+            'cancellation_penalties': {'free_cancellation_before': '2030-01-01T12:00:00'},
+        }]},
+        'amenities_data': ['wi-fi'],
+    }
+
+    def test_rate(self):
+        rate = Rate.from_dict(self.rate)
+        assert rate.amount == 110.5
+        assert rate.currency_code == 'EUR'
+        assert rate.free_cancellation_before == '2030-01-01T12:00:00'
+        assert rate.daily_prices == [DailyPrice(0, 50.0), DailyPrice(1, 60.5)]
+        assert set(rate.extra) == {'payment_options', 'amenities_data'}
+        assert rate.amenities_data == ['wi-fi']
+        assert rate.get('payment_options') == self.rate['payment_options']
+        assert rate.to_dict() == dict(self.rate, daily_prices=[50.0, 60.5])
+        with pytest.raises(AttributeError):
+            rate.unknown_field
+
+    def test_hotel(self):
+        hotel = Hotel.from_dict({'id': 'test_hotel', 'rates': [self.rate], 'bar_rate_price_data': None})
+        assert hotel.id == 'test_hotel'
+        assert hotel.get('rates')[0].book_hash == 'h-1'
+        assert hotel.bar_rate_price_data is None
+        assert not hasattr(hotel, '__dict__')
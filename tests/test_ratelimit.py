@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import time
+
+import pytest
+
+from etg import DeadlineExceededException, ETGHotelsClient, RateLimiter, RateLimitExceededException
+from etg.ratelimit import FileBackend, endpoint_key
+
+from .utils import load_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+endpoint = 'api/b2b/v3/search/serp/region/'
+
+
+class TestRateLimiter:
+    def test_endpoint_key(self):
+        assert endpoint_key(endpoint) == endpoint_key('search/serp/region/') == 'search/serp/region/'
+
+    def test_reserve(self):
+        limiter = RateLimiter({'search/serp/region/': (10, 1)})
+        assert [limiter.reserve(endpoint) for _ in range(10)] == [0.0] * 10
+        assert limiter.reserve(endpoint) == pytest.approx(0.1, abs=0.01)
+        assert limiter.reserve(endpoint) == pytest.approx(0.2, abs=0.01)
+        assert limiter.reserve('api/b2b/v3/search/hp/') == 0.0
+
+    def test_throttled(self):
+        limiter = RateLimiter({}, default=(10, 1))
+        limiter.throttled(endpoint)
+        assert limiter.reserve(endpoint) == pytest.approx(0.2, abs=0.01)
+        limiter.throttled(endpoint)
+        assert limiter.reserve(endpoint) == pytest.approx(0.8, abs=0.02)
+
+    def test_acquire_async(self):
+        limiter = RateLimiter({}, default=(100, 1))
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            started = loop.time()
+            await asyncio.gather(*(limiter.acquire_async(endpoint) for _ in range(105)))
+            return loop.time() - started
+
+        assert asyncio.run(run()) >= 0.04
+
+    def test_deadline(self):
+        limiter = RateLimiter({endpoint: (1, 1)})
+        limiter.acquire(endpoint, deadline=time.monotonic() + 0.1)
+        started = time.monotonic()
+        with pytest.raises(DeadlineExceededException):
+            limiter.acquire(endpoint, deadline=started + 0.5)
+        with pytest.raises(DeadlineExceededException):
+            asyncio.run(limiter.acquire_async(endpoint, deadline=started + 0.5))
+        assert time.monotonic() - started < 0.1
+        # the tokens of the failed calls are given back
+        assert limiter.reserve(endpoint) == pytest.approx(1.0, abs=0.1)
+
+        client = ETGHotelsClient(auth, rate_limiter=limiter)
+        with pytest.raises(DeadlineExceededException):
+            client.request('POST', endpoint, data={}, deadline=time.monotonic() + 0.5)
+
+    def test_file_backend(self, tmp_path):
+        path = str(tmp_path / 'limits.json')
+        first = RateLimiter({endpoint: (2, 1)}, backend=FileBackend(path))
+        second = RateLimiter({endpoint: (2, 1)}, backend=FileBackend(path))
+        assert first.reserve(endpoint) == 0.0
+        assert second.reserve(endpoint) == 0.0
+        assert first.reserve(endpoint) > 0.0
+
+    def test_client_throttling(self):
+        limiter = RateLimiter({endpoint: (10, 1)})
+        client = ETGHotelsClient(auth, rate_limiter=limiter)
+        mount_fake_adapter(client, lambda request: load_response('error_endpoint_exceeded_limit.json'))
+        with pytest.raises(RateLimitExceededException):
+            client.request('POST', endpoint, data={})
+        assert limiter.reserve(endpoint) > 0.0
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+from etg import ETGHotelsClient, RegionStore
+
+from .utils import mount_fake_adapter, region_list_handler
+
+auth = ('key_id', 'key')
+
+
+class TestRegionStore:
+    regions = [
+        {'id': 1, 'type': 'Country', 'name': {'en': 'Germany', 'de': 'Deutschland'}},
+        {'id': 2, 'type': 'City', 'name': {'en': 'Berlin', 'ru': 'Берлин'}},
+        {'id': 3, 'type': 'City', 'name': {'en': 'Bergen'}},
+    ]
+
+    def test_lookups(self):
+        with RegionStore() as store:
+            assert store.update(self.regions) == 3
+            assert store.get(2) == self.regions[1]
+            assert store.get(4) is None
+            assert [region['id'] for region in store.find_by_type('City')] == [2, 3]
+            assert store.find_by_name('berlin') == [self.regions[1]]
+            assert store.find_by_name('БЕРЛИН', language='ru') == [self.regions[1]]
+            assert store.find_by_name('Berlin', language='de') == []
+            assert [region['id'] for region in store.find_by_name('Ber', prefix=True)] == [2, 3]
+
+    def test_sync(self, tmp_path):
+        client = ETGHotelsClient(auth)
+        adapter = mount_fake_adapter(client, region_list_handler)
+        path = str(tmp_path / 'regions.db')
+        with RegionStore(path) as store:
+            store.update([{'id': i, 'type': 'City'} for i in range(1, 2001)])
+            assert store.sync(client) == 500
+        assert len(adapter.requests) == 1
+
+        with RegionStore(path) as store:
+            assert len(store) == store.last_id == 2500
+            assert store.sync(client) == 0
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+
+import pytest
+
+from etg import (
+    ETGHotelsClient, GuestData, RecordingTransport, ReplayMissException, ReplayTransport, RequestsTransport,
+    TrafficStore, replay_traffic,
+)
+from etg.testing import FakeETGServer
+
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=3)
+guests = [GuestData(2)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    with FakeETGServer(hotels=20, rates=2, latency={'search/hp/': 0.05}) as server:
+        with TrafficStore(str(tmp_path / 'traffic.db')) as store:
+            transport = RecordingTransport(RequestsTransport(('key_id', 'key')), store)
+            client = server.client(ETGHotelsClient, transport=transport)
+            client.search_by_region(6308866, checkin, checkout, guests)
+            client.hotelpage('a', checkin, checkout, guests)
+            client.region_list(limit=10)
+            client.close()
+            yield store
+
+
+class TestTrafficStore:
+    def test_record(self, store):
+        exchanges = list(store)
+        assert len(store) == len(exchanges) == 3
+        assert [exchange.endpoint for exchange in exchanges] == [
+            'api/b2b/v3/search/serp/region/', 'api/b2b/v3/search/hp/', 'region/list',
+        ]
+        assert exchanges[0].data['region_id'] == 6308866 and exchanges[0].status == 200
+        assert exchanges[1].latency >= 0.05
+        assert exchanges[0].started <= exchanges[1].started <= exchanges[2].started
+        assert store.count(exchanges[1].key) == 1
+        assert store.find(exchanges[1].key) == exchanges[1]
+        assert store.find(exchanges[1].key, 1) is None
+
+    def test_compressed(self, store):
+        body = store.find(next(iter(store)).key).body
+        raw = store._conn.execute('SELECT SUM(LENGTH(body)) FROM exchanges').fetchone()[0]
+        assert raw < len(body) / 3
+
+
+class TestReplayTransport:
+    def test_replay(self, store):
+        client = ETGHotelsClient(('key_id', 'key'), transport=ReplayTransport(store))
+        client.API_HOST = 'https://offline.invalid'
+        hotels = client.search_by_region(6308866, checkin, checkout, guests)
+        assert len(hotels) == 20
+
+        started = time.monotonic()
+        assert client.hotelpage('a', checkin, checkout, guests)['id'] == 'a'
+        assert time.monotonic() - started >= 0.05
+
+        # recorded once, replayed again and again
+        assert client.hotelpage('a', checkin, checkout, guests)['id'] == 'a'
+        with pytest.raises(ReplayMissException):
+            client.hotelpage('b', checkin, checkout, guests)
+
+    def test_accelerated(self, store):
+        client = ETGHotelsClient(('key_id', 'key'), transport=ReplayTransport(store, speed=None))
+        started = time.monotonic()
+        assert client.hotelpage('a', checkin, checkout, guests)['id'] == 'a'
+        assert time.monotonic() - started < 0.05
+
+
+def test_replay_traffic(store):
+    client = ETGHotelsClient(('key_id', 'key'), transport=ReplayTransport(store, speed=10))
+    results, errors = replay_traffic(store, client, speed=10)
+    assert not errors
+    assert [results[i].endpoint for i in range(3)] == [exchange.endpoint for exchange in store]
+    assert len(results[2].data) == 10
@@ -0,0 +1,244 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import time
+
+import httpx
+import pytest
+import requests
+
+from etg import (
+    AsyncETGClient, AsyncETGHotelsClient, CircuitBreaker, ETGClient, ETGHotelsClient, GuestData, RetryPolicy,
+)
+from etg import (  # exceptions
+    BadRequestException, CircuitOpenException, NetworkException, RateLimitExceededException,
+    ServerErrorException, TransientException,
+)
+from etg.retry import call_with_retries, call_with_retries_async
+
+from .utils import api_response, load_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+endpoint = 'api/b2b/v3/general/contract/data/info/'
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=3)
+guests = [GuestData(2)]
+
+
+def flaky_handler(failures, error=None):
+    """Fails the first requests with the given error, by default with 502 Bad Gateway page."""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        if len(calls) <= failures:
+            if error is not None:
+                raise error
+            return 502, b'<html>Bad Gateway</html>'
+        return api_response(data={'contract_datas': []})
+
+    return handler, calls
+
+
+class TestExceptions:
+    def test_transient(self):
+        assert issubclass(RateLimitExceededException, TransientException)
+        assert issubclass(ServerErrorException, TransientException)
+        assert not issubclass(BadRequestException, TransientException)
+
+    def test_server_error(self):
+        client = ETGClient(auth)
+        mount_fake_adapter(client, flaky_handler(1)[0])
+        with pytest.raises(ServerErrorException):
+            client.request('GET', endpoint)
+
+    def test_network_error(self):
+        client = ETGClient(auth)
+        mount_fake_adapter(client, flaky_handler(1, requests.ConnectionError('reset'))[0])
+        with pytest.raises(NetworkException):
+            client.request('GET', endpoint)
+
+
+class TestRetryPolicy:
+    def test_delay(self):
+        policy = RetryPolicy(backoff=0.5, max_backoff=1.5)
+        assert all(0 <= policy.delay(0) <= 0.5 for _ in range(100))
+        assert all(0 <= policy.delay(5) <= 1.5 for _ in range(100))
+
+    def test_should_retry(self):
+        policy = RetryPolicy(max_attempts=3)
+        assert policy.should_retry(endpoint, ServerErrorException(), 1)
+        assert not policy.should_retry(endpoint, ServerErrorException(), 2)
+        assert not policy.should_retry(endpoint, BadRequestException(), 0)
+        assert not policy.should_retry('api/b2b/v3/hotel/order/booking/form/', NetworkException(), 0)
+
+    def test_retry(self):
+        policy = RetryPolicy(max_attempts=3, backoff=0.01)
+        client = ETGClient(auth, retry_policy=policy)
+        handler, calls = flaky_handler(2, requests.ConnectionError('reset'))
+        mount_fake_adapter(client, handler)
+        assert client.contract_data_info() == {'contract_datas': []}
+        assert len(calls) == 3 and policy.retries == 2
+
+    def test_retries_exhausted(self):
+        client = ETGClient(auth, retry_policy=RetryPolicy(max_attempts=2, backoff=0.01))
+        handler, calls = flaky_handler(5)
+        mount_fake_adapter(client, handler)
+        with pytest.raises(ServerErrorException):
+            client.contract_data_info()
+        assert len(calls) == 2
+
+    def test_not_idempotent(self):
+        client = ETGClient(auth, retry_policy=RetryPolicy(backoff=0.01))
+        handler, calls = flaky_handler(1)
+        mount_fake_adapter(client, handler)
+        with pytest.raises(ServerErrorException):
+            client.request('POST', 'api/b2b/v3/hotel/order/booking/form/', data={})
+        assert len(calls) == 1
+
+    def test_deadline(self):
+        client = ETGClient(auth, retry_policy=RetryPolicy(backoff=10, max_backoff=10))
+        handler, calls = flaky_handler(5)
+        mount_fake_adapter(client, handler)
+        started = time.monotonic()
+        with pytest.raises(ServerErrorException):
+            client.request('GET', endpoint, deadline=time.monotonic() + 0.5)
+        assert time.monotonic() - started < 0.5
+
+    def test_async(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            if len(calls) == 1:
+                return httpx.Response(429, json=load_response('error_endpoint_exceeded_limit.json'))
+            return httpx.Response(200, json=api_response(data={'contract_datas': []}))
+
+        async def run():
+            client = AsyncETGClient(auth, retry_policy=RetryPolicy(backoff=0.01))
+            client.session = httpx.AsyncClient(auth=client.auth, transport=httpx.MockTransport(handler))
+            async with client:
+                return await client.contract_data_info()
+
+        assert asyncio.run(run()) == {'contract_datas': []}
+        assert len(calls) == 2
+
+
+class TestCircuitBreaker:
+    def test_open(self):
+        breaker = CircuitBreaker(failure_rate=0.5, min_requests=4, reset_timeout=60)
+        for ex in (None, ServerErrorException(), NetworkException()):
+            breaker.record(endpoint, ex)
+        assert breaker.state(endpoint) == CircuitBreaker.CLOSED
+        breaker.record(endpoint, BadRequestException())
+        assert breaker.state(endpoint) == CircuitBreaker.CLOSED
+        breaker.record(endpoint, ServerErrorException())
+        assert breaker.state(endpoint) == CircuitBreaker.OPEN
+        with pytest.raises(CircuitOpenException):
+            breaker.before_call(endpoint)
+        breaker.before_call('api/b2b/v3/search/hp/')
+
+    def test_half_open(self):
+        breaker = CircuitBreaker(min_requests=1, reset_timeout=0.05)
+        breaker.record(endpoint, ServerErrorException())
+        time.sleep(0.06)
+        token = breaker.before_call(endpoint)
+        assert breaker.state(endpoint) == CircuitBreaker.HALF_OPEN
+        with pytest.raises(CircuitOpenException):
+            breaker.before_call(endpoint)
+        breaker.record(endpoint, ServerErrorException(), token)
+        assert breaker.state(endpoint) == CircuitBreaker.OPEN
+
+        time.sleep(0.06)
+        token = breaker.before_call(endpoint)
+        breaker.record(endpoint, token=token)
+        assert breaker.state(endpoint) == CircuitBreaker.CLOSED
+
+    def test_late_outcomes(self):
+        breaker = CircuitBreaker(min_requests=1, reset_timeout=0.05)
+        assert breaker.before_call(endpoint) is None
+        breaker.record(endpoint, ServerErrorException())
+        time.sleep(0.06)
+        token = breaker.before_call(endpoint)
+
+        # requests let through before the circuit opened do not settle the trial
+        breaker.record(endpoint)
+        breaker.cancel(endpoint)
+        assert breaker.state(endpoint) == CircuitBreaker.HALF_OPEN
+        breaker.record(endpoint, NetworkException())
+        assert breaker.state(endpoint) == CircuitBreaker.HALF_OPEN
+
+        breaker.record(endpoint, token=token)
+        assert breaker.state(endpoint) == CircuitBreaker.CLOSED
+
+    def test_cancelled_trial(self):
+        breaker = CircuitBreaker(min_requests=1, reset_timeout=0.05)
+        breaker.record(endpoint, ServerErrorException())
+        time.sleep(0.06)
+
+        def interrupted():
+            raise KeyboardInterrupt
+
+        with pytest.raises(KeyboardInterrupt):
+            call_with_retries(interrupted, endpoint, circuit_breaker=breaker)
+        assert breaker.state(endpoint) == CircuitBreaker.OPEN
+
+        async def slow():
+            await asyncio.sleep(1)
+
+        async def run():
+            await asyncio.wait_for(call_with_retries_async(slow, endpoint, circuit_breaker=breaker), 0.01)
+
+        time.sleep(0.06)
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(run())
+        assert breaker.state(endpoint) == CircuitBreaker.OPEN
+
+        # the next trial is let through after reset_timeout
+        time.sleep(0.06)
+        assert call_with_retries(lambda: 'ok', endpoint, circuit_breaker=breaker) == 'ok'
+        assert breaker.state(endpoint) == CircuitBreaker.CLOSED
+
+    def test_client(self):
+        breaker = CircuitBreaker(min_requests=2)
+        client = ETGClient(auth, retry_policy=RetryPolicy(max_attempts=5, backoff=0.01), circuit_breaker=breaker)
+        handler, calls = flaky_handler(10)
+        mount_fake_adapter(client, handler)
+        with pytest.raises(CircuitOpenException):
+            client.contract_data_info()
+        assert len(calls) == 2
+
+    def test_stream(self):
+        client = ETGHotelsClient(auth, circuit_breaker=CircuitBreaker(min_requests=1))
+        handler, calls = flaky_handler(1)
+        mount_fake_adapter(client, handler)
+        with pytest.raises(ServerErrorException):
+            client.search_by_region(6308866, checkin, checkout, guests, top_k=3, stream=True)
+        with pytest.raises(CircuitOpenException):
+            client.search_by_region(6308866, checkin, checkout, guests, top_k=3, stream=True)
+        assert len(calls) == 1
+
+        client = ETGHotelsClient(auth, retry_policy=RetryPolicy(backoff=0.01))
+        handler, calls = flaky_handler(1)
+        mount_fake_adapter(client, handler)
+        assert client.search_by_region(6308866, checkin, checkout, guests, top_k=3, stream=True) == []
+        assert len(calls) == 2
+
+    def test_stream_async(self):
+        calls = []
+
+        def handler(request):
+            calls.append(request)
+            return httpx.Response(502, text='<html>Bad Gateway</html>', headers={'Content-Type': 'text/html'})
+
+        async def run():
+            client = AsyncETGHotelsClient(auth, circuit_breaker=CircuitBreaker(min_requests=1))
+            client.session = httpx.AsyncClient(auth=client.auth, transport=httpx.MockTransport(handler))
+            async with client:
+                with pytest.raises(ServerErrorException):
+                    await client.search_by_region(6308866, checkin, checkout, guests, top_k=3, stream=True)
+                with pytest.raises(CircuitOpenException):
+                    await client.search_by_region(6308866, checkin, checkout, guests, top_k=3, stream=True)
+
+        asyncio.run(run())
+        assert len(calls) == 1
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import threading
+import time
+
+import pytest
+
+from etg import AsyncRequestScheduler, ETGHotelsClient, GuestData, RequestScheduler
+from etg.scheduler import priority_class
+
+from .test_hotels import serp_handler
+from .utils import mount_fake_adapter
+
+auth = ('key_id', 'key')
+booking = 'api/b2b/v3/hotel/order/booking/form/'
+search = 'api/b2b/v3/search/serp/region/'
+
+
+class TestRequestScheduler:
+    def test_priority_class(self):
+        assert priority_class(booking) == 'booking'
+        assert priority_class('api/b2b/v3/search/hp/') == 'hotelpage'
+        assert priority_class(search) == priority_class('search/multicomplete/') == 'search'
+        assert priority_class('api/b2b/v3/region/list/') == 'static'
+
+    def test_reserved_slot(self):
+        scheduler = RequestScheduler(reserved={'booking': 1}, shared=1)
+        assert scheduler.size == 2
+        with scheduler.slot(search):
+            done = threading.Event()
+
+            def book():
+                with scheduler.slot(booking):
+                    done.set()
+
+            worker = threading.Thread(target=book)
+            worker.start()
+            assert done.wait(1)
+            worker.join()
+
+    def test_priority_order(self):
+        scheduler = RequestScheduler(reserved={}, shared=1)
+        order = []
+        lock = threading.Lock()
+
+        def call(endpoint):
+            with scheduler.slot(endpoint):
+                with lock:
+                    order.append(priority_class(endpoint))
+
+        with scheduler.slot(search):
+            workers = [threading.Thread(target=call, args=(endpoint,)) for endpoint in (search, search, booking)]
+            for worker in workers:
+                worker.start()
+                time.sleep(0.05)
+        for worker in workers:
+            worker.join()
+        assert order == ['booking', 'search', 'search']
+
+    def test_async(self):
+        scheduler = AsyncRequestScheduler(reserved={}, shared=1)
+        order = []
+
+        async def call(endpoint):
+            async with scheduler.slot(endpoint):
+                order.append(priority_class(endpoint))
+                await asyncio.sleep(0)
+
+        async def run():
+            async with scheduler.slot(search):
+                tasks = [asyncio.ensure_future(call(endpoint)) for endpoint in (search, search, booking)]
+                await asyncio.sleep(0.01)
+                tasks[0].cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        asyncio.run(run())
+        assert order == ['booking', 'search']
+
+    def test_client(self):
+        scheduler = RequestScheduler(shared=2)
+        client = ETGHotelsClient(auth, scheduler=scheduler)
+        mount_fake_adapter(client, serp_handler)
+        ids = ['hotel_{}'.format(i) for i in range(8)]
+        checkin = datetime.date.today() + datetime.timedelta(days=60)
+        checkout = checkin + datetime.timedelta(days=5)
+        hotels = client.search_by_hotels(ids, checkin, checkout, [GuestData(2)], chunk_size=1, max_workers=8)
+        assert len(hotels) == 8
+        assert scheduler._slots.shared_in_use == 0
+
+    def test_fit_pool(self):
+        scheduler = RequestScheduler()
+        assert scheduler.size == RequestScheduler.DEFAULT_POOL_SIZE
+        ETGHotelsClient(auth, pool_maxsize=20, scheduler=scheduler)
+        assert scheduler.size == 20 and scheduler._slots.shared == 15
+
+        with pytest.raises(ValueError):
+            ETGHotelsClient(auth, scheduler=RequestScheduler(shared=8))
+        with pytest.raises(ValueError):
+            ETGHotelsClient(auth, pool_maxsize=5, scheduler=RequestScheduler())
+        assert ETGHotelsClient(auth, pool_maxsize=13, scheduler=RequestScheduler(shared=8)).scheduler.size == 13
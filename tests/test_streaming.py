@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+import datetime
+import json
+
+import pytest
+
+from etg import ETGHotelsClient, GuestData, RateFilter
+from etg.exceptions import BadRequestException
+from etg.streaming import ResponseParser
+
+from .utils import api_response, load_response, mount_fake_adapter
+
+auth = ('key_id', 'key')
+
+
+class TestResponseParser:
+    def test_feed(self):
+        hotels = [{'id': 'hotel_{0}'.format(i), 'rates': [{'daily_prices': ['10.5']}]} for i in range(3)]
+        body = json.dumps(api_response(data={'hotels': hotels, 'total_hotels': 3}, debug={'key': [1]})).encode()
+        parser = ResponseParser()
+        items = parser.feed(body[:body.index(b'hotel_1')])
+        assert items == hotels[:1]
+        items += parser.feed(b'')
+        items += parser.feed(body[body.index(b'hotel_1'):])
+        items += parser.close()
+        assert items == hotels
+        assert parser.rest == {'debug': {'key': [1]}, 'error': None, 'status': 'ok'}
+        assert parser.size == len(body)
+
+    @pytest.mark.parametrize('chunk_size', [1, 10, 1024])
+    def test_rest(self, chunk_size):
+        hotels = [{'id': 'hotel_{0}'.format(i), 'status': 'sold', 'debug': {'error': i},
+                   'name': '"status": "fake"}'} for i in range(3)]
+        bodies = [
+            {'status': 'ok', 'data': {'hotels': hotels}, 'debug': {'status': 'nested'}, 'error': None},
+            {'data': {'hotels': hotels, 'error': 'nested'}, 'debug': None, 'error': None, 'status': 'ok'},
+            api_response(error='invalid_params', status='error'),
+        ]
+        for response in bodies:
+            body = json.dumps(response).encode()
+            parser = ResponseParser()
+            items = [item for i in range(0, len(body), chunk_size) for item in parser.feed(body[i:i + chunk_size])]
+            items += parser.close()
+            assert items == (hotels if response['data'] else [])
+            assert parser.rest == {key: response[key] for key in ('debug', 'error', 'status')}
+
+
+class TestStreamingSearch:
+    checkin = datetime.date.today() + datetime.timedelta(days=60)
+    checkout = checkin + datetime.timedelta(days=5)
+
+    def test_iter_search(self):
+        client = ETGHotelsClient(auth)
+        hotels = [{'id': str(i), 'rates': []} for i in range(100)]
+        mount_fake_adapter(client, lambda request: api_response(data={'hotels': hotels}))
+        assert list(client.iter_search(6308866, self.checkin, self.checkout, [GuestData(2)])) == hotels
+        assert client.resp.ok
+        assert client.resp.size > 0
+
+    def test_iter_search_filter(self):
+        client = ETGHotelsClient(auth)
+        hotels = [{'id': str(i), 'rates': [{'meal': meal, 'daily_prices': ['100']} for meal in ('nomeal', 'breakfast')]}
+                  for i in range(3)] + [{'id': 'no_breakfast', 'rates': [{'meal': 'nomeal', 'daily_prices': ['10']}]}]
+        mount_fake_adapter(client, lambda request: api_response(data={'hotels': hotels}))
+        selected = list(client.iter_search(6308866, self.checkin, self.checkout, [GuestData(2)],
+                                           rate_filter=RateFilter(meals=('breakfast',))))
+        assert [(hotel['id'], len(hotel['rates'])) for hotel in selected] == [('0', 1), ('1', 1), ('2', 1)]
+
+        with pytest.raises(TypeError):
+            client.iter_search(6308866, self.checkin, self.checkout, [GuestData(2)], top_k=1)
+
+    def test_iter_search_error(self):
+        client = ETGHotelsClient(auth)
+        mount_fake_adapter(client, lambda request: load_response('error_invalid_params.json'))
+        with pytest.raises(BadRequestException):
+            list(client.iter_search(6308866, self.checkin, self.checkout, [GuestData(2)]))
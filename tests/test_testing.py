@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+import datetime
+import time
+
+import pytest
+import requests
+
+from etg import ETGHotelsClient, GuestData, ServerErrorException
+from etg.testing import FakeETGServer
+
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=3)
+guests = [GuestData(2)]
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeETGServer(hotels=50, rates=3, regions=2500) as server:
+        yield server
+
+
+class TestFakeETGServer:
+    def test_search(self, server):
+        client = server.client(ETGHotelsClient)
+        hotels = client.search_by_region(6308866, checkin, checkout, guests)
+        assert len(hotels) == 50 and all(len(hotel['rates']) == 3 for hotel in hotels)
+        assert client.search_by_region(6308866, checkin, checkout, guests) == hotels
+
+        hotels = client.search_by_hotels(['a', 'b', 'c'], checkin, checkout, guests, chunk_size=2)
+        assert [hotel['id'] for hotel in hotels] == ['a', 'b', 'c']
+
+        hotel = client.hotelpage('a', checkin, checkout, guests)
+        assert hotel['id'] == 'a' and hotel['rates'][0]['book_hash']
+
+    def test_typed_models(self, server):
+        client = server.client(ETGHotelsClient, typed_models=True)
+        hotel = client.hotelpage('a', checkin, checkout, guests)
+        assert hotel.rates[0].amount == pytest.approx(sum(hotel.rates[0].get('daily_prices')), abs=0.05)
+
+    def test_static_and_booking(self, server):
+        client = server.client(ETGHotelsClient)
+        assert len(client.autocomplete('London', language='en')['regions']) == 5
+        assert len(list(client.iter_regions())) == 2500
+        assert client.make_reservation('order-1', 'h-1', 'en', '8.8.8.8')['partner_order_id'] == 'order-1'
+        assert client.cancel('order-1') is True
+        assert client.contract_data_info()['contract_datas']
+        assert server.requests['search/multicomplete/'] >= 1
+
+    def test_latency_and_errors(self):
+        with FakeETGServer(latency={'search/hp/': 0.1}, error_rate=1.0) as server:
+            client = server.client(ETGHotelsClient)
+            started = time.monotonic()
+            with pytest.raises(ServerErrorException):
+                client.hotelpage('a', checkin, checkout, guests)
+            assert time.monotonic() - started >= 0.1
+            r = requests.post(server.url + '/api/b2b/v3/search/hp/', json={}, auth=('key_id', 'key'))
+            assert r.status_code == 502
+            assert r.headers['Content-Type'] == 'text/html'
@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+import asyncio
+import datetime
+import socket
+
+import httpx
+import pytest
+
+from etg import (
+    AsyncETGHotelsClient, AsyncHTTPXTransport, AsyncRecordingTransport, AsyncReplayTransport, ETGHotelsClient,
+    GuestData, HTTPXTransport, Instrumentation, NetworkException, TrafficStore,
+)
+from etg.testing import FakeETGServer
+
+auth = ('key_id', 'key')
+checkin = datetime.date.today() + datetime.timedelta(days=60)
+checkout = checkin + datetime.timedelta(days=3)
+guests = [GuestData(2)]
+
+
+@pytest.fixture(scope='module')
+def server():
+    with FakeETGServer(hotels=20, rates=2) as server:
+        yield server
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return 'http://127.0.0.1:{0}'.format(sock.getsockname()[1])
+
+
+class TestHTTPXTransport:
+    def test_search(self, server):
+        with server.client(ETGHotelsClient, transport=HTTPXTransport(auth, max_connections=4)) as client:
+            hotels = client.search_by_hotels([str(i) for i in range(40)], checkin, checkout, guests,
+                                             chunk_size=2, max_workers=16)
+            assert [hotel['id'] for hotel in hotels] == [str(i) for i in range(40)]
+            assert isinstance(client.session, httpx.Client)
+
+            assert client.hotelpage('a', checkin, checkout, guests)['id'] == 'a'
+            assert isinstance(client.req, httpx.Request)
+
+            items = list(client.stream('POST', 'api/b2b/v3/search/serp/region/', {'region_id': 1}))
+            assert len(items) == 20 and client.resp.http_status == 200
+
+    def test_release_on_error(self, server):
+        def fail(event):
+            raise RuntimeError('listener failed')
+
+        instrumentation = Instrumentation()
+        instrumentation.subscribe('after_headers', fail)
+        transport = HTTPXTransport(auth, http2=False, max_connections=1)
+        with server.client(ETGHotelsClient, transport=transport, instrumentation=instrumentation,
+                           http_timeout=1) as client:
+            with pytest.raises(RuntimeError):
+                client.financial_info()
+            # the response of the failed request gave its connection back
+            instrumentation.unsubscribe('after_headers', fail)
+            client.financial_info()
+
+    def test_network_error(self):
+        client = ETGHotelsClient(auth, transport=HTTPXTransport(auth, http2=False))
+        client.API_HOST = closed_port_url()
+        with pytest.raises(NetworkException) as exc_info:
+            client.financial_info()
+        assert isinstance(exc_info.value.__cause__, httpx.ConnectError)
+
+
+class TestAsyncHTTPXTransport:
+    def test_search(self, server):
+        async def run():
+            transport = AsyncHTTPXTransport(auth, max_connections=4)
+            async with server.client(AsyncETGHotelsClient, transport=transport) as client:
+                results = await asyncio.gather(*(client.hotelpage(str(i), checkin, checkout, guests)
+                                                 for i in range(20)))
+                items = [item async for item in client.stream('POST', 'api/b2b/v3/search/serp/region/',
+                                                              {'region_id': 1})]
+                return results, items
+
+        results, items = asyncio.run(run())
+        assert [hotel['id'] for hotel in results] == [str(i) for i in range(20)]
+        assert len(items) == 20
+
+    def test_network_error(self):
+        async def run():
+            async with AsyncETGHotelsClient(auth) as client:
+                client.API_HOST = closed_port_url()
+                await client.financial_info()
+
+        with pytest.raises(NetworkException):
+            asyncio.run(run())
+
+
+def test_async_record_replay(server):
+    store = TrafficStore()
+
+    async def record():
+        transport = AsyncRecordingTransport(AsyncHTTPXTransport(auth, http2=False), store)
+        async with server.client(AsyncETGHotelsClient, transport=transport) as client:
+            return await client.hotelpage('a', checkin, checkout, guests)
+
+    async def replay():
+        async with AsyncETGHotelsClient(auth, transport=AsyncReplayTransport(store, speed=None)) as client:
+            return await client.hotelpage('a', checkin, checkout, guests)
+
+    recorded = asyncio.run(record())
+    assert len(store) == 1
+    assert asyncio.run(replay()) == recorded
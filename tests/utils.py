@@ -1,6 +1,12 @@
 # -*- coding: utf-8 -*-
+import io
 import os
 import json
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from requests.adapters import BaseAdapter
+from requests.structures import CaseInsensitiveDict
 
 here = os.path.abspath(os.path.dirname(__file__))
 
@@ -10,3 +16,61 @@ def load_response(resp_fn):
     with open(os.path.join(here, 'test_api_responses', resp_fn), encoding='utf-8') as f:
         resp = json.loads(f.read())
     return resp
+
+
+def api_response(data=None, debug=None, error=None, status='ok'):
+    """Returns a json response of API Gateway with the given content."""
+    return {
+        'data': data,
+        'debug': debug,
+        'error': error,
+        'status': status,
+    }
+
+
+def region_list_handler(request):
+    """Answers region list pages from 2500 regions in total."""
+    payload = json.loads(parse_qs(urlparse(request.url).query)['data'][0])
+    last_id, limit = payload.get('last_id', 0), payload.get('limit', 1000)
+    return api_response(data=[{'id': i, 'type': 'City'} for i in range(last_id + 1, min(last_id + limit, 2500) + 1)])
+
+
+class FakeAdapter(BaseAdapter):
+    """Transport adapter answering requests with the given handler instead of the network.
+
+    The handler takes :class:`requests.PreparedRequest` and returns a json response of API Gateway,
+    or a tuple of HTTP status and a json response, or raw bytes of the body.
+    """
+    def __init__(self, handler):
+        super().__init__()
+        self.handler = handler
+        self.requests = []
+        self.timeouts = []
+
+    def send(self, request, **kwargs):
+        self.requests.append(request)
+        self.timeouts.append(kwargs.get('timeout'))
+        status, body = 200, self.handler(request)
+        if isinstance(body, tuple):
+            status, body = body
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode('utf-8')
+
+        r = requests.Response()
+        r.status_code = status
+        r.headers = CaseInsensitiveDict({'Content-Type': 'application/json'})
+        r.raw = io.BytesIO(body)
+        r.encoding = 'utf-8'
+        r.url = request.url
+        r.request = request
+        return r
+
+    def close(self):
+        pass
+
+
+def mount_fake_adapter(client, handler):
+    """Routes all requests of the client to :class:`FakeAdapter` with the given handler."""
+    adapter = FakeAdapter(handler)
+    client.session.mount(client.API_HOST, adapter)
+    return adapter